@@ -0,0 +1,76 @@
+import re
+
+from unit_registry import CATEGORIES, FAMILIES, dot, zero_vector
+
+
+# Codes typed after a family alias for each warranty flag: 5q, 10p, s f, m10 w
+FLAG_CODES = {
+    "qm": ("q", "qm"),
+    "pm": ("p", "pm"),
+    "minor": ("m", "minor"),
+    "flat": ("f", "flat"),
+    "manuf": ("w", "mw", "manuf"),
+    "repair": ("r", "repair"),
+}
+
+# [-] [N x] code [x N]; a leading "-" removes instead of adding
+_ENTRY = re.compile(r"^([+-]?)\s*(?:(\d+)\s*[x*]\s*)?(.*?)(?:\s*[x*]\s*(\d+))?$")
+
+
+def _compile_codes():
+    # Every alias/name x warranty code spelling -> category index, built once at import
+    codes = {}
+
+    def put(code, cat):
+        if codes.setdefault(code, cat.index) != cat.index:
+            raise ValueError(f"Entry code {code!r} matches both {CATEGORIES[codes[code]].key} and {cat.key}")
+
+    for fam in FAMILIES:
+        for alias in dict.fromkeys((fam.name.lower().replace(" ", ""),) + fam.aliases):
+            if len(fam.categories) == 1:
+                put(alias, fam.categories[0])  # "poc" alone is enough
+            for cat in fam.categories:
+                for suffix in FLAG_CODES.get(cat.flag, (cat.flag,)):
+                    put(alias + suffix, cat)
+    return codes
+
+
+# Lookup table: normalized code (lower case, no spaces) -> category index
+ENTRY_CODES = _compile_codes()
+
+
+def parse_code(text):
+    # One code such as "5q", "-m10 w", "3x 10p" or "s f x2" -> (action, delta vector)
+    sign, before, code, after = _ENTRY.match(text.strip().lower()).groups()
+    index = ENTRY_CODES.get(code.replace(" ", ""))
+    if index is None:
+        raise ValueError(f"Unknown code {text.strip()!r}.")
+    if before and after:
+        raise ValueError(f"Give the quantity once in {text.strip()!r}.")
+    qty = int(before or after or 1)
+    if qty <= 0:
+        raise ValueError("Quantity must be positive.")
+    delta = zero_vector()
+    delta[index] = qty
+    return ("remove" if sign == "-" else "add"), delta
+
+
+def parse_codes(text):
+    # Several codes separated by commas or semicolons, applied together
+    entries = [parse_code(part) for part in re.split(r"[,;]", text) if part.strip()]
+    if not entries:
+        raise ValueError("Type a unit code, e.g. 5q, 10p x2 or -m10 w.")
+    return entries
+
+
+def describe(entries):
+    # ("+3 525 QM Warranty, -1 M10 Flat Rate", signed weighted points)
+    parts = []
+    points = 0.0
+    for action, delta in entries:
+        sign = -1 if action == "remove" else 1
+        points += sign * dot(delta)
+        for cat, qty in zip(CATEGORIES, delta):
+            if qty:
+                parts.append(f"{'-' if sign < 0 else '+'}{qty} {cat.unit} {cat.warranty}")
+    return ", ".join(parts), points
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from progress_history import zero_day
+from tracker_config import DEFAULTS, parse_clock
+
+
+# Bucket kinds, in the order the GUI offers them
+BUCKET_KINDS = ("day", "shift", "hour", "week")
+
+# Hour buckets older than this are dropped when storage snapshots
+HOUR_BUCKET_DAYS = 35
+
+
+def _clock(config, name):
+    try:
+        return parse_clock(config[name])
+    except (KeyError, ValueError):
+        return parse_clock(DEFAULTS[name])
+
+
+def shift_table(config):
+    # [(name, start time, end time)]; a single shift from shift_start/shift_end unless "shifts" is set
+    shifts = []
+    for entry in config.get("shifts") or []:
+        try:
+            shifts.append((str(entry["name"]), parse_clock(entry["start"]), parse_clock(entry["end"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not shifts:
+        shifts.append(("Shift", _clock(config, "shift_start"), _clock(config, "shift_end")))
+    return shifts
+
+
+def shift_window(when, config):
+    # (label, start, end) of the shift `when` falls in, or None between shifts.
+    # Overnight shifts are labelled with the date they started on.
+    for name, start, end in shift_table(config):
+        for day in (when.date(), when.date() - timedelta(days=1)):
+            begin = datetime.combine(day, start)
+            finish = datetime.combine(day, end)
+            if finish <= begin:
+                finish += timedelta(days=1)
+            if begin <= when < finish:
+                return f"{day.isoformat()} {name}", begin, finish
+    return None
+
+
+def bucket_labels(when, config):
+    # {kind: label} for every bucket an event at `when` counts toward
+    boundary = _clock(config, "day_boundary")
+    work_day = (when - timedelta(hours=boundary.hour, minutes=boundary.minute)).date()
+    year, week, _weekday = when.isocalendar()
+    labels = {
+        "day": work_day.isoformat(),
+        "hour": when.strftime("%Y-%m-%d %H:00"),
+        "week": f"{year}-W{week:02d}",
+    }
+    shift = shift_window(when, config)
+    if shift is not None:
+        labels["shift"] = shift[0]
+    return labels
+
+
+def bucket_keys(when, config):
+    # Flat "kind:label" keys, the form buckets are stored under
+    return [f"{kind}:{label}" for kind, label in bucket_labels(when, config).items()]
+
+
+def day_bucket_keys(day):
+    # Keys a whole day's units can be filed under when their times are unknown (imports)
+    year, week, _weekday = day.isocalendar()
+    return [f"day:{day.isoformat()}", f"week:{year}-W{week:02d}"]
+
+
+def hour_cutoff(today):
+    # Stored hour keys sorting below this have expired
+    return f"hour:{(today - timedelta(days=HOUR_BUCKET_DAYS)).isoformat()}"
+
+
+class BucketTable:
+    # Per-bucket counts and quarter-points ({kind: {label: vector}}), added to at event
+    # time so reading any bucket is a dict lookup
+    def __init__(self):
+        self.buckets = {kind: {} for kind in BUCKET_KINDS}
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows: {"kind:label": vector}
+        table = cls()
+        for key, vec in rows.items():
+            kind, _sep, label = key.partition(":")
+            if kind in table.buckets:
+                table.buckets[kind][label] = vec
+        return table
+
+    def add(self, labels, vec):
+        for kind, label in labels.items():
+            cur = self.buckets[kind].get(label)
+            if cur is None:
+                cur = self.buckets[kind][label] = zero_day()
+            for i, v in enumerate(vec):
+                if v:
+                    cur[i] += v
+
+    def get(self, kind, label):
+        return self.buckets[kind].get(label) or zero_day()
+
+    def recent(self, kind, limit):
+        # [(label, vector)] newest first; labels sort chronologically within a kind
+        labels = sorted(self.buckets[kind], reverse=True)[:limit]
+        return [(label, self.buckets[kind][label]) for label in labels]
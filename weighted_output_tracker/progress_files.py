@@ -0,0 +1,33 @@
+import json
+import os
+
+
+def file_stamp(path):
+    # (mtime_ns, size), or None when the file is missing; a cheap "did it change" check
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def write_atomic(path, write, newline=None):
+    # write(f) into a temp file of this process, fsync it and swap it in, so readers (and
+    # a crash) only ever see the old file or the complete new one
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", newline=newline, encoding="utf-8") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def write_json(path, data, **dump_args):
+    write_atomic(path, lambda f: json.dump(data, f, **dump_args))
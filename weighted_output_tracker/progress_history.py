@@ -0,0 +1,190 @@
+import operator
+from array import array
+from datetime import date, timedelta
+
+from unit_registry import N_CATEGORIES, dot_quarters
+
+
+# Per-day vector layout: one count per category (KEYS order), then quarter-points
+WIDTH = N_CATEGORIES + 1
+
+ROLLING_WINDOWS = (7, 30, 90)
+
+
+def zero_day():
+    return array("q", bytes(8 * WIDTH))
+
+
+def day_vector(delta):
+    vec = array("q", delta)
+    vec.append(dot_quarters(delta))
+    return vec
+
+
+class DayHistory:
+    # Per-day counts and quarter-points in a Fenwick tree over a dense day axis
+    # (index 1 = first recorded day), so any date range sums in O(log days).
+    def __init__(self):
+        self.first = None  # ordinal of index 1
+        self.tree = [None]
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows: iterable of (date, vector of WIDTH); built in O(days)
+        rows = [(d.toordinal(), vec) for d, vec in rows]
+        hist = cls()
+        if not rows:
+            return hist
+        hist.first = min(o for o, _vec in rows)
+        n = max(o for o, _vec in rows) - hist.first + 1
+        tree = [None] + [zero_day() for _ in range(n)]
+        for o, vec in rows:
+            node = tree[o - hist.first + 1]
+            tree[o - hist.first + 1] = array("q", map(operator.add, node, vec))
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] = array("q", map(operator.add, tree[parent], tree[i]))
+        hist.tree = tree
+        return hist
+
+    # ---- updates ----
+    def add(self, day, delta):
+        # delta: signed counts vector in KEYS order recorded on `day`
+        self.add_vector(day, day_vector(delta))
+
+    def add_vector(self, day, vec):
+        self._add_at(self._index(day), vec)
+
+    def _add_at(self, i, vec):
+        tree = self.tree
+        n = len(tree) - 1
+        while i <= n:
+            tree[i] = array("q", map(operator.add, tree[i], vec))
+            i += i & -i
+
+    def _index(self, day):
+        o = day.toordinal()
+        if self.first is None:
+            self.first = o
+        elif o < self.first:
+            self._rebase(o)
+        i = o - self.first + 1
+        while len(self.tree) <= i:
+            self._grow()
+        return i
+
+    def _grow(self):
+        # Append an empty day; its node covers (i - lowbit(i), i]
+        i = len(self.tree)
+        low = i - (i & -i)
+        self.tree.append(array("q", map(operator.sub, self._prefix(i - 1), self._prefix(low))))
+
+    def _rebase(self, o):
+        # A day before the current first one (imports): rebuild with the new origin
+        rows = [(date.fromordinal(self.first + i - 1), self.point(i)) for i in range(1, len(self) + 1)]
+        rows.append((date.fromordinal(o), zero_day()))
+        rebuilt = DayHistory.from_rows(rows)
+        self.first, self.tree = rebuilt.first, rebuilt.tree
+
+    # ---- queries ----
+    def _prefix(self, i):
+        total = zero_day()
+        tree = self.tree
+        while i > 0:
+            total = array("q", map(operator.add, total, tree[i]))
+            i -= i & -i
+        return total
+
+    def point(self, i):
+        return array("q", map(operator.sub, self._prefix(i), self._prefix(i - 1)))
+
+    def span(self):
+        # (first day, last day) covered, or None when empty
+        if self.first is None:
+            return None
+        return date.fromordinal(self.first), date.fromordinal(self.first + len(self) - 1)
+
+    def range(self, start, end):
+        # Summed vector for start <= day <= end (inclusive dates)
+        if self.first is None:
+            return zero_day()
+        lo = max(start.toordinal() - self.first + 1, 1)
+        hi = min(end.toordinal() - self.first + 1, len(self))
+        if lo > hi:
+            return zero_day()
+        return array("q", map(operator.sub, self._prefix(hi), self._prefix(lo - 1)))
+
+    def day(self, day):
+        return self.range(day, day)
+
+    def daily(self, start, end):
+        # [(date, vector)] for each day in range that has any activity
+        out = []
+        if self.first is None:
+            return out
+        lo = max(start.toordinal() - self.first + 1, 1)
+        hi = min(end.toordinal() - self.first + 1, len(self))
+        prev = self._prefix(lo - 1) if lo <= hi else None
+        for i in range(lo, hi + 1):
+            cur = self._prefix(i)
+            vec = array("q", map(operator.sub, cur, prev))
+            prev = cur
+            if any(vec):
+                out.append((date.fromordinal(self.first + i - 1), vec))
+        return out
+
+
+def _worked(vec):
+    return sum(vec[:N_CATEGORIES]) > 0
+
+
+class RollingWindows:
+    # Running sums over the last N calendar days (today included) for each window.
+    # New events add into every window; crossing midnight subtracts the day that
+    # falls out of each window. Nothing rescans history after construction.
+    def __init__(self, history, today, windows=ROLLING_WINDOWS):
+        self.history = history
+        self.windows = windows
+        self._reset(today)
+
+    def _reset(self, today):
+        self.today = today
+        self.today_units = sum(self.history.day(today)[:N_CATEGORIES])
+        self.sums = {}
+        self.active = {}  # days with any output inside each window
+        for w in self.windows:
+            start = today - timedelta(days=w - 1)
+            self.sums[w] = self.history.range(start, today)
+            self.active[w] = sum(1 for _day, vec in self.history.daily(start, today) if _worked(vec))
+
+    def advance(self, today):
+        if today <= self.today:
+            return
+        if (today - self.today).days >= max(self.windows):
+            self._reset(today)
+            return
+        while self.today < today:
+            self.today += timedelta(days=1)
+            entering = self.history.day(self.today)
+            entering_active = _worked(entering)
+            for w in self.windows:
+                leaving = self.history.day(self.today - timedelta(days=w))
+                self.sums[w] = array("q", map(operator.add, map(operator.sub, self.sums[w], leaving), entering))
+                self.active[w] += entering_active - _worked(leaving)
+            self.today_units = sum(entering[:N_CATEGORIES])
+
+    def add(self, day, vec):
+        # Call before the same vector is added to the history
+        self.advance(day)
+        if day != self.today:
+            return
+        before = self.today_units
+        self.today_units += sum(vec[:N_CATEGORIES])
+        became = (self.today_units > 0) - (before > 0)
+        for w in self.windows:
+            self.sums[w] = array("q", map(operator.add, self.sums[w], vec))
+            self.active[w] += became
@@ -0,0 +1,178 @@
+import csv
+import json
+import os
+import time
+from datetime import date, datetime
+
+from entry_codes import ENTRY_CODES
+from unit_registry import CATEGORIES, KEY_INDEX, N_CATEGORIES
+
+
+# Source rows per storage transaction
+IMPORT_BATCH_ROWS = 50_000
+# Bad rows listed in full; the rest are only counted
+ERRORS_SHOWN = 5
+
+# Mapping file (JSON). Wide layout, one column per category:
+#   {"date": "Date", "date_format": "%m/%d/%Y", "columns": {"525 QM": "count_qm", ...}}
+# Long layout, one category per row:
+#   {"date": "When", "category": "Item", "qty": "Qty"}
+# The category cell may be a count_* key, "<unit> <warranty>" or an entry code ("5q").
+# "delimiter" is optional: .tsv/.tab files default to tabs, anything else to commas.
+# Without a mapping, columns named like count_* keys are taken as-is, dated by a
+# "day" or "date" column (output_history.csv exports import unchanged).
+
+
+def load_mapping(path):
+    with open(path, encoding="utf-8") as f:
+        mapping = json.load(f)
+    if not isinstance(mapping, dict):
+        raise ValueError("The mapping must be a JSON object.")
+    for key in (mapping.get("columns") or {}).values():
+        if key not in KEY_INDEX:
+            raise ValueError(f"Mapping names unknown category {key!r}.")
+    return mapping
+
+
+class ImportStats:
+    # Running counters the generators update as they stream; read by the progress line
+    def __init__(self, size=0):
+        self.size = size  # bytes in the source file, 0 if unknown
+        self.chars = 0
+        self.rows = 0
+        self.bad = 0
+        self.errors = []
+        self.units = 0
+        self.days = set()
+        self.started = time.monotonic()
+
+    def error(self, line, message):
+        self.bad += 1
+        if len(self.errors) < ERRORS_SHOWN:
+            self.errors.append(f"line {line}: {message}")
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        done = f"{min(100.0, 100.0 * self.chars / self.size):5.1f}% " if self.size else ""
+        return (f"{done}{self.rows:,} rows  {self.rows / elapsed:,.0f} rows/s  "
+                f"{self.units:,} units  {self.bad:,} skipped")
+
+
+def read_lines(path, stats):
+    # The file line by line (constant memory), counting characters for the progress line
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line in f:
+            stats.chars += len(line)
+            yield line
+
+
+def parse_records(path, mapping, stats):
+    # Source rows -> (day, category index, quantity), lazily
+    delimiter = mapping.get("delimiter") or ("\t" if path.lower().endswith((".tsv", ".tab")) else ",")
+    reader = csv.DictReader(read_lines(path, stats), delimiter=delimiter)
+    fields = reader.fieldnames or []
+    date_col = mapping.get("date") or next((f for f in fields if f.strip().lower() in ("day", "date")), None)
+    if date_col not in fields:
+        raise ValueError(f"No date column {date_col!r} in {os.path.basename(path)}." if date_col
+                         else "Say which column holds the date (\"date\" in the mapping).")
+    date_format = mapping.get("date_format")
+    if mapping.get("category"):
+        cells = None
+        cat_col, qty_col = mapping["category"], mapping.get("qty")
+        for col in (cat_col, qty_col):
+            if col is not None and col not in fields:
+                raise ValueError(f"No column {col!r} in {os.path.basename(path)}.")
+        lookup = _category_lookup()
+    else:
+        columns = mapping.get("columns") or {f: f for f in fields if f in KEY_INDEX}
+        cells = [(col, KEY_INDEX[key]) for col, key in columns.items() if col in fields]
+        if not cells:
+            raise ValueError("No columns map onto tracker categories; give a mapping file.")
+    for row in _rows(reader):
+        stats.rows += 1
+        line = reader.line_num
+        try:
+            day = _parse_day(row.get(date_col), date_format)
+            if cells is not None:
+                # the whole row parses before any of it is used
+                found = [(index, _parse_qty(row.get(col))) for col, index in cells]
+                for index, qty in found:
+                    if qty:
+                        yield day, index, qty
+            else:
+                name = (row.get(cat_col) or "").strip()
+                index = lookup.get(name.lower()) if name else None
+                if index is None:
+                    index = lookup.get(name.lower().replace(" ", ""))
+                if index is None:
+                    raise ValueError(f"unknown category {name!r}")
+                qty = _parse_qty(row.get(qty_col)) if qty_col else 1
+                if qty:
+                    yield day, index, qty
+        except ValueError as exc:
+            stats.error(line, str(exc))
+
+
+def batch_days(records, stats, size=IMPORT_BATCH_ROWS):
+    # (day, index, qty) stream -> {day: counts} per batch of about `size` source rows;
+    # memory is bounded by the days in one batch, whatever the file size
+    days = {}
+    start = stats.rows
+    for day, index, qty in records:
+        counts = days.get(day)
+        if counts is None:
+            counts = days[day] = [0] * N_CATEGORIES
+        counts[index] += qty
+        stats.units += qty
+        stats.days.add(day)
+        if stats.rows - start >= size:
+            yield days
+            days = {}
+            start = stats.rows
+    if days:
+        yield days
+
+
+def import_batches(path, mapping=None, stats=None, size=IMPORT_BATCH_ROWS):
+    # The whole pipeline: lines -> csv rows -> records -> per-day batches
+    stats = stats or ImportStats(os.path.getsize(path))
+    return batch_days(parse_records(path, mapping or {}, stats), stats, size)
+
+
+def _rows(reader):
+    try:
+        yield from reader
+    except csv.Error as exc:
+        raise ValueError(f"line {reader.line_num}: {exc}") from None
+
+
+def _category_lookup():
+    # lower-case spellings -> category index: count_* keys, "<unit> <warranty>", entry codes
+    lookup = dict(ENTRY_CODES)
+    for cat in CATEGORIES:
+        lookup[cat.key.lower()] = cat.index
+        lookup[f"{cat.unit} {cat.warranty}".lower()] = cat.index
+    return lookup
+
+
+def _parse_day(text, date_format):
+    text = (text or "").strip()
+    if not text:
+        raise ValueError("no date")
+    if date_format:
+        return datetime.strptime(text, date_format).date()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        raise ValueError(f"date {text!r} is not YYYY-MM-DD; set date_format in the mapping") from None
+
+
+def _parse_qty(text):
+    # Spreadsheet cells: blank is 0, "3" or "3.0" is 3; negatives and fractions are refused
+    text = (text or "").strip().replace(",", "")
+    if not text:
+        return 0
+    value = float(text)
+    if value < 0 or not value.is_integer():
+        raise ValueError(f"quantity {text!r} is not a whole non-negative number")
+    return int(value)
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+
+from entry_codes import parse_codes
+from unit_registry import CATEGORY_INDEX, KEY_INDEX, zero_vector
+
+
+INGEST_HOST = "127.0.0.1"
+INGEST_PORT = 8765
+# AF_UNIX is missing on older Windows builds; the CLI then only offers TCP
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+# Group commit: a batch closes after this long or this many events, whichever comes first
+BATCH_SECONDS = 0.05
+BATCH_MAX = 500
+# Events accepted but not yet committed; readers stop reading (TCP backpressure) past this
+QUEUE_MAX = 5000
+# Replies a slow client may leave unread before we stop reading its requests
+REPLIES_MAX = 1000
+# Replies written between drains when a client keeps them coming
+REPLIES_DRAIN_EVERY = 64
+# Longest line accepted from a client
+LINE_LIMIT = 64 * 1024
+
+
+def parse_event(line):
+    # One NDJSON line -> [(action, delta)]. Accepted shapes:
+    #   {"key": "count_qm", "qty": 3}
+    #   {"unit": "525", "warranty": "QM Warranty", "qty": 3, "action": "remove"}
+    #   {"code": "5q x3, -m10 w"}   (entry codes, as typed in the GUI)
+    try:
+        data = json.loads(line)
+    except ValueError:
+        raise ValueError("Not valid JSON.") from None
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object.")
+    if "code" in data:
+        return parse_codes(str(data["code"]))
+    action = data.get("action", "add")
+    if action not in ("add", "remove"):
+        raise ValueError("action must be \"add\" or \"remove\".")
+    qty = data.get("qty", 1)
+    if isinstance(qty, bool) or not isinstance(qty, int) or qty <= 0:
+        raise ValueError("qty must be a positive integer.")
+    if "key" in data:
+        index = KEY_INDEX.get(data["key"])
+    else:
+        index = CATEGORY_INDEX.get((data.get("unit"), data.get("warranty")))
+    if index is None:
+        raise ValueError("Unknown category; give a count_* key, unit and warranty, or a code.")
+    delta = zero_vector()
+    delta[index] = qty
+    return [(action, delta)]
+
+
+class IngestDaemon:
+    # Accepts unit events over a local socket and group-commits them through the engine.
+    # All engine calls run on one executor thread, one batch at a time, so the event
+    # loop keeps reading while a batch is written.
+    def __init__(self, engine, batch_seconds=BATCH_SECONDS, batch_max=BATCH_MAX, queue_max=QUEUE_MAX):
+        self.engine = engine
+        self.batch_seconds = batch_seconds
+        self.batch_max = batch_max
+        self.queue = asyncio.Queue(maxsize=queue_max)
+        self.server = None
+        self.clients = {}  # open connections: writer -> (reader, task)
+        self.committed = 0
+        self.rejected = 0
+        self.batches = 0
+
+    async def start(self, host=INGEST_HOST, port=INGEST_PORT, path=None):
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)  # stale socket from a daemon that did not shut down
+            self.server = await asyncio.start_unix_server(self._client, path, limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self._client, host, port, limit=LINE_LIMIT)
+        self._committer = asyncio.create_task(self._commit_loop())
+        return self
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def stop(self):
+        # Stop reading, commit and answer everything already accepted, then hang up
+        self.server.close()
+        clients = list(self.clients.items())
+        for writer, (reader, _task) in clients:
+            writer.transport.pause_reading()
+            reader.feed_eof()  # lines already buffered are still handled
+        await asyncio.gather(*(task for _w, (_r, task) in clients), return_exceptions=True)
+        await self.queue.join()
+        await self.server.wait_closed()
+        self._committer.cancel()
+
+    # ---- connections ----
+    async def _client(self, reader, writer):
+        self.clients[writer] = (reader, asyncio.current_task())
+        replies = asyncio.Queue(maxsize=REPLIES_MAX)
+        responder = asyncio.create_task(self._respond(replies, writer))
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # line over LINE_LIMIT; the stream cannot resync
+                    await replies.put(_done({"ok": False, "error": "Line too long."}))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    entries = parse_event(line)
+                except ValueError as exc:
+                    self.rejected += 1
+                    await replies.put(_done({"ok": False, "error": str(exc)}, line))
+                    continue
+                result = loop.create_future()
+                # both puts wait when full: that is the backpressure on this client
+                await replies.put((result, line))
+                await self.queue.put((entries, result))
+        except ConnectionError:
+            pass
+        finally:
+            await replies.put(None)
+            await responder
+            self.clients.pop(writer, None)
+
+    async def _respond(self, replies, writer):
+        # Replies go out in request order once each event's batch has been committed.
+        # Once the client is gone its remaining replies are dropped, but still taken off
+        # the queue, so the reader never waits on a full one.
+        unsent = 0
+        try:
+            while True:
+                item = await replies.get()
+                if item is None:
+                    break
+                result, line = item
+                reply = await result
+                if writer.is_closing():
+                    continue
+                request_id = _request_id(line)
+                if request_id is not None:
+                    reply = {"id": request_id, **reply}
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                unsent += 1
+                if unsent >= REPLIES_DRAIN_EVERY or replies.empty():
+                    unsent = 0
+                    try:
+                        await writer.drain()
+                    except ConnectionError:
+                        writer.close()  # is_closing() from here on
+        finally:
+            writer.close()
+
+    # ---- group commit ----
+    async def _commit_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_seconds
+            while len(batch) < self.batch_max:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                replies = await loop.run_in_executor(None, self._commit, [entries for entries, _r in batch])
+            except Exception as exc:
+                replies = [{"ok": False, "error": f"Not saved: {exc}"}] * len(batch)
+            for (_entries, result), reply in zip(batch, replies):
+                result.set_result(reply)
+                self.queue.task_done()
+
+    def _commit(self, lines):
+        # Executor thread. Each line is checked against the state as the lines before it
+        # leave it; valid lines are applied together as one batch and one storage write.
+        engine = self.engine
+        engine.reload_if_changed()  # the GUI or CLI may have written since the last batch
+        trial = engine.state.copy()
+        entries = []
+        replies = []
+        for line_entries in lines:
+            line_trial = trial.copy()
+            problem = None
+            for action, delta in line_entries:
+                if action == "remove":
+                    problem = line_trial.removal_problem(delta)
+                    if problem:
+                        break
+                    line_trial.apply([-d for d in delta])
+                else:
+                    line_trial.apply(delta)
+            if problem:
+                self.rejected += 1
+                replies.append({"ok": False, "error": problem})
+                continue
+            trial = line_trial
+            entries.extend(line_entries)
+            replies.append({"ok": True})
+        if entries:
+            engine.apply_batch(entries, f"ingest batch of {len(entries)} entries")
+            self.committed += len(entries)
+            self.batches += 1
+        return replies
+
+
+def _done(reply, line=b""):
+    # A reply that needs no commit, queued in order with the pending ones
+    result = asyncio.get_running_loop().create_future()
+    result.set_result(reply)
+    return result, line
+
+
+def _request_id(line):
+    # Echo a client's "id" so it can match replies; only parsed for lines that have one
+    if b'"id"' not in line:
+        return None
+    try:
+        return json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        return None
+
+
+def serve(engine, host=INGEST_HOST, port=INGEST_PORT, path=None):
+    # Run the daemon until Ctrl+C / SIGTERM, then commit what was accepted and return
+    async def main():
+        daemon = await IngestDaemon(engine).start(host, port, path)
+        where = path if path is not None else ":".join(map(str, daemon.address[:2]))
+        print(f"Accepting NDJSON unit events on {where} (Ctrl+C to stop)", flush=True)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+        started = time.monotonic()
+        try:
+            await stop.wait()
+        finally:
+            await daemon.stop()
+            if path is not None and os.path.exists(path):
+                os.unlink(path)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f"Committed {daemon.committed} entr{'y' if daemon.committed == 1 else 'ies'} in "
+              f"{daemon.batches} batch(es), rejected {daemon.rejected} "
+              f"({daemon.committed / elapsed:.0f}/s).")
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
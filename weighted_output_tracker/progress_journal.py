@@ -0,0 +1,141 @@
+import csv
+import os
+from datetime import datetime
+
+from progress_files import write_atomic
+from unit_registry import CATEGORY_INDEX
+
+
+JOURNAL_FIELDS = ["seq", "timestamp", "unit", "warranty", "delta", "points"]
+
+# Fold the journal into a fresh snapshot after this many appended records
+COMPACT_EVERY = 500
+
+
+def write_snapshot(path, fieldnames, row):
+    write_rows(path, fieldnames, [row])
+
+
+def write_rows(path, fieldnames, rows):
+    # Swapped in whole, so an interrupted save never leaves a torn CSV
+    def write(f):
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    write_atomic(path, write, newline="")
+
+
+def _complete_lines(f):
+    # Only lines that got their newline; a torn last record is not a record
+    for line in f:
+        if line.endswith("\n"):
+            yield line
+
+
+class ProgressJournal:
+    def __init__(self, path, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.compact_every = compact_every
+        self.seq = 0  # last sequence number written or replayed
+        self.pending = 0  # records not yet folded into a snapshot
+
+    def replay(self, state, snapshot_seq, folds=()):
+        # Apply journal records newer than the snapshot; a torn trailing line is ignored
+        # (and cut off by the next append).
+        # folds: [(seq, fn(when, index, delta, quarters))]; each fn also receives the
+        # records newer than its own seq (per-day and per-bucket aggregates).
+        last = min([snapshot_seq, *(seq for seq, _fn in folds)])
+        self.pending = 0
+        applied = 0
+        for seq, when, index, delta, points in self.records(last):
+            last = seq
+            for fold_seq, fn in folds:
+                if seq > fold_seq:
+                    fn(when, index, delta, round(points * 4))
+            if seq > snapshot_seq:
+                self.pending += 1
+                applied += 1
+                state.add(index, delta, points)
+        self.seq = max([last, snapshot_seq, *(seq for seq, _fn in folds)])
+        return applied
+
+    def records(self, after=0):
+        # (seq, when, category index, delta, points) for each complete record past `after`,
+        # in file order; unreadable rows are skipped
+        if not self.path.exists():
+            return
+        with self.path.open(newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(_complete_lines(f), fieldnames=JOURNAL_FIELDS):
+                try:
+                    seq = int(row["seq"])
+                    when = datetime.fromisoformat(row["timestamp"])
+                    index = CATEGORY_INDEX[(row["unit"], row["warranty"])]
+                    delta = int(row["delta"])
+                    points = float(row["points"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if seq > after:
+                    after = seq
+                    yield seq, when, index, delta, points
+
+    def last_seq(self):
+        # Highest sequence number in the file (any writer's), 0 when there is none
+        last = 0
+        if self.path.exists():
+            with self.path.open(newline="", encoding="utf-8") as f:
+                for row in csv.reader(_complete_lines(f)):
+                    try:
+                        last = max(last, int(row[0]))
+                    except (IndexError, ValueError):
+                        continue
+        return last
+
+    def append(self, events, when=None):
+        if not events:
+            return
+        stamp = (when or datetime.now()).isoformat(timespec="seconds")
+        self._drop_torn_tail()
+        with self.path.open("a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for unit, warranty, delta, points in events:
+                self.seq += 1
+                writer.writerow([self.seq, stamp, unit, warranty, delta, points])
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending += len(events)
+
+    def _drop_torn_tail(self):
+        # A crash mid-append leaves a last line without its newline. Cut it off before
+        # appending, or the next record would be written onto it and lost with it.
+        try:
+            with self.path.open("r+b") as f:
+                end = f.seek(0, os.SEEK_END)
+                if not end:
+                    return
+                f.seek(end - 1)
+                if f.read(1) == b"\n":
+                    return
+                pos = end
+                keep = 0
+                while pos > 0:
+                    step = min(4096, pos)
+                    pos -= step
+                    f.seek(pos)
+                    cut = f.read(step).rfind(b"\n")
+                    if cut >= 0:
+                        keep = pos + cut + 1
+                        break
+                f.truncate(keep)
+                f.flush()
+                os.fsync(f.fileno())
+        except FileNotFoundError:
+            pass
+
+    def needs_compaction(self):
+        return self.pending >= self.compact_every
+
+    def truncate(self):
+        # Called once the snapshot holds everything up to self.seq
+        self.pending = 0
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,144 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from unit_registry import CATEGORIES
+
+
+# Metric name prefix for the Prometheus text format
+PREFIX = "weighted_output"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# A client that stalls longer than this is dropped; requests are served one at a time
+REQUEST_TIMEOUT = 5.0
+
+
+def metrics_dict(state, latency, station):
+    return {
+        "station": station,
+        "output": state.output,
+        "weighted_output": state.weighted_output,
+        "today_output": state.today_output(),
+        "counts": {cat.key: state.counts[cat.index] for cat in CATEGORIES},
+        "write_latency": {
+            "count": latency.count,
+            "sum_seconds": latency.total,
+            "max_seconds": latency.max,
+            "last_seconds": latency.last,
+        },
+    }
+
+
+def render_prometheus(state, latency, station):
+    station = _label(station)
+    lines = [
+        f"# HELP {PREFIX}_station_info Station id of this tracker (see tracker_config.json).",
+        f"# TYPE {PREFIX}_station_info gauge",
+        f'{PREFIX}_station_info{{station="{station}"}} 1',
+        f"# HELP {PREFIX}_units Units recorded in total.",
+        f"# TYPE {PREFIX}_units gauge",
+        f"{PREFIX}_units {state.output}",
+        f"# HELP {PREFIX}_points Weighted output points in total.",
+        f"# TYPE {PREFIX}_points gauge",
+        f"{PREFIX}_points {state.weighted_output}",
+        f"# HELP {PREFIX}_today_units Units recorded since the start of the work day.",
+        f"# TYPE {PREFIX}_today_units gauge",
+        f"{PREFIX}_today_units {state.today_output()}",
+        f"# HELP {PREFIX}_count Units per category (the count_* columns).",
+        f"# TYPE {PREFIX}_count gauge",
+    ]
+    for cat in CATEGORIES:
+        lines.append(f'{PREFIX}_count{{key="{cat.key}",unit="{_label(cat.unit)}",'
+                     f'warranty="{_label(cat.warranty)}"}} {state.counts[cat.index]}')
+    lines += [
+        f"# HELP {PREFIX}_write_seconds Time spent in storage writes.",
+        f"# TYPE {PREFIX}_write_seconds summary",
+        f"{PREFIX}_write_seconds_count {latency.count}",
+        f"{PREFIX}_write_seconds_sum {latency.total:.6f}",
+        f"# HELP {PREFIX}_write_seconds_max Slowest storage write so far.",
+        f"# TYPE {PREFIX}_write_seconds_max gauge",
+        f"{PREFIX}_write_seconds_max {latency.max:.6f}",
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _label(text):
+    return str(text).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsServer:
+    # Tiny HTTP endpoint on its own daemon thread: GET /metrics (Prometheus) or
+    # /metrics.json. Responses come from the last published state copy, rendered at
+    # most once per change, so a scrape never touches the tracker files or the Tk thread.
+    def __init__(self, latency, station, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.station = station
+        self._snapshot = None
+        self._rendered = (None, None, {})  # (snapshot, write count, {path: bytes})
+        self._render_lock = threading.Lock()
+        self.httpd = HTTPServer((host, port), _handler(self))
+        self.httpd.timeout = REQUEST_TIMEOUT
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    @property
+    def address(self):
+        return self.httpd.server_address[:2]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def publish(self, state):
+        # Called on the engine's thread after every change: one O(categories) copy
+        self._snapshot = state.copy()
+
+    def body(self, path):
+        # (content type, bytes) for a path, or None for anything else
+        snapshot, latency = self._snapshot, self.latency
+        if snapshot is None or path not in ("/metrics", "/metrics.json"):
+            return None
+        with self._render_lock:
+            cached_snapshot, count, bodies = self._rendered
+            if cached_snapshot is not snapshot or count != latency.count:
+                bodies = {}
+                self._rendered = (snapshot, latency.count, bodies)
+            if path not in bodies:
+                if path == "/metrics":
+                    bodies[path] = render_prometheus(snapshot, latency, self.station)
+                else:
+                    bodies[path] = json.dumps(metrics_dict(snapshot, latency, self.station)).encode("utf-8")
+            data = bodies[path]
+        return (PROMETHEUS_TYPE if path == "/metrics" else "application/json"), data
+
+    def close(self):
+        if self._thread.is_alive():
+            self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _handler(server):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        timeout = REQUEST_TIMEOUT
+
+        def do_GET(self):
+            self._reply(send_body=True)
+
+        def do_HEAD(self):
+            self._reply(send_body=False)
+
+        def _reply(self, send_body):
+            found = server.body(self.path.split("?", 1)[0])
+            if found is None:
+                self.send_error(404)
+                return
+            content_type, data = found
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass  # scrapes every few seconds would flood stderr
+
+    return MetricsHandler
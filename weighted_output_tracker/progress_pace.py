@@ -0,0 +1,66 @@
+import math
+
+
+class PaceTracker:
+    # Exponentially weighted units/hour and weighted points/hour for one shift.
+    # Each event decays the running sums to its timestamp and adds its amount, so
+    # updates and queries are O(1) no matter how many events the day has seen.
+    def __init__(self, shift_start, shift_end, halflife_minutes=45):
+        self.tau = halflife_minutes / 60 / math.log(2)  # hours
+        self.reset(shift_start, shift_end)
+
+    def reset(self, shift_start, shift_end, units=0, points=0.0, now=None):
+        # Start a new shift; units/points already recorded today seed an average pace
+        self.shift_start = shift_start
+        self.shift_end = shift_end
+        self.start = shift_start
+        self.units_today = units
+        self.points_today = points
+        self.last = now or shift_start
+        self.units_sum = 0.0
+        self.points_sum = 0.0
+        if now is not None and (units or points):
+            self.start = min(shift_start, now)
+            norm = self.tau * self._coverage(now)
+            if norm > 0:
+                elapsed = self._hours(self.start, now)
+                self.units_sum = units / elapsed * norm if elapsed else 0.0
+                self.points_sum = points / elapsed * norm if elapsed else 0.0
+
+    def add(self, when, units, points):
+        if when < self.start:
+            self.start = when
+        decay = math.exp(-max(0.0, self._hours(self.last, when)) / self.tau)
+        self.units_sum = self.units_sum * decay + units
+        self.points_sum = self.points_sum * decay + points
+        self.last = max(self.last, when)
+        self.units_today += units
+        self.points_today += points
+
+    def rates(self, now):
+        # (units/hour, weighted points/hour) as of `now`
+        norm = self.tau * self._coverage(now)
+        if norm <= 0:
+            return 0.0, 0.0
+        decay = math.exp(-max(0.0, self._hours(self.last, now)) / self.tau)
+        return self.units_sum * decay / norm, self.points_sum * decay / norm
+
+    def projection(self, now):
+        # Weighted points expected by shift end if the current pace holds
+        if now >= self.shift_end:
+            return self.points_today
+        _units_rate, points_rate = self.rates(now)
+        remaining = self._hours(max(now, self.shift_start), self.shift_end)
+        return self.points_today + max(0.0, points_rate) * remaining
+
+    def _coverage(self, now):
+        # Share of the exponential window the shift has filled so far; corrects the
+        # early-shift bias of a decayed sum that started from zero
+        elapsed = self._hours(self.start, now)
+        if elapsed <= 0:
+            return 0.0
+        return 1 - math.exp(-elapsed / self.tau)
+
+    @staticmethod
+    def _hours(a, b):
+        return (b - a).total_seconds() / 3600
@@ -0,0 +1,148 @@
+import json
+import socket
+import uuid
+
+from progress_files import write_json
+from progress_lock import FileLock
+from tracker_config import load_config, save_config
+from unit_registry import KEY_INDEX, KEYS, N_CATEGORIES
+
+
+# Counters merged in from other stations: {replica: {category key: [added, removed]}}
+REPLICAS_NAME = "output_replicas.json"
+REPLICAS_LOCK = "output_replicas.lock"
+# Each station publishes replica_<id>.json next to its data; copying it is the whole sync
+REPLICA_GLOB = "replica_*.json"
+
+
+def new_replica_id():
+    # Host name plus a random suffix, so two benches on one machine still differ
+    host = "".join(c for c in socket.gethostname() if c.isalnum() or c in "-_") or "station"
+    return f"{host}-{uuid.uuid4().hex[:6]}"
+
+
+def ensure_replica_id(base_dir, config):
+    # The station id from config, created on first start. Made under the lock so two
+    # processes starting together cannot each pick (and publish under) their own id.
+    if config.get("station_id") or base_dir is None:
+        return config.get("station_id") or new_replica_id()
+    with FileLock(base_dir / REPLICAS_LOCK):
+        on_disk = load_config(base_dir)
+        if not on_disk.get("station_id"):
+            on_disk["station_id"] = new_replica_id()
+            save_config(base_dir, on_disk)
+    config["station_id"] = on_disk["station_id"]
+    return config["station_id"]
+
+
+def replica_file_name(replica):
+    return f"replica_{replica}.json"
+
+
+def own_counters(state):
+    # This station's halves in replica-file form; untouched categories are left out
+    return {key: [state.added[i], state.removed[i]] for i, key in enumerate(KEYS)
+            if state.added[i] or state.removed[i]}
+
+
+def read_counters(path):
+    # {replica: {key: [added, removed]}} from a published replica file or the merge store
+    with path.open(encoding="utf-8") as f:
+        data = json.load(f)
+    counters = data.get("counters") if isinstance(data, dict) else None
+    if not isinstance(counters, dict):
+        raise ValueError(f"{path.name} is not a tracker replica file.")
+    out = {}
+    for replica, halves in counters.items():
+        out[str(replica)] = {str(key): [int(pair[0]), int(pair[1])] for key, pair in halves.items()}
+    return out
+
+
+def merge_counters(into, other, skip=None):
+    # Element-wise max per replica, category and half. Max is idempotent, commutative and
+    # associative, so files merge correctly in any order and any number of times. `skip`
+    # is our own replica: nobody else can know more about it than we do.
+    grew = False
+    for replica, halves in other.items():
+        if replica == skip:
+            continue
+        mine = into.setdefault(replica, {})
+        for key, (added, removed) in halves.items():
+            cur = mine.get(key, [0, 0])
+            if added > cur[0] or removed > cur[1]:
+                mine[key] = [max(added, cur[0]), max(removed, cur[1])]
+                grew = True
+    return grew
+
+
+def counter_totals(counters):
+    # KEYS-order net counts summed over every replica: O(categories x replicas)
+    vec = [0] * N_CATEGORIES
+    for halves in counters.values():
+        for key, (added, removed) in halves.items():
+            index = KEY_INDEX.get(key)
+            if index is not None:
+                vec[index] += added - removed
+    return vec
+
+
+def replica_paths(paths):
+    # Files as given; directories contribute every replica_*.json they hold
+    out = []
+    for path in paths:
+        out.extend(sorted(path.glob(REPLICA_GLOB)) if path.is_dir() else [path])
+    return out
+
+
+class ReplicaSet:
+    # What this station knows about the other stations' counters. Only ever grows by
+    # merge_counters, so concurrent merges just need the read-merge-write under a lock.
+    def __init__(self, base_dir, replica):
+        self.replica = replica  # None until the engine creates this station's id
+        self.path = base_dir / REPLICAS_NAME if base_dir is not None else None
+        self.lock = FileLock(base_dir / REPLICAS_LOCK) if base_dir is not None else None
+        self.counters = {}
+
+    def load(self):
+        if self.path is not None and self.path.exists():
+            try:
+                self.counters = read_counters(self.path)
+            except (OSError, ValueError, TypeError, AttributeError, IndexError):
+                self.counters = {}  # a damaged store is rebuilt by the next merge
+        return self
+
+    def merge(self, paths):
+        # Fold the replica files into the store; returns how many were read
+        files = replica_paths(paths)
+        if self.lock is None:
+            return self._merge_files(files)
+        with self.lock:
+            self.load()
+            merged = self._merge_files(files)
+            _write(self.path, self.replica, self.counters)
+        return merged
+
+    def _merge_files(self, files):
+        for path in files:
+            try:
+                merge_counters(self.counters, read_counters(path), skip=self.replica)
+            except (OSError, TypeError, AttributeError, IndexError, ValueError) as exc:
+                raise ValueError(f"Could not merge {path}: {exc}") from None
+        return len(files)
+
+    def totals(self):
+        return counter_totals(self.counters)
+
+    def published(self, state):
+        # What our replica file carries: our own halves plus everything merged so far, so
+        # stations can also sync through each other. A copy, safe to write from another thread.
+        counters = {replica: dict(halves) for replica, halves in self.counters.items()}
+        counters[self.replica] = own_counters(state)
+        return counters
+
+    def write(self, path, counters):
+        _write(path, self.replica, counters)
+
+
+def _write(path, replica, counters):
+    write_json(path, {"replica": replica, "counters": counters})
@@ -0,0 +1,203 @@
+import csv
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from progress_files import file_stamp, write_json
+from progress_journal import ProgressJournal
+from tracker_state import TrackerState
+from unit_registry import FAMILIES, KEY_INDEX, KEYS, QUARTERS
+
+
+SHOP_CACHE_NAME = "shop_cache.json"
+# Bump when read_tracker's result changes so older caches are re-read
+_CACHE_VERSION = 1
+# Side files that sit next to a snapshot but are not one
+SIDE_FILES = {"output_history.csv", "output_buckets.csv"}
+# Below this many changed files the pool costs more to start than it saves
+POOL_MIN_FILES = 16
+
+
+def tracker_files(root):
+    # Every candidate tracker under `root`: CSV snapshots (any name, so collected copies
+    # like alice.csv work), journals whose snapshot was never written, and SQLite
+    # output_progress.db files
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        names = set(files)
+        for name in sorted(files):
+            if name.endswith(".journal") and name[:-len(".journal")] + ".csv" not in names:
+                yield Path(folder) / (name[:-len(".journal")] + ".csv")
+            elif (name.endswith(".csv") and name not in SIDE_FILES) or name == "output_progress.db":
+                yield Path(folder) / name
+
+
+def tech_name(rel):
+    # A folder per tech (alice/output_progress.csv, alice/bench2/output_progress.db),
+    # else the collected file's own name (alice.csv)
+    parts = Path(rel).parts
+    return parts[0] if len(parts) > 1 else Path(rel).stem
+
+
+def _stamp(path):
+    # (mtime_ns, size) of the file and the journal or WAL that completes it; an empty
+    # companion holds nothing, so it stamps like a missing one
+    stamp = []
+    for p in (path, _companion(path)):
+        st = file_stamp(p)
+        stamp += st if st is not None and st[1] else [0, 0]
+    return stamp
+
+
+def _companion(path):
+    if path.suffix == ".db":
+        return path.with_name(path.name + "-wal")
+    return path.with_suffix(".journal")
+
+
+def read_tracker(path):
+    # (stamp, {key: units}) or (stamp, None) when the file is not a tracker snapshot.
+    # Only the station's own units count (added - removed): totals merged in from a
+    # tech's other bench would otherwise be counted once per bench. Runs in the pool.
+    path = Path(path)
+    stamp = _stamp(path)
+    try:
+        state = _read_db(path) if path.suffix == ".db" else _read_csv(path)
+    except (OSError, ValueError, sqlite3.Error, csv.Error, UnicodeDecodeError):
+        state = None
+    if state is None:
+        return stamp, None
+    return stamp, {key: a - r for key, a, r in zip(KEYS, state.added, state.removed) if a != r}
+
+
+def _read_csv(path):
+    journal = _companion(path)
+    row = {}
+    if path.exists():
+        with path.open(newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fields = set(reader.fieldnames or ())
+            if fields and (not {"output", "weighted_output"} <= fields or fields & {"day", "bucket"}):
+                return None
+            row = next(reader, None) or {}
+    if not row and not journal.exists():
+        return None
+    # units recorded after the snapshot (or before there was one) are in the journal
+    state = TrackerState.from_dict(row)
+    ProgressJournal(journal).replay(state, int(row.get("journal_seq") or 0))
+    return state
+
+
+def _read_db(path):
+    # Collected copies: with no WAL beside the database nothing can change under us, so it
+    # opens immutable and SQLite creates no -wal/-shm in the user's folder. A copied WAL
+    # holds committed units and must still be read.
+    wal = _companion(path)
+    immutable = "" if wal.exists() and wal.stat().st_size else "&immutable=1"
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro{immutable}", uri=True)
+    try:
+        return TrackerState.from_dict(dict(conn.execute("SELECT key, value FROM counters")))
+    finally:
+        conn.close()
+
+
+class ShopScan:
+    # Results per tracker file, cached by mtime/size so a rerun only re-reads the files
+    # (or journals) that changed since the last scan
+    def __init__(self, root, cache_path=None):
+        self.root = Path(root)
+        self.cache_path = cache_path
+        self.entries = {}  # relative path -> {"stamp": [...], "result": {...} or None}
+        self.read = 0  # files parsed by the last scan()
+
+    def load_cache(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return self
+        try:
+            with self.cache_path.open(encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == _CACHE_VERSION:
+                self.entries = data.get("files") or {}
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def scan(self, workers=None):
+        paths = {str(p.relative_to(self.root)): p for p in tracker_files(self.root)}
+        entries = {rel: e for rel, e in self.entries.items() if rel in paths}
+        stale = [rel for rel, p in paths.items()
+                 if not isinstance(entries.get(rel), dict) or entries[rel].get("stamp") != _stamp(p)]
+        self.read = len(stale)
+        files = [str(paths[rel]) for rel in stale]
+        if len(files) < POOL_MIN_FILES or workers == 1:
+            results = map(read_tracker, files)
+            pool = None
+        else:
+            workers = workers or os.cpu_count() or 1
+            pool = ProcessPoolExecutor(max_workers=workers)
+            # a few chunks per worker: little IPC, and a slow disk area can't idle the rest
+            results = pool.map(read_tracker, files, chunksize=max(1, len(files) // (workers * 4)))
+        try:
+            for rel, (stamp, result) in zip(stale, results):
+                entries[rel] = {"stamp": stamp, "result": result}
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.entries = entries
+        self._save_cache()
+        return self
+
+    def _save_cache(self):
+        if self.cache_path is None:
+            return
+        try:
+            write_json(self.cache_path, {"version": _CACHE_VERSION, "files": self.entries})
+        except OSError:
+            pass  # a read-only share just means no cache next time
+
+    def report(self):
+        return shop_report(
+            (tech_name(rel), e["result"])
+            for rel, e in sorted(self.entries.items()) if e.get("result") is not None
+        )
+
+
+def shop_report(results):
+    # results: [(tech, {key: units})]; a tech with several files (two benches) is summed.
+    # {"techs": [...] ranked by weighted points, "families": [...], "units", "points"}
+    techs = {}
+    for tech, result in results:
+        counts = techs.setdefault(tech, [0] * len(KEYS))
+        for key, n in result.items():
+            if key in KEY_INDEX:
+                counts[KEY_INDEX[key]] += n
+    shop = [0] * len(KEYS)
+    board = []
+    for tech, counts in techs.items():
+        shop = [a + b for a, b in zip(shop, counts)]
+        board.append({
+            "tech": tech,
+            "units": sum(counts),
+            "points": sum(n * q for n, q in zip(counts, QUARTERS)) / 4,
+            "families": {name: pts for name, _units, pts in _family_totals(counts) if pts},
+        })
+    board.sort(key=lambda t: (-t["points"], t["tech"]))
+    for rank, t in enumerate(board, 1):
+        t["rank"] = rank
+    return {
+        "techs": board,
+        "families": [{"family": name, "units": units, "points": pts} for name, units, pts in _family_totals(shop)],
+        "units": sum(t["units"] for t in board),
+        "points": sum(t["points"] for t in board),
+    }
+
+
+def _family_totals(counts):
+    out = []
+    for fam in FAMILIES:
+        units = sum(counts[c.index] for c in fam.categories)
+        quarters = sum(counts[c.index] * QUARTERS[c.index] for c in fam.categories)
+        out.append((fam.name, units, quarters / 4))
+    return out
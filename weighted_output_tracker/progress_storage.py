@@ -0,0 +1,681 @@
+import csv
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+
+from progress_buckets import day_bucket_keys, hour_cutoff
+from progress_files import file_stamp
+from progress_history import zero_day
+from progress_journal import ProgressJournal, write_rows, write_snapshot
+from progress_lock import FileLock
+from tracker_config import load_config
+from tracker_state import TrackerState, load_adjustments, merge_adjustments
+from unit_registry import CATEGORIES, CATEGORY_INDEX, COUNT_FIELDS, KEYS, N_CATEGORIES, PARENT_KEYS, QUARTERS
+
+
+# This station's own PN-counter halves per category (see progress_replicas)
+PN_FIELDS = [f"{half}:{key}" for half in ("added", "removed") for key in KEYS]
+STATE_FIELDS = ["output", "weighted_output", *COUNT_FIELDS, "start_date", "start_of_day_output", "bucket_adjust",
+                *PN_FIELDS]
+# Counters that merge by adding differences; the remaining fields are set outright
+ADDITIVE_FIELDS = ["output", "weighted_output", *COUNT_FIELDS, *PN_FIELDS]
+# One row per day with activity; journal_seq marks the last journal record folded in
+HISTORY_FIELDS = ["day", *KEYS, "weighted_output", "journal_seq"]
+# Same layout keyed by "kind:label" time bucket (progress_buckets)
+BUCKET_FIELDS = ["bucket", *KEYS, "weighted_output", "journal_seq"]
+
+# Other processes' events folded into the in-memory views one by one; past this many
+# the views are rebuilt from storage instead
+CHANGES_MAX = 10_000
+
+# Selects the backend when open_storage() is not told which one to use
+STORAGE_ENV = "WEIGHTED_OUTPUT_STORAGE"
+
+
+def _add_events(vectors, key, events):
+    vec = vectors.setdefault(key, zero_day())
+    for unit, warranty, delta, points in events:
+        vec[CATEGORY_INDEX[(unit, warranty)]] += delta
+        vec[-1] += round(points * 4)
+
+
+def _add_vector(vectors, key, vec):
+    cur = vectors.setdefault(key, zero_day())
+    for i, v in enumerate(vec):
+        if v:
+            cur[i] += v
+
+
+def _folder(vectors, key_of):
+    # Journal replay callback adding each record into vectors[key] for every key_of(when)
+    def fold(when, index, delta, quarters):
+        for key in key_of(when):
+            vec = vectors.setdefault(key, zero_day())
+            vec[index] += delta
+            vec[-1] += quarters
+    return fold
+
+
+def _diff_into(changes, old, new):
+    # Add (new - old) per key into changes. Keys only in `old` were pruned (old hour
+    # buckets), not un-recorded, so they are left alone.
+    for key, vec in new.items():
+        was = old.get(key)
+        delta = vec if was is None else [v - w for v, w in zip(vec, was)]
+        if any(delta):
+            _add_vector(changes, key, delta)
+
+
+def _calendar_day(when):
+    return when.date()
+
+
+def _live_buckets(buckets):
+    # Hour buckets are only kept for a few weeks; every other kind is kept
+    cutoff = hour_cutoff(date.today())
+    return sorted((k, vec) for k, vec in buckets.items() if not k.startswith("hour:") or k >= cutoff)
+
+
+def _increments(events):
+    # {counter key: amount} the events add, family totals included
+    inc = {"output": 0, "weighted_output": 0.0}
+    for unit, warranty, delta, points in events:
+        key = KEYS[CATEGORY_INDEX[(unit, warranty)]]
+        inc["output"] += delta
+        inc["weighted_output"] += points
+        inc[key] = inc.get(key, 0) + delta
+        half = f"{'added' if delta > 0 else 'removed'}:{key}"
+        inc[half] = inc.get(half, 0) + abs(delta)
+        if key in PARENT_KEYS:
+            inc[PARENT_KEYS[key]] = inc.get(PARENT_KEYS[key], 0) + delta
+    return inc
+
+
+class CsvStorage:
+    # Single-row output_progress.csv snapshot plus an append-only journal;
+    # per-day and per-bucket totals are folded into output_history.csv and
+    # output_buckets.csv with each snapshot.
+    # Several processes may share the files: writes happen under output_progress.lock,
+    # and the journal sequence number doubles as the version counter. A writer that
+    # finds someone else's records on disk merges its own changes into them.
+    kind = "csv"
+
+    def __init__(self, base_dir):
+        self.path = base_dir / "output_progress.csv"
+        self.history_path = base_dir / "output_history.csv"
+        self.buckets_path = base_dir / "output_buckets.csv"
+        self.journal = ProgressJournal(base_dir / "output_progress.journal")
+        self.lock = FileLock(base_dir / "output_progress.lock")
+        # All owned by whichever thread writes
+        self.days = {}  # {date: per-day vector}
+        self.buckets = {}  # {"kind:label": vector}
+        # What the files hold, and our own state as of our last write. Every snapshot writes
+        # disk_state plus (ours - synced), so another process's records are never overwritten.
+        self.disk_state = TrackerState()
+        self.synced = TrackerState()
+        self.disk_stamp = None  # (snapshot, journal) stat after our last read/write
+        self.stale = False  # other writers' records are on disk but not in days/buckets
+        self.foreign = False  # ... and not yet picked up by refresh()
+        # Journal records up to seen_seq are in days/buckets, and so are our own later
+        # ones (own_seqs ranges); refresh() then only reads the records past it
+        self.seen_seq = 0
+        self.own_seqs = []
+        # Other processes' units folded into days/buckets since take_changes()
+        self.changes = ({}, {})
+        # when -> bucket keys, set by the engine before load(); None keeps no buckets
+        self.bucketer = None
+        # when -> the work day it counts toward (tracker_config's day_boundary), set by the engine
+        self.work_day = _calendar_day
+
+    @property
+    def version(self):
+        return self.journal.seq
+
+    def load(self):
+        state = self.refresh()
+        self.changes = ({}, {})
+        return state
+
+    def refresh(self):
+        # Pick up other processes' writes; the caller adopts the result, so it becomes our
+        # baseline too. While the snapshot is the one we last saw they can only have
+        # appended journal records, and just those are read.
+        with self.lock:
+            if self.disk_stamp is not None and file_stamp(self.path) == self.disk_stamp[0]:
+                state = self.disk_state.copy()
+                self._fold_foreign(state)
+            else:
+                state = self._reread()
+            self.disk_stamp = self._stamp()
+            self.stale = self.foreign = False
+            self.disk_state = state.copy()
+            self.synced = state.copy()
+        return state
+
+    def take_changes(self):
+        # ({day: vector}, {bucket key: vector}) of other processes' units since the last
+        # call, for the caller's in-memory views
+        changes, self.changes = self.changes, ({}, {})
+        return changes
+
+    def _reread(self):
+        # _read() into days/buckets, keeping what other processes added as changes
+        old_days, old_buckets = self.days, self.buckets
+        state, self.days, self.buckets = self._read()
+        _diff_into(self.changes[0], old_days, self.days)
+        _diff_into(self.changes[1], old_buckets, self.buckets)
+        return state
+
+    def _fold_foreign(self, state):
+        # Journal records past seen_seq that are not ours, into state, days, buckets, changes
+        own = self.own_seqs
+        days, buckets = self.changes
+        for seq, when, index, delta, points in self.journal.records(self.seen_seq):
+            self.journal.seq = max(self.journal.seq, seq)
+            if any(lo <= seq <= hi for lo, hi in own):
+                continue
+            state.add(index, delta, points)
+            vec = zero_day()
+            vec[index] = delta
+            vec[-1] = round(points * 4)
+            day = self.work_day(when)
+            _add_vector(self.days, day, vec)
+            _add_vector(days, day, vec)
+            if self.bucketer is not None:
+                for key in self.bucketer(when):
+                    _add_vector(self.buckets, key, vec)
+                    _add_vector(buckets, key, vec)
+            self.journal.pending += 1
+        self.seen_seq = self.journal.seq
+        self.own_seqs = []
+
+    def changed_on_disk(self):
+        # Cheap poll for other processes' writes: two stat calls
+        return self.foreign or self._stamp() != self.disk_stamp
+
+    def _read(self):
+        # (state, days, buckets) as the files hold them now; also moves the journal seq
+        state = None
+        snapshot_seq = 0
+        if self.path.exists():
+            try:
+                with self.path.open(newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        state = TrackerState.from_dict(row)
+                        snapshot_seq = int(row.get("journal_seq") or 0)
+                        break
+            except Exception:
+                state = None
+                snapshot_seq = 0
+        if state is None:
+            state = TrackerState()
+        days, days_seq = _load_vectors(self.history_path, "day", date.fromisoformat)
+        buckets, buckets_seq = _load_vectors(self.buckets_path, "bucket", str)
+        # Replay unit events recorded since the snapshot (and aggregates) were written
+        folds = [(days_seq, _folder(days, lambda when: [self.work_day(when)]))]
+        if self.bucketer is not None:
+            folds.append((buckets_seq, _folder(buckets, self.bucketer)))
+        self.journal.replay(state, snapshot_seq, folds)
+        self.seen_seq = self.journal.seq
+        self.own_seqs = []
+        return state, days, buckets
+
+    def _stamp(self):
+        return file_stamp(self.path), file_stamp(self.journal.path)
+
+    def _catch_up(self):
+        # Under the lock: True if another process wrote since we last looked. Its journal
+        # records (or its snapshot's journal_seq) then move our sequence number past theirs,
+        # so appended records never collide. A stat pair is all it costs when nobody did.
+        if self._stamp() == self.disk_stamp:
+            return False
+        seq = self.journal.last_seq()
+        try:
+            with self.path.open(newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    seq = max(seq, int(row.get("journal_seq") or 0))
+                    break
+        except (OSError, ValueError):
+            pass
+        self.journal.seq = max(self.journal.seq, seq)
+        self.stale = self.foreign = True
+        return True
+
+    def history_rows(self):
+        # The caller rebuilds its views from these, so no change is outstanding after it
+        self.changes = ({}, {})
+        return sorted((day, vec[:]) for day, vec in self.days.items())
+
+    def bucket_rows(self):
+        return {key: vec[:] for key, vec in self.buckets.items()}
+
+    def save(self, state):
+        # Full snapshot; folds every journaled event into the history, bucket and snapshot
+        # CSVs. The aggregates go first: their journal_seq is never behind the snapshot's.
+        with self.lock:
+            if self._catch_up() or self.stale:
+                # Someone else wrote too: pick up their records (ours are in there as well)
+                self.disk_state = self._reread()
+            ours = state
+            state = self.disk_state.copy()
+            state.merge(self.synced, ours)
+            seq = self.journal.seq
+            write_rows(self.history_path, HISTORY_FIELDS, [
+                {"day": day.isoformat(), **dict(zip(KEYS, vec)), "weighted_output": vec[-1] / 4, "journal_seq": seq}
+                for day, vec in sorted(self.days.items())
+            ])
+            if self.bucketer is not None:
+                self.buckets = dict(_live_buckets(self.buckets))
+                write_rows(self.buckets_path, BUCKET_FIELDS, [
+                    {"bucket": key, **dict(zip(KEYS, vec)), "weighted_output": vec[-1] / 4, "journal_seq": seq}
+                    for key, vec in sorted(self.buckets.items())
+                ])
+            row = state.as_dict(STATE_FIELDS)
+            row["start_date"] = state.start_date or date.today().isoformat()
+            row["journal_seq"] = seq
+            write_snapshot(self.path, STATE_FIELDS + ["journal_seq"], row)
+            self.journal.truncate()
+            self.seen_seq = seq
+            self.own_seqs = []
+            self.disk_stamp = self._stamp()
+            self.stale = False
+            self.disk_state = state
+            self.synced = ours.copy()
+
+    def import_history(self, state, rows):
+        # Bulk import: rows [(date, per-day vector)] go into the day (and week) totals and
+        # `state`, which already counts them, is snapshotted in the same locked write
+        with self.lock:
+            if self._catch_up() or self.stale:
+                self.disk_state = self._reread()
+                self.disk_stamp = self._stamp()
+                self.stale = False
+            for day, vec in rows:
+                _add_vector(self.days, day, vec)
+                if self.bucketer is not None:
+                    for key in day_bucket_keys(day):
+                        _add_vector(self.buckets, key, vec)
+            self.save(state)
+
+    def record(self, state, events, when=None):
+        # Append just the changed units, made at `when` (default now); snapshot once the
+        # journal grows long
+        when = when or datetime.now()
+        with self.lock:
+            self._catch_up()
+            first = self.journal.seq + 1
+            self.journal.append(events, when)
+            if self.stale:
+                # records of others sit below ours, unread: refresh() skips just ours
+                self.own_seqs.append((first, self.journal.seq))
+            else:
+                self.seen_seq = self.journal.seq
+            self.disk_stamp = self._stamp()
+            _add_events(self.days, self.work_day(when), events)
+            if self.bucketer is not None:
+                for key in self.bucketer(when):
+                    _add_events(self.buckets, key, events)
+            # events are on disk now; only later edits count as our unsaved difference
+            _advance(self.disk_state, events)
+            _advance(self.synced, events)
+            if self.journal.needs_compaction():
+                self.save(state)
+
+    def close(self):
+        pass
+
+
+def _advance(state, events):
+    for unit, warranty, delta, points in events:
+        state.add(CATEGORY_INDEX[(unit, warranty)], delta, points)
+
+
+def _load_vectors(path, key_field, parse_key):
+    # ({key: vector}, journal_seq) from an output_history.csv-style file
+    vectors = {}
+    seq = 0
+    if not path.exists():
+        return vectors, 0
+    try:
+        with path.open(newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                vec = zero_day()
+                for i, key in enumerate(KEYS):
+                    vec[i] = int(row.get(key) or 0)
+                vec[-1] = round(float(row.get("weighted_output") or 0.0) * 4)
+                vectors[parse_key(row[key_field])] = vec
+                seq = int(row.get("journal_seq") or 0)
+    except (OSError, KeyError, ValueError):
+        return {}, 0
+    return vectors, seq
+
+
+class SqliteStorage:
+    # WAL-mode database: one row per unit event plus materialized counters.
+    # Counters are only ever moved by relative UPDATEs inside a transaction, and each
+    # write bumps counters.version, so several processes can share one database.
+    kind = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            ts TEXT NOT NULL,
+            day TEXT NOT NULL,
+            unit TEXT NOT NULL,
+            warranty TEXT NOT NULL,
+            delta INTEGER NOT NULL,
+            points REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS events_day ON events (day);
+        CREATE INDEX IF NOT EXISTS events_category ON events (unit, warranty, day);
+        CREATE TABLE IF NOT EXISTS counters (
+            key TEXT PRIMARY KEY,
+            value
+        );
+        -- per time bucket: slot 0..n-1 category counts, slot n quarter-points
+        CREATE TABLE IF NOT EXISTS buckets (
+            bucket TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (bucket, slot)
+        );
+    """
+    COUNTER_ADD = (
+        "INSERT INTO counters (key, value) VALUES (?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value"
+    )
+    COUNTER_SET = (
+        "INSERT INTO counters (key, value) VALUES (?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+    )
+    # Adds onto a bucket's stored totals
+    BUCKET_UPSERT = (
+        "INSERT INTO buckets (bucket, slot, value) VALUES (?, ?, ?) "
+        "ON CONFLICT (bucket, slot) DO UPDATE SET value = value + excluded.value"
+    )
+
+    def __init__(self, base_dir, legacy=None):
+        self.path = base_dir / "output_progress.db"
+        self.legacy = legacy
+        self.conn = self._connect()
+        self.conn.executescript(self.SCHEMA)
+        self._reader = None
+        self.bucketer = None
+        self.work_day = _calendar_day
+        self.synced = TrackerState()  # our state as of the last write; save() sends the difference
+        self.data_version = None
+        # Events up to seen_id are in the caller's views (history_rows), and so are our own
+        # later ones (own_ids ranges). None: no views yet, or another process imported
+        # history (its buckets don't follow from the events), so they must be rebuilt.
+        self.seen_id = None
+        self.own_ids = []
+        self.imports = 0
+        self.changes = None
+
+    def _connect(self, readonly=False):
+        if readonly:
+            conn = sqlite3.connect(f"{self.path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # WAL lets reports read while the GUI keeps writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def load(self):
+        rows = dict(self.conn.execute("SELECT key, value FROM counters"))
+        if not rows and self.legacy is not None:
+            self._import_legacy()
+        return self.refresh()
+
+    def refresh(self):
+        self.data_version = self._data_version()
+        # counters and new events from one read transaction, so they agree
+        self.conn.execute("BEGIN")
+        try:
+            rows = dict(self.conn.execute("SELECT key, value FROM counters"))
+            self.changes = self._foreign_changes(rows.get("imports") or 0)
+        finally:
+            self.conn.commit()
+        state = TrackerState.from_dict(rows)
+        if rows and not any(k in rows for k in PN_FIELDS):
+            # counters from before per-station halves: keep the ones from_dict seeded
+            with self.conn:
+                self.conn.executemany(self.COUNTER_SET, [(k, state.get(k)) for k in PN_FIELDS])
+        self.synced = state.copy()
+        return state
+
+    def _foreign_changes(self, imports):
+        # ({day: vector}, {bucket key: vector}) of other processes' events past seen_id,
+        # or None when the views have to be rebuilt
+        if self.seen_id is None or imports != self.imports:
+            return None
+        own = self.own_ids
+        days, buckets = {}, {}
+        rows = self.conn.execute(
+            "SELECT id, ts, day, unit, warranty, delta, points FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (self.seen_id, CHANGES_MAX + 1),
+        ).fetchall()
+        if len(rows) > CHANGES_MAX:
+            return None
+        for row_id, ts, day, unit, warranty, delta, points in rows:
+            self.seen_id = row_id
+            index = CATEGORY_INDEX.get((unit, warranty))
+            if index is None or any(lo <= row_id <= hi for lo, hi in own):
+                continue
+            vec = zero_day()
+            vec[index] = delta
+            vec[-1] = round(points * 4)
+            _add_vector(days, date.fromisoformat(day), vec)
+            if self.bucketer is not None:
+                for key in self.bucketer(datetime.fromisoformat(ts)):
+                    _add_vector(buckets, key, vec)
+        self.own_ids = []
+        return days, buckets
+
+    def take_changes(self):
+        # What refresh() found other processes added, for the caller's in-memory views;
+        # None means rebuild them from history_rows()/bucket_rows()
+        changes, self.changes = self.changes, None
+        return changes
+
+    def changed_on_disk(self):
+        # data_version moves only when another connection commits
+        return self._data_version() != self.data_version
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _import_legacy(self):
+        # First run on SQLite: carry over the existing CSV totals. The write lock is taken
+        # up front so a second process starting at the same moment imports nothing twice.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("SELECT 1 FROM counters LIMIT 1").fetchone():
+                self.conn.commit()
+                return
+            self.legacy.bucketer = self.bucketer
+            self.legacy.work_day = self.work_day
+            state = self.legacy.load()
+            self._import_days(self.legacy.history_rows())
+            self._add_buckets(self.legacy.bucket_rows().items())
+            self.conn.executemany(self.COUNTER_SET, [(k, state.get(k, 0)) for k in STATE_FIELDS])
+            self.conn.execute(self.COUNTER_ADD, ("version", 1))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def _import_days(self, rows):
+        # Legacy per-day totals become one synthetic event per day and category
+        events = []
+        for day, vec in rows:
+            for cat in CATEGORIES:
+                n = vec[cat.index]
+                if n:
+                    events.append((f"{day.isoformat()}T00:00:00", day.isoformat(), cat.unit, cat.warranty,
+                                   n, n * QUARTERS[cat.index] / 4))
+        self.conn.executemany(
+            "INSERT INTO events (ts, day, unit, warranty, delta, points) VALUES (?, ?, ?, ?, ?, ?)",
+            events,
+        )
+
+    def history_rows(self):
+        # Also the baseline for refresh(): later events are read by id from here on
+        days = {}
+        self.conn.execute("BEGIN")
+        try:
+            self.seen_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+            row = self.conn.execute("SELECT value FROM counters WHERE key = 'imports'").fetchone()
+            self.imports = row[0] if row else 0
+            for day, unit, warranty, n, points in self.conn.execute(
+                "SELECT day, unit, warranty, SUM(delta), SUM(points) FROM events GROUP BY day, unit, warranty"
+            ):
+                index = CATEGORY_INDEX.get((unit, warranty))
+                if index is None:
+                    continue
+                vec = days.setdefault(date.fromisoformat(day), zero_day())
+                vec[index] += n
+                vec[-1] += round(points * 4)
+        finally:
+            self.conn.commit()
+        self.own_ids = []
+        self.changes = None
+        return sorted(days.items())
+
+    def bucket_rows(self):
+        buckets = {}
+        for bucket, slot, value in self.conn.execute("SELECT bucket, slot, value FROM buckets"):
+            if 0 <= slot <= N_CATEGORIES:
+                buckets.setdefault(bucket, zero_day())[slot] = value
+        return buckets
+
+    def _add_buckets(self, rows):
+        # rows: [(bucket key, vector)] added onto the stored totals; caller commits
+        self.conn.executemany(
+            self.BUCKET_UPSERT,
+            [(key, slot, v) for key, vec in rows for slot, v in enumerate(vec) if v],
+        )
+
+    def save(self, state):
+        with self.conn:
+            self._write_state(state)
+            self.conn.execute(
+                "DELETE FROM buckets WHERE bucket LIKE 'hour:%' AND bucket < ?", (hour_cutoff(date.today()),)
+            )
+        self.synced = state.copy()
+
+    def _write_state(self, state):
+        # Merge, don't overwrite: counters move by what changed since our last write,
+        # and only the settings we edited (start of day, bucket corrections) are replaced
+        synced = self.synced
+        adds = [(k, state.get(k, 0) - synced.get(k, 0)) for k in ADDITIVE_FIELDS]
+        sets = [(k, state.get(k, 0)) for k in STATE_FIELDS
+                if k not in ADDITIVE_FIELDS and k != "bucket_adjust" and state.get(k, 0) != synced.get(k, 0)]
+        self.conn.executemany(self.COUNTER_ADD, [(k, d) for k, d in adds if d])
+        self.conn.executemany(self.COUNTER_SET, sets)
+        self.conn.execute(self.COUNTER_ADD, ("version", 1))
+        if state.bucket_adjust != synced.bucket_adjust:
+            # one JSON value holds every bucket's correction: merge key by key, like the CSV
+            # snapshot, so another station's corrections to other buckets survive. Read after
+            # the writes above, so this transaction already holds the write lock.
+            row = self.conn.execute("SELECT value FROM counters WHERE key = 'bucket_adjust'").fetchone()
+            adjust = load_adjustments(row[0] if row else "")
+            merge_adjustments(adjust, synced.bucket_adjust, state.bucket_adjust)
+            self.conn.execute(self.COUNTER_SET, ("bucket_adjust", json.dumps(adjust) if adjust else ""))
+
+    def import_history(self, state, rows):
+        # Bulk import: one transaction adds the days as events, their day/week buckets and
+        # the counters `state` gained from them
+        with self.conn:
+            self._import_days(rows)
+            self._add_buckets([(key, vec) for day, vec in rows for key in day_bucket_keys(day)])
+            self._write_state(state)
+            self.conn.execute(self.COUNTER_ADD, ("imports", 1))
+        self.synced = state.copy()
+
+    def record(self, state, events, when=None):
+        if not events:
+            return
+        when = when or datetime.now()
+        stamp = when.isoformat(timespec="seconds")
+        day = self.work_day(when).isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO events (ts, day, unit, warranty, delta, points) VALUES (?, ?, ?, ?, ?, ?)",
+                [(stamp, day, unit, warranty, delta, points) for unit, warranty, delta, points in events],
+            )
+            self._own(len(events))
+            self.conn.executemany(self.COUNTER_ADD, list(_increments(events).items()))
+            self.conn.execute(self.COUNTER_ADD, ("version", 1))
+            if self.bucketer is not None:
+                totals = {}
+                _add_events(totals, None, events)
+                self.conn.executemany(
+                    self.BUCKET_UPSERT,
+                    [(key, slot, v) for key in self.bucketer(when) for slot, v in enumerate(totals[None]) if v],
+                )
+        _advance(self.synced, events)
+
+    def _own(self, n):
+        # In the write transaction: the ids our last n inserts got are contiguous and end at
+        # MAX(id). Right after seen_id they just move it; else refresh() must skip them.
+        if self.seen_id is None:
+            return
+        last = self.conn.execute("SELECT MAX(id) FROM events").fetchone()[0]
+        first = last - n + 1
+        if first == self.seen_id + 1 and not self.own_ids:
+            self.seen_id = last
+        elif self.own_ids and self.own_ids[-1][1] == first - 1:
+            self.own_ids[-1] = (self.own_ids[-1][0], last)
+        else:
+            self.own_ids.append((first, last))
+
+    # ---- history queries (read-only connection, never blocks the writer) ----
+    def reader(self):
+        if self._reader is None:
+            self._reader = self._connect(readonly=True)
+        return self._reader
+
+    def totals_between(self, start_day, end_day, unit=None, warranty=None):
+        # {(unit, warranty): (units, points)} for events with start_day <= day <= end_day
+        sql = "SELECT unit, warranty, SUM(delta), SUM(points) FROM events WHERE day BETWEEN ? AND ?"
+        args = [str(start_day), str(end_day)]
+        if unit is not None:
+            sql += " AND unit = ?"
+            args.append(unit)
+        if warranty is not None:
+            sql += " AND warranty = ?"
+            args.append(warranty)
+        sql += " GROUP BY unit, warranty"
+        return {(u, w): (n, p) for u, w, n, p in self.reader().execute(sql, args)}
+
+    def daily_totals(self, start_day, end_day):
+        # [(day, units, points)] in date order
+        return list(self.reader().execute(
+            "SELECT day, SUM(delta), SUM(points) FROM events WHERE day BETWEEN ? AND ? "
+            "GROUP BY day ORDER BY day",
+            (str(start_day), str(end_day)),
+        ))
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self.conn.close()
+
+
+def open_storage(base_dir, kind=None):
+    # kind: "csv" or "sqlite"; falls back to $WEIGHTED_OUTPUT_STORAGE, then to the
+    # "storage" setting in tracker_config.json, then to sqlite if a database already
+    # sits next to the tracker, else csv
+    kind = (kind or os.environ.get(STORAGE_ENV) or load_config(base_dir).get("storage") or "").strip().lower()
+    if not kind:
+        kind = "sqlite" if (base_dir / "output_progress.db").exists() else "csv"
+    if kind == "sqlite":
+        return SqliteStorage(base_dir, legacy=CsvStorage(base_dir))
+    if kind == "csv":
+        return CsvStorage(base_dir)
+    raise ValueError(f"Unknown storage backend: {kind!r} (expected 'csv' or 'sqlite')")
@@ -0,0 +1,150 @@
+import json
+from collections import deque, namedtuple
+
+from progress_files import file_stamp, write_json
+from progress_lock import FileLock
+
+
+UNDO_NAME = "output_undo.json"
+UNDO_LOCK = "output_undo.lock"
+
+# Commands kept on each of the undo and redo stacks
+UNDO_LIMIT = 200
+
+# kind:
+#   "units"  - delta: ((category index, signed count), ...) recorded as unit events
+#   "counts" - delta: same shape, a breakdown edit (moves counters, no events)
+#   "start"  - key: the work day (start_date) it edited, before/after: start_of_day_output
+#   "adjust" - key: "kind:label" bucket, before/after: its correction (0 = none)
+_Command = namedtuple("Command", "kind label delta key before after", defaults=((), None, 0, 0))
+
+
+class Command(_Command):
+    __slots__ = ()
+
+    def inverse(self):
+        # O(touched categories): negate the delta, swap before/after
+        return self._replace(
+            delta=tuple((i, -d) for i, d in self.delta),
+            before=self.after,
+            after=self.before,
+        )
+
+    def to_json(self):
+        return [self.kind, self.label, [list(p) for p in self.delta], self.key, self.before, self.after]
+
+    @classmethod
+    def from_json(cls, data):
+        kind, label, delta, key, before, after = data
+        return cls(str(kind), str(label), tuple((int(i), int(d)) for i, d in delta), key, int(before), int(after))
+
+
+def sparse(delta):
+    # Dense KEYS-order vector -> ((index, value), ...) for the non-zero entries
+    return tuple((i, d) for i, d in enumerate(delta) if d)
+
+
+def dense(pairs, n):
+    vec = [0] * n
+    for i, d in pairs:
+        vec[i] += d
+    return vec
+
+
+class UndoStack:
+    # Bounded undo/redo history shared by every process on the data folder (GUI, CLI,
+    # daemon); the oldest commands fall off past `limit`. Changes are kept as ops and
+    # folded into the file under its lock, so a process never overwrites commands another
+    # one pushed or undid in the meantime.
+    def __init__(self, path=None, limit=UNDO_LIMIT):
+        self.path = path
+        self.lock = FileLock(path.with_name(UNDO_LOCK)) if path is not None else None
+        self.limit = limit
+        self.undo = deque(maxlen=limit)
+        self.redo = deque(maxlen=limit)
+        # changes not yet handed to write(): ("push", command) or ("move" / "drop",
+        # "undo" / "redo", command)
+        self.ops = []
+        self.stamp = None  # file stat after our last read or write
+        self.foreign = False  # another process wrote the file since we last read it
+
+    def push(self, command):
+        # A new change invalidates anything that could be redone
+        self._op(("push", command))
+
+    def moved(self, source, target):
+        # Shift the top command between stacks once it has been undone/redone
+        self._op(("move", self._name(source), source[-1]))
+
+    def dropped(self, source):
+        # Discard the top command unapplied
+        self._op(("drop", self._name(source), source[-1]))
+
+    def _name(self, stack):
+        return "undo" if stack is self.undo else "redo"
+
+    def _op(self, op):
+        _apply(self.undo, self.redo, op)
+        self.ops.append(op)
+
+    def take_ops(self):
+        ops, self.ops = self.ops, []
+        return ops
+
+    def changed_on_disk(self):
+        return self.path is not None and (self.foreign or file_stamp(self.path) != self.stamp)
+
+    def load(self):
+        # (Re)read the shared file; ops not yet taken are re-applied on top
+        if self.path is None:
+            return self
+        self.foreign = False
+        self.stamp = file_stamp(self.path)
+        undo, redo = self._read()
+        self.undo.clear()
+        self.redo.clear()
+        self.undo.extend(undo)
+        self.redo.extend(redo)
+        for op in self.ops:
+            _apply(self.undo, self.redo, op)
+        return self
+
+    def _read(self):
+        if not self.path.exists():
+            return [], []
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                data = json.load(f)
+            return ([Command.from_json(c) for c in data.get("undo", [])],
+                    [Command.from_json(c) for c in data.get("redo", [])])
+        except (OSError, ValueError, TypeError, AttributeError):
+            return [], []  # unreadable history just starts empty
+
+    def write(self, ops):
+        # Fold ops into the file (writer thread). Commands other processes wrote are kept
+        # and flagged for the next load().
+        if self.path is None:
+            return
+        with self.lock:
+            if file_stamp(self.path) != self.stamp:
+                self.foreign = True
+            undo, redo = self._read()
+            undo, redo = deque(undo, maxlen=self.limit), deque(redo, maxlen=self.limit)
+            for op in ops:
+                _apply(undo, redo, op)
+            write_json(self.path, {"undo": [c.to_json() for c in undo], "redo": [c.to_json() for c in redo]})
+            self.stamp = file_stamp(self.path)
+
+
+def _apply(undo, redo, op):
+    if op[0] == "push":
+        undo.append(op[1])
+        redo.clear()
+        return
+    what, name, command = op
+    source, target = (undo, redo) if name == "undo" else (redo, undo)
+    if not source or source[-1] != command:
+        return  # another process already moved or dropped it
+    source.pop()
+    if what == "move":
+        target.append(command)
@@ -0,0 +1,207 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+# A batch closes this long after its first change, or at BATCH_MAX changes, whichever
+# comes first, so a steady stream of changes still reaches disk
+COALESCE_SECONDS = 0.05
+BATCH_MAX = 256
+MAX_QUEUED = 256
+
+_STOP = object()
+
+
+class WriteLatency:
+    # Running timings of the storage writes (seconds); read by the metrics endpoint
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.last = seconds
+        self.max = max(self.max, seconds)
+        self.total += seconds
+        self.count += 1
+
+
+class DirectWriter:
+    # Synchronous counterpart of WriteBehind for the CLI: writes straight through, timed
+    def __init__(self, storage):
+        self.storage = storage
+        self.latency = WriteLatency()
+
+    def record(self, state, events, when=None):
+        start = time.perf_counter()
+        self.storage.record(state, events, when)
+        self.latency.add(time.perf_counter() - start)
+
+    def save(self, state):
+        start = time.perf_counter()
+        self.storage.save(state)
+        self.latency.add(time.perf_counter() - start)
+
+    def call(self, fn, *args):
+        fn(*args)
+
+
+class WriteBehind:
+    # Persists tracker changes on a background thread so callers never wait on disk.
+    # Changes queued close together are coalesced into one storage write.
+    def __init__(self, storage, coalesce=COALESCE_SECONDS, batch_max=BATCH_MAX, maxsize=MAX_QUEUED):
+        self.storage = storage
+        self.coalesce = coalesce
+        self.batch_max = batch_max
+        self.error = None  # last write failure, cleared by the next good write
+        self.latency = WriteLatency()
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._carry_runs = []
+        self._carry_state = None
+        self._carry_full = False
+        self._carry_calls = []
+        self._carry_count = 0
+        self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._thread.start()
+
+    # ---- producer side (Tk thread / CLI) ----
+    def record(self, state, events, when=None):
+        # `when` is the time of the change, not of the write: it picks the day and buckets
+        self._submit(state.copy(), list(events), False, when or datetime.now())
+
+    def save(self, state):
+        self._submit(state.copy(), [], True, None)
+
+    def call(self, fn, *args):
+        # Run fn(*args) on the writer thread after the writes queued before it: side files
+        # (undo history, replica file). Pass it copies, never objects the caller keeps changing.
+        self._submit(None, [], False, None, (fn, args))
+
+    def _submit(self, state, events, full, when, call=None):
+        with self._lock:
+            self._pending += 1
+        # Blocks only when the writer is MAX_QUEUED batches behind
+        self._queue.put((state, events, full, when, call))
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def retry(self):
+        # Nudge the writer to retry a failed batch without queuing new changes
+        if self._carrying():
+            self._queue.put((None, [], False, None, None))
+
+    def flush(self):
+        # Wait for every queued change; raises the write error if some are still not on disk
+        self._queue.join()
+        if self._carrying():
+            self._write([], None, False, [], 0)
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        # Raises like flush(); the thread then keeps running so the caller can retry
+        self.flush()
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # ---- writer thread ----
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.coalesce
+            while len(batch) < self.batch_max:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+            runs = []
+            calls = []
+            full = False
+            state = None
+            for st, ev, f, when, call in batch:
+                full = full or f
+                if st is not None:
+                    state = st
+                if call is not None:
+                    calls.append(call)
+                if not ev:
+                    continue
+                # changes filed under the same day and buckets share one storage write
+                slot = self._slot(when)
+                if runs and runs[-1][0] == slot:
+                    runs[-1][2].extend(ev)
+                    runs[-1][3] = st
+                else:
+                    runs.append([slot, when, list(ev), st])
+            try:
+                self._write(runs, state, full, calls, sum(1 for st, _ev, _f, _w, c in batch if st is not None or c))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _carrying(self):
+        return self._carry_state is not None or bool(self._carry_calls)
+
+    def _slot(self, when):
+        bucketer = self.storage.bucketer
+        return self.storage.work_day(when), tuple(bucketer(when)) if bucketer is not None else ()
+
+    def _write(self, runs, state, full, calls, count):
+        # Fold in anything left over from a failed attempt, then commit.
+        # runs: [[slot, when, events, state after them]], usually just one
+        runs = self._carry_runs + runs
+        if state is None:
+            state = self._carry_state
+        full = full or self._carry_full
+        calls = self._carry_calls + calls
+        count += self._carry_count
+        start = time.perf_counter()
+        try:
+            # each step is dropped from the carry once done, so a retry never re-records events
+            while runs:
+                _slot, when, events, run_state = runs[0]
+                self.storage.record(run_state, events, when)
+                runs.pop(0)
+            if full:
+                self.storage.save(state)
+                full = False
+            while calls:
+                fn, args = calls[0]
+                fn(*args)
+                calls.pop(0)
+        except Exception as exc:
+            # Keep the batch pending and retry it with the next write or flush
+            self.error = exc
+            self._carry_runs, self._carry_state = runs, state
+            self._carry_full, self._carry_calls, self._carry_count = full, calls, count
+            return
+        self.latency.add(time.perf_counter() - start)
+        self.error = None
+        self._carry_runs, self._carry_state = [], None
+        self._carry_full, self._carry_calls, self._carry_count = False, [], 0
+        with self._lock:
+            self._pending -= count
@@ -0,0 +1,50 @@
+import json
+from datetime import time
+
+from progress_files import write_json
+
+
+CONFIG_NAME = "tracker_config.json"
+
+DEFAULTS = {
+    # when the daily counters reset; later than 00:00 keeps an overnight shift on one day
+    "day_boundary": "00:00",
+    "shift_start": "07:00",
+    "shift_end": "15:30",
+    # weighted points per day; 0 means no target
+    "daily_target": 0.0,
+    # how quickly the live pace forgets older units
+    "pace_halflife_minutes": 45,
+    # identifies this station in replica files; generated on first start when empty
+    "station_id": "",
+    # local HTTP metrics endpoint for dashboards (/metrics, /metrics.json); 0 keeps it off
+    "metrics_port": 0,
+    "metrics_host": "127.0.0.1",
+    # "csv" or "sqlite"; empty picks sqlite when output_progress.db exists, else csv.
+    # $WEIGHTED_OUTPUT_STORAGE and the CLI's --storage override it.
+    "storage": "",
+}
+
+
+def load_config(base_dir):
+    # Settings next to the data files; missing or unreadable files fall back to DEFAULTS
+    config = dict(DEFAULTS)
+    path = base_dir / CONFIG_NAME
+    try:
+        with path.open(encoding="utf-8") as f:
+            loaded = json.load(f)
+    except (OSError, ValueError):
+        return config
+    if isinstance(loaded, dict):
+        config.update(loaded)
+    return config
+
+
+def save_config(base_dir, config):
+    write_json(base_dir / CONFIG_NAME, config, indent=2)
+
+
+def parse_clock(text):
+    # "HH:MM" -> datetime.time
+    hours, minutes = str(text).strip().split(":")
+    return time(int(hours), int(minutes))
@@ -0,0 +1,674 @@
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from progress_buckets import BUCKET_KINDS, BucketTable, bucket_keys, bucket_labels
+from progress_history import DayHistory, RollingWindows, day_vector
+from progress_metrics import MetricsServer
+from progress_pace import PaceTracker
+from progress_replicas import ReplicaSet, ensure_replica_id, own_counters, replica_file_name
+from progress_storage import open_storage
+from progress_undo import UNDO_NAME, Command, UndoStack, dense, sparse
+from progress_writer import DirectWriter, WriteBehind
+from tracker_config import DEFAULTS, load_config, parse_clock, save_config
+from unit_registry import CATEGORIES, CATEGORY_INDEX, FAMILIES, N_CATEGORIES, QUARTERS, events_for, family_vector
+
+
+def default_base_dir():
+    # Data files sit next to the executable when frozen, else next to the sources
+    if getattr(sys, "frozen", False):
+        return Path(sys.executable).parent
+    return Path(__file__).parent
+
+
+class TrackerEngine:
+    # Headless tracker: owns the state, scoring, validation and persistence.
+    # Front ends call these methods and show ValueError messages to the user.
+    def __init__(self, storage, background=False, base_dir=None):
+        self.storage = storage
+        # tracker_config.json lives next to the data; without a base_dir the defaults apply
+        self.base_dir = base_dir
+        self.config = load_config(base_dir) if base_dir is not None else dict(DEFAULTS)
+        # background=True hands writes to a WriteBehind thread (GUI); else writes are synchronous
+        self.writer = WriteBehind(storage) if background else None
+        self._sink = self.writer or DirectWriter(storage)
+        # Optional local HTTP endpoint (start_metrics); fed a state copy after every change
+        self.metrics = None
+        # Other stations' counters for PN-counter sync (progress_replicas). This station's
+        # id is only created once a replica file is written (see `replica`).
+        self.replicas = ReplicaSet(base_dir, self.config.get("station_id") or None).load()
+        # Storage files each event under the configured shift/hour/week buckets, and under
+        # the work day (day_boundary) rather than the calendar date
+        storage.bucketer = lambda when: bucket_keys(when, self.config)
+        storage.work_day = self.work_day
+        self.state = storage.load()
+        # Every change is pushed as a Command so it can be undone/redone, also after a restart
+        self.commands = UndoStack(base_dir / UNDO_NAME if base_dir is not None else None).load()
+        # Per-day counts for date-range totals; kept in step with every recorded event
+        self.history = DayHistory.from_rows(storage.history_rows())
+        self.buckets = BucketTable.from_rows(storage.bucket_rows())
+        self.rolling = RollingWindows(self.history, self.work_day())
+        self.pace = PaceTracker(*self._shift_bounds(self.work_day()), self.config["pace_halflife_minutes"])
+        # What our replica file last carried (or would have, as opened); save/close only
+        # rewrite it when that changed. Set before the rollover below, which saves.
+        self._replica_seen = self._replica_view()
+        self._reset_pace(seed=True)
+        self.ensure_start_of_day()
+
+    # ---- unit changes ----
+    def add(self, delta, label=None):
+        # delta: non-negative quantities in KEYS order; returns the number of units added
+        self._apply(_signed(self.state, "add", delta), label or f"add {sum(delta)} unit(s)")
+        return sum(delta)
+
+    def remove(self, delta, label=None):
+        # delta: non-negative quantities in KEYS order; returns the number of units removed
+        self._apply(_signed(self.state, "remove", delta), label or f"remove {sum(delta)} unit(s)")
+        return sum(delta)
+
+    def add_family(self, family, quantities):
+        return self.add(family_vector(family, quantities), f"add {sum(quantities)} {family.name}")
+
+    def remove_family(self, family, quantities):
+        return self.remove(family_vector(family, quantities), f"remove {sum(quantities)} {family.name}")
+
+    def apply_batch(self, entries, label=None):
+        # entries: [(action, delta)] with action "add" or "remove". Every entry is checked
+        # against a scratch copy first, so a bad entry leaves the state untouched; the
+        # whole batch is then persisted with a single storage write, and only once that
+        # succeeded does it reach the state and the day views (a failed write changes nothing).
+        self.ensure_start_of_day()
+        trial = self.state.copy()
+        signed = []
+        for n, (action, delta) in enumerate(entries, 1):
+            try:
+                signed.append(_signed(trial, action, delta))
+            except ValueError as exc:
+                raise ValueError(f"Entry {n}: {exc}") from None
+            trial.apply(signed[-1])
+        events = [event for delta in signed for event in events_for(delta)]
+        now = datetime.now()
+        if events:
+            self._sink.record(trial, events, now)
+        self.state = trial
+        net = [0] * N_CATEGORIES
+        for delta in signed:
+            self._log_day(delta, now)
+            net = [a + b for a, b in zip(net, delta)]
+        if events:
+            self._publish()
+        if any(net):
+            self.commands.push(Command("units", label or _batch_label(entries), sparse(net)))
+            self._save_undo()
+        return len(signed)
+
+    def _apply(self, delta, label):
+        # Cheap date check so a change made before a late rollover timer still lands on the right day
+        self.ensure_start_of_day()
+        self._record(delta)
+        self.commands.push(Command("units", label, sparse(delta)))
+        self._save_undo()
+
+    def _record(self, delta):
+        # Written first, adopted after: a write that raises leaves the state as it was
+        now = datetime.now()
+        state = self.state.copy()
+        state.apply(delta)
+        self._sink.record(state, events_for(delta), now)
+        self.state = state
+        self._log_day(delta, now)
+        self._publish()
+
+    def _log_day(self, delta, now):
+        # Every per-day view keys on the work day, as the rollover and storage do
+        vec = day_vector(delta)
+        today = self.work_day(now)
+        # rolling first: when it crosses into a new day it reads that day from the history
+        self.rolling.add(today, vec)
+        self.history.add_vector(today, vec)
+        self.buckets.add(bucket_labels(now, self.config), vec)
+        self.pace.add(now, sum(delta), vec[-1] / 4)
+
+    # ---- edits ----
+    def set_breakdown(self, counts):
+        total = self.state.output
+        if len(counts) != N_CATEGORIES:
+            raise ValueError(f"Expected {N_CATEGORIES} counts, got {len(counts)}.")
+        if any(n < 0 for n in counts):
+            raise ValueError("Values must be non-negative.")
+        if sum(counts) != total:
+            raise ValueError(f"Sum of entries ({sum(counts)}) must equal total output ({total}).")
+        diff = sparse([new - old for new, old in zip(counts, self.state.counts)])
+        if diff:
+            self._do(Command("counts", "breakdown edit", diff))
+
+    def set_start_of_day(self, value):
+        if value < 0:
+            raise ValueError("Value must be non-negative.")
+        self.ensure_start_of_day()
+        self._do(Command("start", "started-today edit", key=self.state.start_date,
+                         before=self.state.start_of_day_output, after=value))
+
+    def set_today_output(self, value):
+        # Moves start-of-day so that today's output reads `value`
+        if value < 0:
+            raise ValueError("Value must be non-negative.")
+        self.ensure_start_of_day()
+        self._do(Command("start", "today's output edit", key=self.state.start_date,
+                         before=self.state.start_of_day_output, after=max(0, self.state.output - value)))
+
+    # ---- undo / redo ----
+    def undo(self):
+        # Reverts the latest change, whichever process made it; returns its label, or None
+        # when there is nothing to undo
+        self.reload_undo()
+        self.ensure_start_of_day()
+        stack = self.commands
+        if not stack.undo:
+            return None
+        command = stack.undo[-1]
+        self._check_current(stack.undo, command, "undo")
+        self._execute(command.inverse(), f"Cannot undo {command.label}")
+        stack.moved(stack.undo, stack.redo)
+        self._save_undo()
+        return command.label
+
+    def redo(self):
+        self.reload_undo()
+        self.ensure_start_of_day()
+        stack = self.commands
+        if not stack.redo:
+            return None
+        command = stack.redo[-1]
+        self._check_current(stack.redo, command, "redo")
+        self._execute(command, f"Cannot redo {command.label}")
+        stack.moved(stack.redo, stack.undo)
+        self._save_undo()
+        return command.label
+
+    def reload_undo(self):
+        # Pick up commands another process pushed or undid; True if the stacks changed.
+        # Waits while our own writes are queued: the file does not have them yet.
+        if self.pending() or not self.commands.changed_on_disk():
+            return False
+        self.commands.load()
+        return True
+
+    def _check_current(self, source, command, verb):
+        # Start-of-day and bucket edits belong to the day or bucket they were made in;
+        # applied later they would move today's numbers. Such a command is dropped with
+        # an error, so the next undo/redo reaches the ones before it.
+        if command.kind == "start":
+            ended = "day" if command.key != self.state.start_date else None
+        elif command.kind == "adjust":
+            kind, _sep, label = command.key.partition(":")
+            ended = kind if label != self.current_bucket(kind) else None
+        else:
+            ended = None
+        if ended:
+            self.commands.dropped(source)
+            self._save_undo()
+            raise ValueError(f"Cannot {verb} {command.label}: the {ended} it changed is over.")
+
+    def can_undo(self):
+        return self.commands.undo[-1].label if self.commands.undo else None
+
+    def can_redo(self):
+        return self.commands.redo[-1].label if self.commands.redo else None
+
+    def _do(self, command):
+        # An edit that keeps the value it had (OK pressed without a change) is no undo step
+        if command.kind in ("start", "adjust") and command.before == command.after:
+            return
+        self._execute(command, "Cannot apply change")
+        self.commands.push(command)
+        self._save_undo()
+
+    def _execute(self, command, failure):
+        # Apply one command; unit commands go through the event log like any add/remove
+        if command.kind in ("units", "counts"):
+            delta = dense(command.delta, N_CATEGORIES)
+            problem = self.state.removal_problem([max(0, -d) for d in delta])
+            if problem:
+                raise ValueError(f"{failure}: {problem}")
+            if command.kind == "units":
+                self.ensure_start_of_day()
+                self._record(delta)
+                return
+            self.state.apply(delta)
+        elif command.kind == "start":
+            self.state.start_of_day_output = command.after
+        elif command.kind == "adjust":
+            if command.after:
+                self.state.bucket_adjust[command.key] = command.after
+            else:
+                self.state.bucket_adjust.pop(command.key, None)
+        self.save()
+
+    # ---- time buckets ----
+    def current_bucket(self, kind, now=None):
+        # Label of the `kind` bucket `now` falls in; None between shifts
+        _check_kind(kind)
+        return bucket_labels(now or datetime.now(), self.config).get(kind)
+
+    def bucket_output(self, kind, now=None):
+        # Units in the current bucket; the day bucket keeps its start-of-day baseline
+        if kind == "day":
+            return self.state.today_output()
+        label = self.current_bucket(kind, now)
+        if label is None:
+            return 0
+        units = sum(self.buckets.get(kind, label)[:N_CATEGORIES])
+        return max(0, units + self.state.bucket_adjust.get(f"{kind}:{label}", 0))
+
+    def bucket_start(self, kind, now=None):
+        # Total output when the current bucket began
+        return max(0, self.state.output - self.bucket_output(kind, now))
+
+    def set_bucket_output(self, kind, value, now=None):
+        # Correct the current bucket so its output reads `value`
+        if kind == "day":
+            self.set_today_output(value)
+            return
+        if value < 0:
+            raise ValueError("Value must be non-negative.")
+        label = self.current_bucket(kind, now)
+        if label is None:
+            raise ValueError(f"No {kind} is running right now.")
+        key = f"{kind}:{label}"
+        adjust = value - sum(self.buckets.get(kind, label)[:N_CATEGORIES])
+        self._do(Command("adjust", f"{kind} output edit", key=key,
+                         before=self.state.bucket_adjust.get(key, 0), after=adjust))
+
+    def set_bucket_start(self, kind, value, now=None):
+        if kind == "day":
+            self.set_start_of_day(value)
+            return
+        if value < 0:
+            raise ValueError("Value must be non-negative.")
+        self.set_bucket_output(kind, max(0, self.state.output - value), now)
+
+    def bucket_report(self, kind, limit=10):
+        # [(label, units, points)] for the most recent `kind` buckets, newest first
+        _check_kind(kind)
+        adjust = self.state.bucket_adjust
+        return [
+            (label, sum(vec[:N_CATEGORIES]) + adjust.get(f"{kind}:{label}", 0), vec[-1] / 4)
+            for label, vec in self.buckets.recent(kind, limit)
+        ]
+
+    def ensure_start_of_day(self):
+        # Roll the daily counters over once the work day has changed; True if it did.
+        # The save also folds the finished day into the persisted history.
+        today = self.work_day().isoformat()
+        if self.state.start_date == today:
+            return False
+        self.state.start_date = today
+        self.state.start_of_day_output = self.state.output
+        self.rolling.advance(self.work_day())
+        self._reset_pace()
+        self.save()
+        return True
+
+    def _boundary(self):
+        try:
+            return parse_clock(self.config["day_boundary"])
+        except (KeyError, ValueError):
+            return parse_clock(DEFAULTS["day_boundary"])
+
+    def work_day(self, now=None):
+        # Calendar date of the work day `now` falls in, given the configured day boundary
+        b = self._boundary()
+        return ((now or datetime.now()) - timedelta(hours=b.hour, minutes=b.minute)).date()
+
+    def next_rollover(self, now=None):
+        # When the current work day ends
+        return datetime.combine(self.work_day(now) + timedelta(days=1), self._boundary())
+
+    # ---- pace ----
+    def _shift_bounds(self, day):
+        try:
+            start, end = parse_clock(self.config["shift_start"]), parse_clock(self.config["shift_end"])
+        except (KeyError, ValueError):
+            start, end = parse_clock(DEFAULTS["shift_start"]), parse_clock(DEFAULTS["shift_end"])
+        start, end = datetime.combine(day, start), datetime.combine(day, end)
+        if end <= start:
+            end += timedelta(days=1)  # overnight shift
+        return start, end
+
+    def _reset_pace(self, seed=False):
+        # seed=True (startup) carries today's recorded units in as an average pace
+        start, end = self._shift_bounds(self.work_day())
+        if not seed:
+            self.pace.reset(start, end)
+            return
+        vec = self.history.day(self.work_day())
+        self.pace.reset(start, end, sum(vec[:N_CATEGORIES]), vec[-1] / 4, datetime.now())
+
+    def pace_summary(self, now=None):
+        # (units/hour, points/hour, projected points at shift end, shift end, daily target)
+        now = now or datetime.now()
+        units_rate, points_rate = self.pace.rates(now)
+        target = float(self.config.get("daily_target") or 0)
+        return units_rate, points_rate, self.pace.projection(now), self.pace.shift_end, target
+
+    def set_target(self, points):
+        if points < 0:
+            raise ValueError("Target must be non-negative.")
+        self.config["daily_target"] = points
+        if self.base_dir is not None:
+            save_config(self.base_dir, self.config)
+
+    # ---- scoring ----
+    def category_score(self, cat):
+        # (units, points) for one category
+        n = self.state.counts[cat.index]
+        return n, n * QUARTERS[cat.index] / 4
+
+    def family_score(self, family):
+        # (units, points) summed over the family's categories
+        counts = self.state.counts
+        units = sum(counts[c.index] for c in family.categories)
+        quarters = sum(counts[c.index] * QUARTERS[c.index] for c in family.categories)
+        return units, quarters / 4
+
+    def breakdown(self):
+        # [(family, units, points, [(category, units, points), ...]), ...] in registry order
+        return _breakdown(self.state.counts)
+
+    def range_totals(self, start, end):
+        # (units, points, per-category counts) recorded between two dates, inclusive
+        vec = self.history.range(start, end)
+        return sum(vec[:N_CATEGORIES]), vec[-1] / 4, vec[:N_CATEGORIES]
+
+    def daily_totals(self, start, end):
+        # [(date, units, points)] for each day in range with activity
+        return [(day, sum(vec[:N_CATEGORIES]), vec[-1] / 4) for day, vec in self.history.daily(start, end)]
+
+    def rolling_totals(self):
+        # [(days, units, points, points per worked day)] for each rolling window
+        self.rolling.advance(self.work_day())
+        out = []
+        for days in self.rolling.windows:
+            vec = self.rolling.sums[days]
+            worked = self.rolling.active[days]
+            pts = vec[-1] / 4
+            out.append((days, sum(vec[:N_CATEGORIES]), pts, pts / worked if worked else 0.0))
+        return out
+
+    def family_mix(self, days=30):
+        # [(family, share of weighted points)] over a rolling window, largest share first
+        self.rolling.advance(self.work_day())
+        vec = self.rolling.sums[days]
+        if vec[-1] <= 0:
+            return []
+        mix = []
+        for fam in FAMILIES:
+            quarters = sum(vec[c.index] * QUARTERS[c.index] for c in fam.categories)
+            if quarters > 0:
+                mix.append((fam, quarters / vec[-1]))
+        return sorted(mix, key=lambda m: -m[1])
+
+    def range_breakdown(self, start, end):
+        # Same shape as breakdown(), for the units recorded between two dates
+        return _breakdown(self.history.range(start, end))
+
+    def range_report(self, start, end):
+        # (range_breakdown() rows, [(date, units, points)]) between two dates. SQLite answers
+        # with indexed queries on its read-only connection, so a long report never holds up
+        # a writer; the CSV backend has no index and reads the in-memory history.
+        query = getattr(self.storage, "totals_between", None)
+        if query is None:
+            return self.range_breakdown(start, end), self.daily_totals(start, end)
+        counts = [0] * N_CATEGORIES
+        for (unit, warranty), (n, _points) in query(start, end).items():
+            index = CATEGORY_INDEX.get((unit, warranty))
+            if index is not None:
+                counts[index] += n
+        days = [(date.fromisoformat(day), n, points) for day, n, points in self.storage.daily_totals(start, end)]
+        return _breakdown(counts), days
+
+    # ---- other processes ----
+    def reload_if_changed(self):
+        # Pick up writes made by another process (CLI, a second GUI, a script). Returns the
+        # categories whose counts moved, [] when only settings did, or None when nothing was
+        # reloaded. Waits while our own writes are queued, so none of them can be lost.
+        if self.pending():
+            return None
+        undo_moved = self.reload_undo()
+        if not self.storage.changed_on_disk():
+            return [] if undo_moved else None
+        old = self.state
+        self.state = self.storage.refresh()
+        self._publish()
+        # Their units can land on any day or bucket: add just those into the views
+        self._apply_changes(self.storage.take_changes())
+        delta = [new - was for new, was in zip(self.state.counts, old.counts)]
+        if not any(delta):
+            return []
+        # Only units logged on this station count toward the live pace, not merged ones
+        local = [n - was for n, was in zip(_local_net(self.state), _local_net(old))]
+        vec = day_vector(local)
+        self.pace.add(datetime.now(), sum(local), vec[-1] / 4)
+        return [CATEGORIES[i] for i, d in enumerate(delta) if d]
+
+    def _apply_changes(self, changes):
+        # changes: ({day: vector}, {bucket key: vector}) from storage.take_changes(); None
+        # when storage cannot tell, and the views are rebuilt from it instead
+        if changes is None:
+            self.history = DayHistory.from_rows(self.storage.history_rows())
+            self.buckets = BucketTable.from_rows(self.storage.bucket_rows())
+        else:
+            days, buckets = changes
+            if not days and not buckets:
+                return
+            for day, vec in days.items():
+                self.history.add_vector(day, vec)
+            for key, vec in buckets.items():
+                kind, _sep, label = key.partition(":")
+                if kind in BUCKET_KINDS:
+                    self.buckets.add({kind: label}, vec)
+        self.rolling = RollingWindows(self.history, self.work_day())
+
+    # ---- other stations ----
+    def merge_replicas(self, paths):
+        # Adopt other stations' totals from their replica files (or folders of them), in
+        # any order, as often as they are copied over. Returns (files read, units moved).
+        # Merged units only move the counters: they have no day or bucket history, and
+        # today's output keeps showing this station's work.
+        # another process here may have merged already; start from what is on disk
+        self.reload_if_changed()
+        self._ensure_replica()  # our own file is skipped by id
+        files = self.replicas.merge([Path(p) for p in paths])
+        self.ensure_start_of_day()
+        delta = [want - have for want, have in zip(self.replicas.totals(), self.state.remote_counts())]
+        moved = sum(delta)
+        if any(delta):
+            self.state.apply(delta, local=False)
+            self.state.start_of_day_output = max(0, self.state.start_of_day_output + moved)
+        self.save()
+        return files, moved
+
+    @property
+    def replica(self):
+        return self._ensure_replica()
+
+    def _ensure_replica(self):
+        # This station's id; created (and saved to tracker_config.json) on first use, so
+        # opening the tracker to read never writes the config
+        if self.replicas.replica is None:
+            self.replicas.replica = ensure_replica_id(self.base_dir, self.config)
+        return self.replicas.replica
+
+    def publish_replica(self, path=None):
+        # Write this station's replica file (replica_<id>.json next to the data by default)
+        # for other stations to merge; returns its path
+        if path is None:
+            if self.base_dir is None:
+                return None
+            path = self.base_dir / replica_file_name(self.replica)
+            self._replica_seen = self._replica_view()
+        self._ensure_replica()
+        # the file is written (and fsynced) on the writer thread, like every other save
+        self._sink.call(self.replicas.write, Path(path), self.replicas.published(self.state))
+        return path
+
+    def _republish(self):
+        # Keep the replica file next to the data current, without rewriting it when neither
+        # our own halves nor the merged counters moved (reports, empty undo, rejected input)
+        if self.base_dir is not None and self._replica_view() != self._replica_seen:
+            self.publish_replica()
+
+    def _replica_view(self):
+        return own_counters(self.state), {r: dict(h) for r, h in self.replicas.counters.items()}
+
+    # ---- bulk import ----
+    def import_history(self, batches, progress=None):
+        # batches: iterable of {date: KEYS-order counts} (progress_import). Each batch is one
+        # storage transaction that adds the days to the history and the units to the
+        # totals. Days before today's work day don't change today's output; rows dated today
+        # do, as if logged today. Not undoable.
+        # progress(units) runs after each commit. Returns the units imported.
+        self.ensure_start_of_day()
+        if self.writer:
+            self.writer.flush()  # imports write directly; nothing may be queued ahead of them
+        today = self.work_day()
+        imported = 0
+        for days in batches:
+            total = [0] * N_CATEGORIES
+            rows = []
+            for day, counts in sorted(days.items()):
+                total = [a + b for a, b in zip(total, counts)]
+                rows.append((day, day_vector(counts)))
+            earlier = sum(total) - sum(days[today]) if today in days else sum(total)
+            # a failed write leaves the state as it was
+            state = self.state.copy()
+            state.apply(total)
+            state.start_of_day_output += earlier
+            self.storage.import_history(state, rows)
+            self.state = state
+            imported += sum(total)
+            if progress is not None:
+                progress(sum(total))
+        # imported days can land anywhere in the past: rebuild the day views once
+        self.history = DayHistory.from_rows(self.storage.history_rows())
+        self.rolling = RollingWindows(self.history, self.work_day())
+        self.buckets = BucketTable.from_rows(self.storage.bucket_rows())
+        self._reset_pace(seed=True)
+        self._publish()
+        return imported
+
+    # ---- metrics ----
+    def start_metrics(self, port=None, host=None):
+        # Serve /metrics and /metrics.json; port/host default to tracker_config's
+        # metrics_port/metrics_host. Returns the bound (host, port); raises OSError if taken.
+        if self.metrics is None:
+            port = self.config.get("metrics_port") if port is None else port
+            host = host or self.config.get("metrics_host") or DEFAULTS["metrics_host"]
+            self.metrics = MetricsServer(self._sink.latency, self.replica, host, int(port or 0))
+            self.metrics.publish(self.state)
+            self.metrics.start()
+        return self.metrics.address
+
+    def _publish(self):
+        if self.metrics is not None:
+            self.metrics.publish(self.state)
+
+    # ---- persistence ----
+    def save(self):
+        # Storage snapshot, undo history and replica file all go through the sink, so with
+        # background=True the caller (the Tk thread) never waits on disk for any of them
+        self._sink.save(self.state)
+        self._publish()
+        self._save_undo()
+        self._republish()
+
+    def _save_undo(self):
+        # Every push/undo/redo reaches the shared file right away (on the writer thread),
+        # so another process's undo always sees it
+        ops = self.commands.take_ops()
+        if ops:
+            self._sink.call(self.commands.write, ops)
+
+    def pending(self):
+        return self.writer.pending() if self.writer else 0
+
+    @property
+    def error(self):
+        return self.writer.error if self.writer else None
+
+    def retry(self):
+        if self.writer:
+            self.writer.retry()
+
+    def abandon(self):
+        # Let go of the files after a failed write, writing nothing more
+        if self.metrics is not None:
+            self.metrics.close()
+        self.storage.close()
+
+    def close(self, save=True):
+        # save=False skips the final snapshot when every change is already recorded.
+        # Raises if the last writes could not be saved; nothing is closed then, so the
+        # caller can retry (close again) or keep running.
+        if save:
+            self.save()
+        else:
+            self._save_undo()
+            self._republish()
+        if self.writer:
+            self.writer.flush()
+        if self.metrics is not None:
+            self.metrics.close()
+        if self.writer:
+            self.writer.close()
+        self.storage.close()
+
+
+def _breakdown(counts):
+    rows = []
+    for fam in FAMILIES:
+        cats = [(c, counts[c.index], counts[c.index] * QUARTERS[c.index] / 4) for c in fam.categories]
+        rows.append((fam, sum(n for _c, n, _p in cats), sum(p for _c, _n, p in cats), cats))
+    return rows
+
+
+def _local_net(state):
+    return [a - r for a, r in zip(state.added, state.removed)]
+
+
+def _batch_label(entries):
+    if len(entries) == 1:
+        action, delta = entries[0]
+        return f"{action} {sum(delta)} unit(s)"
+    return f"batch of {len(entries)} entries"
+
+
+def _check_kind(kind):
+    if kind not in BUCKET_KINDS:
+        raise ValueError(f"Unknown bucket {kind!r} (expected one of {', '.join(BUCKET_KINDS)}).")
+
+
+def _signed(state, action, delta):
+    # Validate an add/remove of non-negative quantities against `state`; returns the signed delta
+    if action not in ("add", "remove"):
+        raise ValueError(f"Unknown action {action!r}.")
+    if any(d < 0 for d in delta):
+        raise ValueError("Quantities must be non-negative.")
+    if action == "add":
+        if sum(delta) == 0:
+            raise ValueError("No units selected for addition.")
+        return list(delta)
+    if state.output == 0:
+        raise ValueError("No units to remove.")
+    if sum(delta) == 0:
+        raise ValueError("No units selected for removal.")
+    problem = state.removal_problem(delta)
+    if problem:
+        raise ValueError(problem)
+    return [-d for d in delta]
+
+
+def open_engine(base_dir=None, kind=None, background=False):
+    base_dir = base_dir or default_base_dir()
+    return TrackerEngine(open_storage(base_dir, kind), background=background, base_dir=base_dir)
@@ -0,0 +1,182 @@
+import json
+from array import array
+from datetime import date
+
+from unit_registry import CATEGORIES, FAMILIES, KEY_INDEX, KEYS, N_CATEGORIES, dot_quarters
+
+
+# Names readable through get(); weighted_output is derived from weighted_quarters
+_SCALARS = ("output", "weighted_output", "start_date", "start_of_day_output")
+
+# "added:<key>" / "removed:<key>" read this station's PN-counter halves
+_HALVES = ("added", "removed")
+
+
+class TrackerState:
+    # Running tracker totals. Category counters live in one int64 array in
+    # unit_registry.KEYS order; family totals are derived, never stored.
+    # Weighted output is kept as an exact integer count of quarter-points.
+    # `added`/`removed` are this station's PN-counter halves: every unit it ever added
+    # or removed per category. counts - (added - removed) is what other stations
+    # contributed through progress_replicas merges.
+    __slots__ = ("counts", "added", "removed", "output", "weighted_quarters", "start_date",
+                 "start_of_day_output", "bucket_adjust")
+
+    def __init__(self):
+        self.counts = array("q", bytes(8 * N_CATEGORIES))
+        self.added = array("q", bytes(8 * N_CATEGORIES))
+        self.removed = array("q", bytes(8 * N_CATEGORIES))
+        self.output = 0
+        self.weighted_quarters = 0
+        self.start_date = date.today().isoformat()
+        self.start_of_day_output = 0
+        # {"kind:label": units} hand corrections to shift/hour/week bucket totals
+        self.bucket_adjust = {}
+
+    @property
+    def weighted_output(self):
+        # Quarter-points are exact in binary floating point, so this never drifts
+        return self.weighted_quarters / 4
+
+    # ---- updates ----
+    def apply(self, delta, local=True):
+        # Add a signed delta vector (KEYS order) to the counters and totals.
+        # local=False is for totals merged in from other stations.
+        counts = self.counts
+        units = 0
+        for i, d in enumerate(delta):
+            if d:
+                counts[i] += d
+                units += d
+                if not local:
+                    continue
+                if d > 0:
+                    self.added[i] += d
+                else:
+                    self.removed[i] -= d
+        self.output += units
+        self.weighted_quarters += dot_quarters(delta)
+
+    def add(self, index, delta, points):
+        # Single category update with an already-computed points delta (journal replay)
+        self.counts[index] += delta
+        if delta > 0:
+            self.added[index] += delta
+        else:
+            self.removed[index] -= delta
+        self.output += delta
+        self.weighted_quarters += round(points * 4)
+
+    def merge(self, base, ours):
+        # Fold what `ours` changed since `base` into this (newer, on-disk) state:
+        # counters move by their difference, scalars edited in `ours` win
+        for name in ("counts", "added", "removed"):
+            mine = getattr(self, name)
+            for i, (o, b) in enumerate(zip(getattr(ours, name), getattr(base, name))):
+                if o != b:
+                    mine[i] += o - b
+        self.output += ours.output - base.output
+        self.weighted_quarters += ours.weighted_quarters - base.weighted_quarters
+        for name in ("start_date", "start_of_day_output"):
+            if getattr(ours, name) != getattr(base, name):
+                setattr(self, name, getattr(ours, name))
+        merge_adjustments(self.bucket_adjust, base.bucket_adjust, ours.bucket_adjust)
+
+    def removal_problem(self, delta):
+        # Message describing why removing `delta` (positive quantities) is invalid, else None
+        if sum(delta) > self.output:
+            return "Cannot remove more than total output."
+        for cat, have, want in zip(CATEGORIES, self.counts, delta):
+            if want > have:
+                return f"Cannot remove more {cat.unit} {cat.warranty} than recorded."
+        return None
+
+    def remote_counts(self):
+        # Per-category units merged in from other stations
+        return [c - a + r for c, a, r in zip(self.counts, self.added, self.removed)]
+
+    def today_output(self):
+        return max(0, self.output - self.start_of_day_output)
+
+    def family_total(self, family):
+        return sum(self.counts[c.index] for c in family.categories)
+
+    # ---- snapshots ----
+    def copy(self):
+        new = TrackerState.__new__(TrackerState)
+        new.counts = array("q", self.counts)
+        new.added = array("q", self.added)
+        new.removed = array("q", self.removed)
+        new.output = self.output
+        new.weighted_quarters = self.weighted_quarters
+        new.start_date = self.start_date
+        new.start_of_day_output = self.start_of_day_output
+        new.bucket_adjust = dict(self.bucket_adjust)
+        return new
+
+    # ---- by-name access for persistence (CSV columns / SQLite counter keys) ----
+    def get(self, key, default=0):
+        if key in KEY_INDEX:
+            return self.counts[KEY_INDEX[key]]
+        half, _sep, name = key.partition(":")
+        if half in _HALVES and name in KEY_INDEX:
+            return getattr(self, half)[KEY_INDEX[name]]
+        for fam in FAMILIES:
+            if fam.total_key == key:
+                return self.family_total(fam)
+        if key in _SCALARS:
+            return getattr(self, key)
+        if key == "bucket_adjust":
+            return json.dumps(self.bucket_adjust) if self.bucket_adjust else ""
+        return default
+
+    def as_dict(self, fields):
+        return {k: self.get(k) for k in fields}
+
+    @classmethod
+    def from_dict(cls, row):
+        state = cls()
+        state.output = int(row.get("output") or 0)
+        # older files carry float drift; snap to the nearest quarter-point
+        state.weighted_quarters = round(float(row.get("weighted_output") or 0.0) * 4)
+        state.start_date = row.get("start_date") or ""
+        state.start_of_day_output = int(row.get("start_of_day_output") or 0)
+        state.bucket_adjust = load_adjustments(row.get("bucket_adjust"))
+        for i, key in enumerate(KEYS):
+            state.counts[i] = int(row.get(key) or 0)
+        # older files only kept a family total (e.g. count_stratus); book it as the first subcategory
+        for fam in FAMILIES:
+            if fam.total_key and not state.family_total(fam):
+                state.counts[fam.categories[0].index] = int(row.get(fam.total_key) or 0)
+        if any(f"added:{key}" in row for key in KEYS):
+            for i, key in enumerate(KEYS):
+                state.added[i] = int(row.get(f"added:{key}") or 0)
+                state.removed[i] = int(row.get(f"removed:{key}") or 0)
+        else:
+            # files from before per-station counters: everything so far was logged here
+            state.added = array("q", (max(0, c) for c in state.counts))
+            state.removed = array("q", (max(0, -c) for c in state.counts))
+        return state
+
+
+def merge_adjustments(mine, base, ours):
+    # Bucket corrections merge key by key: only the ones `ours` edited since `base` are replaced
+    for key in set(ours) | set(base):
+        value = ours.get(key)
+        if value == base.get(key):
+            continue
+        if value is None:
+            mine.pop(key, None)
+        else:
+            mine[key] = value
+
+
+def load_adjustments(text):
+    # JSON {"kind:label": units}; empty or unreadable means no corrections
+    try:
+        loaded = json.loads(text or "{}")
+    except ValueError:
+        return {}
+    if not isinstance(loaded, dict):
+        return {}
+    return {str(k): int(v) for k, v in loaded.items() if isinstance(v, (int, float))}
@@ -0,0 +1,135 @@
+import operator
+from array import array
+from collections import namedtuple
+
+
+# One entry per unit family:
+#   (name, input aliases, stored family-total key or None, [(warranty, state key, points per unit)])
+# Adding a device model is one entry here; the CLI, GUI, storage and journal all read from it.
+UNIT_REGISTRY = [
+    ("Stratus", ("s", "stratus"), "count_stratus", [
+        ("Flat Rate", "count_stratus_flat", 0.75),
+        ("Manufacture Warranty", "count_stratus_manuf", 0.75),
+    ]),
+    ("Homefill", ("h", "homefill"), "count_homefill", [
+        ("Flat Rate", "count_homefill_flat", 2.0),
+        ("Manufacture Warranty", "count_homefill_manuf", 2.0),
+    ]),
+    ("525", ("5", "525"), None, [
+        ("QM Warranty", "count_qm", 0.75),
+        ("PM", "count_pm", 0.25),
+        ("Minor Repair", "count_minor", 0.50),
+        ("Flat Rate", "count_flat", 1.0),
+        ("Manufacture Warranty", "count_manuf", 1.0),
+    ]),
+    ("1025", ("10", "1025"), None, [
+        ("QM Warranty", "count_1025_qm", 0.75),
+        ("PM", "count_1025_pm", 0.25),
+        ("Minor Repair", "count_1025_minor", 0.50),
+        ("Flat Rate", "count_1025_flat", 1.0),
+        ("Manufacture Warranty", "count_1025_manuf", 1.0),
+    ]),
+    ("Perfecto 2V", ("perfecto", "2v"), None, [
+        ("QM Warranty", "count_perfecto_qm", 1.0),
+        ("Flat Rate", "count_perfecto_flat", 1.25),
+        ("Manufacture Warranty", "count_perfecto_manuf", 1.25),
+    ]),
+    ("M10", ("m10",), None, [
+        ("QM Warranty", "count_m10_qm", 1.25),
+        ("Flat Rate", "count_m10_flat", 1.75),
+        ("Manufacture Warranty", "count_m10_manuf", 1.75),
+    ]),
+    ("Rhythm LM5A", ("lm5a",), None, [
+        ("QM Warranty", "count_lm5a_qm", 0.75),
+        ("Flat Rate", "count_lm5a_flat", 1.0),
+        ("Manufacture Warranty", "count_lm5a_manuf", 1.0),
+    ]),
+    ("Rhythm LM5BA", ("lm5ba",), None, [
+        ("QM Warranty", "count_lm5ba_qm", 0.75),
+        ("Flat Rate", "count_lm5ba_flat", 1.0),
+        ("Manufacture Warranty", "count_lm5ba_manuf", 1.0),
+    ]),
+    ("Rhythm LM5CA", ("lm5ca",), None, [
+        ("QM Warranty", "count_lm5ca_qm", 0.75),
+        ("Flat Rate", "count_lm5ca_flat", 1.0),
+        ("Manufacture Warranty", "count_lm5ca_manuf", 1.0),
+    ]),
+    ("POC", ("poc",), None, [
+        ("Repair", "count_poc_repair", 2.0),
+    ]),
+]
+
+
+# flag: short warranty name taken from the key suffix (qm, pm, minor, flat, manuf, repair)
+Category = namedtuple("Category", "index unit warranty key points family flag")
+Family = namedtuple("Family", "index name aliases total_key categories")
+
+
+def _compile(registry):
+    families = []
+    categories = []
+    for f_idx, (name, aliases, total_key, warranties) in enumerate(registry):
+        cats = []
+        for warranty, key, points in warranties:
+            if points * 4 != int(points * 4):
+                raise ValueError(f"{name} {warranty}: points must be a multiple of 0.25, got {points}")
+            cat = Category(len(categories), name, warranty, key, points, f_idx, key.rsplit("_", 1)[1])
+            categories.append(cat)
+            cats.append(cat)
+        families.append(Family(f_idx, name, tuple(aliases), total_key, tuple(cats)))
+    return tuple(families), tuple(categories)
+
+
+FAMILIES, CATEGORIES = _compile(UNIT_REGISTRY)
+N_CATEGORIES = len(CATEGORIES)
+
+# Fixed index order and packed weight vector; counts vectors share this order
+KEYS = tuple(c.key for c in CATEGORIES)
+WEIGHTS = array("d", (c.points for c in CATEGORIES))
+# Same weights in exact quarter-points; weighted output is summed in these
+QUARTERS = array("q", (int(c.points * 4) for c in CATEGORIES))
+KEY_INDEX = {c.key: c.index for c in CATEGORIES}
+CATEGORY_INDEX = {(c.unit, c.warranty): c.index for c in CATEGORIES}
+FAMILY_BY_NAME = {f.name: f for f in FAMILIES}
+FAMILY_ALIASES = {alias: f for f in FAMILIES for alias in (f.name.lower(),) + f.aliases}
+WARRANTY_FLAGS = tuple(dict.fromkeys(c.flag for c in CATEGORIES))
+# Stored family totals (count_stratus, count_homefill) and what feeds them
+TOTAL_KEYS = tuple(f.total_key for f in FAMILIES if f.total_key)
+PARENT_KEYS = {c.key: FAMILIES[c.family].total_key for c in CATEGORIES if FAMILIES[c.family].total_key}
+# Persisted counter columns: each family total followed by its categories
+COUNT_FIELDS = tuple(
+    key
+    for f in FAMILIES
+    for key in ((f.total_key,) if f.total_key else ()) + tuple(c.key for c in f.categories)
+)
+
+
+def zero_vector():
+    return [0] * N_CATEGORIES
+
+
+def dot(counts):
+    # Weighted points for a counts/delta vector in KEYS order
+    return sum(map(operator.mul, counts, WEIGHTS))
+
+
+def dot_quarters(counts):
+    # Exact integer version of dot(): quarter-points for a counts/delta vector
+    return sum(map(operator.mul, counts, QUARTERS))
+
+
+def family_vector(family, quantities):
+    # quantities: one per category of the family, in registry order
+    delta = zero_vector()
+    for cat, qty in zip(family.categories, quantities):
+        delta[cat.index] = qty
+    return delta
+
+
+def events_for(delta):
+    # Journal/storage events (unit, warranty, delta, points) for the non-zero entries
+    return [
+        (CATEGORIES[i].unit, CATEGORIES[i].warranty, d, d * WEIGHTS[i])
+        for i, d in enumerate(delta)
+        if d
+    ]
@@ -1,27 +1,26 @@
-import csv
+import argparse
+import json
+import multiprocessing
+import os
+import shlex
+import sqlite3
 import sys
-from pathlib import Path
 from datetime import date
+from pathlib import Path
 
-SEPARATOR = "----------------------------------------------------------------------------------------"
-
-
-if getattr(sys, "frozen", False):
-    base_dir = Path(sys.executable).parent
-else:
-    base_dir = Path(__file__).parent
+from entry_codes import parse_codes
+from progress_buckets import BUCKET_KINDS
+from progress_import import IMPORT_BATCH_ROWS, ImportStats, import_batches, load_mapping
+from progress_ingest import HAS_UNIX_SOCKETS, INGEST_HOST, INGEST_PORT, serve
+from progress_shop import SHOP_CACHE_NAME, ShopScan
+from tracker_engine import open_engine
+from unit_registry import CATEGORIES, FAMILIES, FAMILY_ALIASES, WARRANTY_FLAGS, family_vector
 
-file_path = base_dir / "output_progress.csv"
+# What a failed write to the data files raises: OSError (disk, and the FileLock's
+# TimeoutError after 10 s) or sqlite3.Error ("database is locked")
+STORAGE_ERRORS = (OSError, TimeoutError, sqlite3.Error)
 
-# Points
-DEV_POINTS = {
-    "QM Warranty": 0.75,
-    "PM": 0.25,
-    "Minor Repair": 0.50,
-    "Flat Rate": 1.0,
-    "Manufacture Warranty": 1.0,
-}
-STRATUS_POINTS = 0.75
+SEPARATOR = "----------------------------------------------------------------------------------------"
 
 
 def menu():
@@ -35,379 +34,70 @@ def menu():
     print(SEPARATOR)
 
 
-def add_unit(state):
-    units = input("Enter unit type: (stratus(s) / 525(5) / 1025(10)): ").strip().lower()
-    while units not in {"s", "stratus", "5", "525", "10", "1025"}:
-        print("Invalid unit. Enter 's'/'stratus' or '5'/'525' or '10'/'1025'.")
-        print(SEPARATOR)
-        units = input("Enter unit type: (stratus(s) / 525(5) / 1025(10)): ").strip().lower()
-    if units in {"s", "stratus"}:
-        units = "s"
-    elif units in {"5", "525"}:
-        units = "5"
-    else:
-        units = "10"
+def unit_prompt(action=""):
+    return f"Enter unit type{action}: (" + " / ".join(f"{f.name}({f.aliases[0]})" for f in FAMILIES) + "): "
 
-    qty = get_positive_int("Enter quantity to add: ")
 
-    if units == "s":
-        print("Enter quantities to add for Stratus types (0 allowed):")
-        print(SEPARATOR)
-        s_flat = get_nonnegative_int("Stratus Flat Rate: ")
-        s_manuf = get_nonnegative_int("Stratus Manufacture Warranty: ")
-        qty = s_flat + s_manuf
-        if qty == 0:
-            print("No units selected for addition.")
-            print(SEPARATOR)
-            return
-        state["output"] += qty
-        state["weighted_output"] += STRATUS_POINTS * qty
-        state["count_stratus_flat"] = state.get("count_stratus_flat", 0) + s_flat
-        state["count_stratus_manuf"] = state.get("count_stratus_manuf", 0) + s_manuf
-        state["count_stratus"] = state.get("count_stratus", 0) + qty
-    elif units == "5":
-        print("Enter quantities to add for each 525 warranty type (0 allowed):")
+def get_family(prompt):
+    choice = input(prompt).strip().lower()
+    while choice not in FAMILY_ALIASES:
+        print("Invalid unit. Enter one of: " + ", ".join(f"'{f.aliases[0]}'/'{f.name}'" for f in FAMILIES) + ".")
         print(SEPARATOR)
-        q_cnt = get_nonnegative_int("QM Warranty: ")
-        p_cnt = get_nonnegative_int("PM: ")
-        m_cnt = get_nonnegative_int("Minor Repair: ")
-        f_cnt = get_nonnegative_int("Flat Rate: ")
-        w_cnt = get_nonnegative_int("Manufacture Warranty: ")
-        total_add = q_cnt + p_cnt + m_cnt + f_cnt + w_cnt
-        if total_add == 0:
-            print("No units selected for addition.")
-            print(SEPARATOR)
-            return
-        state["output"] += total_add
-        state["weighted_output"] += (
-            DEV_POINTS["QM Warranty"] * q_cnt
-            + DEV_POINTS["PM"] * p_cnt
-            + DEV_POINTS["Minor Repair"] * m_cnt
-            + DEV_POINTS["Flat Rate"] * f_cnt
-            + DEV_POINTS["Manufacture Warranty"] * w_cnt
-        )
-        state["count_qm"] = state.get("count_qm", 0) + q_cnt
-        state["count_pm"] = state.get("count_pm", 0) + p_cnt
-        state["count_minor"] = state.get("count_minor", 0) + m_cnt
-        state["count_flat"] = state.get("count_flat", 0) + f_cnt
-        state["count_manuf"] = state.get("count_manuf", 0) + w_cnt
-    else:  # 1025
-        print("Enter quantities to add for each 1025 warranty type (0 allowed):")
+        choice = input(prompt).strip().lower()
+    return FAMILY_ALIASES[choice]
+
+
+def get_family_quantities(fam, verb):
+    print(f"Enter quantities to {verb} for each {fam.name} warranty type (0 allowed):")
+    print(SEPARATOR)
+    return [get_nonnegative_int(f"{cat.warranty}: ") for cat in fam.categories]
+
+
+def add_unit(engine):
+    fam = get_family(unit_prompt())
+    qty = get_family_quantities(fam, "add")
+    try:
+        engine.add_family(fam, qty)
+    except ValueError as exc:
+        print(exc)
         print(SEPARATOR)
-        q_cnt = get_nonnegative_int("QM Warranty: ")
-        p_cnt = get_nonnegative_int("PM: ")
-        m_cnt = get_nonnegative_int("Minor Repair: ")
-        f_cnt = get_nonnegative_int("Flat Rate: ")
-        w_cnt = get_nonnegative_int("Manufacture Warranty: ")
-        total_add = q_cnt + p_cnt + m_cnt + f_cnt + w_cnt
-        if total_add == 0:
-            print("No units selected for addition.")
-            print(SEPARATOR)
-            return
-        state["output"] += total_add
-        state["weighted_output"] += (
-            DEV_POINTS["QM Warranty"] * q_cnt
-            + DEV_POINTS["PM"] * p_cnt
-            + DEV_POINTS["Minor Repair"] * m_cnt
-            + DEV_POINTS["Flat Rate"] * f_cnt
-            + DEV_POINTS["Manufacture Warranty"] * w_cnt
-        )
-        state["count_1025_qm"] = state.get("count_1025_qm", 0) + q_cnt
-        state["count_1025_pm"] = state.get("count_1025_pm", 0) + p_cnt
-        state["count_1025_minor"] = state.get("count_1025_minor", 0) + m_cnt
-        state["count_1025_flat"] = state.get("count_1025_flat", 0) + f_cnt
-        state["count_1025_manuf"] = state.get("count_1025_manuf", 0) + w_cnt
-    save_progress(state)
-
-
-def remove_unit(state):
-    if state["output"] == 0:
+
+
+def remove_unit(engine):
+    if engine.state.output == 0:
         print("No units to remove.")
         print(SEPARATOR)
         return
 
-    unit = input("Enter unit type to remove: (stratus(s) / 525(5) / 1025(10)): ").strip().lower()
-    while unit not in {"s", "stratus", "5", "525", "10", "1025"}:
-        print("Invalid unit. Enter 's'/'stratus' or '5'/'525' or '10'/'1025'.")
+    fam = get_family(unit_prompt(" to remove"))
+    qty = get_family_quantities(fam, "remove")
+    try:
+        engine.remove_family(fam, qty)
+    except ValueError as exc:
+        print(exc)
         print(SEPARATOR)
-        unit = input("Enter unit type to remove: (stratus(s) / 525(5) / 1025(10)): ").strip().lower()
-    if unit in {"s", "stratus"}:
-        unit = "s"
-    elif unit in {"5", "525"}:
-        unit = "5"
-    else:
-        unit = "10"
 
-    if unit == "s":
-        print("Enter quantities to remove for Stratus types (0 allowed):")
-        print(SEPARATOR)
-        s_flat = get_nonnegative_int("Stratus Flat Rate: ")
-        s_manuf = get_nonnegative_int("Stratus Manufacture Warranty: ")
-        qty = s_flat + s_manuf
-        if qty == 0:
-            print("No units selected for removal.")
-            print(SEPARATOR)
-            return
-        if qty > state.get("output", 0):
-            print("Cannot remove more than total output.")
-            print(SEPARATOR)
-            return
-        if s_flat > state.get("count_stratus_flat", 0):
-            print("Cannot remove more Stratus Flat Rate than recorded.")
-            print(SEPARATOR)
-            return
-        if s_manuf > state.get("count_stratus_manuf", 0):
-            print("Cannot remove more Stratus Manufacture Warranty than recorded.")
-            print(SEPARATOR)
-            return
-        state["output"] -= qty
-        state["weighted_output"] -= STRATUS_POINTS * qty
-        state["count_stratus_flat"] -= s_flat
-        state["count_stratus_manuf"] -= s_manuf
-        state["count_stratus"] -= qty
-        if state["output"] == 0:
-            state["weighted_output"] = 0.0
-    elif unit == "5":
-        print("Enter quantities to remove for each 525 warranty type (0 allowed):")
-        print(SEPARATOR)
-        q_cnt = get_nonnegative_int("QM Warranty: ")
-        p_cnt = get_nonnegative_int("PM: ")
-        m_cnt = get_nonnegative_int("Minor Repair: ")
-        f_cnt = get_nonnegative_int("Flat Rate: ")
-        w_cnt = get_nonnegative_int("Manufacture Warranty: ")
-        total_remove = q_cnt + p_cnt + m_cnt + f_cnt + w_cnt
-        if total_remove == 0:
-            print("No units selected for removal.")
-            print(SEPARATOR)
-            return
-        if total_remove > state["output"]:
-            print("Cannot remove more than total output.")
-            print(SEPARATOR)
-            return
-        if q_cnt > state.get("count_qm", 0):
-            print("Cannot remove more QM Warranty than recorded.")
-            print(SEPARATOR)
-            return
-        if p_cnt > state.get("count_pm", 0):
-            print("Cannot remove more PM than recorded.")
-            print(SEPARATOR)
-            return
-        if m_cnt > state.get("count_minor", 0):
-            print("Cannot remove more Minor Repair than recorded.")
-            print(SEPARATOR)
-            return
-        if f_cnt > state.get("count_flat", 0):
-            print("Cannot remove more Flat Rate than recorded.")
-            print(SEPARATOR)
-            return
-        if w_cnt > state.get("count_manuf", 0):
-            print("Cannot remove more Manufacture Warranty than recorded.")
-            print(SEPARATOR)
-            return
-        state["output"] -= total_remove
-        state["weighted_output"] -= (
-            DEV_POINTS["QM Warranty"] * q_cnt
-            + DEV_POINTS["PM"] * p_cnt
-            + DEV_POINTS["Minor Repair"] * m_cnt
-            + DEV_POINTS["Flat Rate"] * f_cnt
-            + DEV_POINTS["Manufacture Warranty"] * w_cnt
-        )
-        state["count_qm"] -= q_cnt
-        state["count_pm"] -= p_cnt
-        state["count_minor"] -= m_cnt
-        state["count_flat"] -= f_cnt
-        state["count_manuf"] -= w_cnt
-        if state["output"] == 0:
-            state["weighted_output"] = 0.0
-    else:  # 1025
-        print("Enter quantities to remove for each 1025 warranty type (0 allowed):")
-        print(SEPARATOR)
-        q_cnt = get_nonnegative_int("QM Warranty (q): ")
-        p_cnt = get_nonnegative_int("PM (p): ")
-        m_cnt = get_nonnegative_int("Minor Repair (m): ")
-        f_cnt = get_nonnegative_int("Flat Rate (f): ")
-        w_cnt = get_nonnegative_int("Manufacture Warranty (w): ")
-        total_remove = q_cnt + p_cnt + m_cnt + f_cnt + w_cnt
-        if total_remove == 0:
-            print("No units selected for removal.")
-            print(SEPARATOR)
-            return
-        if total_remove > state["output"]:
-            print("Cannot remove more than total output.")
-            print(SEPARATOR)
-            return
-        if q_cnt > state.get("count_1025_qm", 0):
-            print("Cannot remove more QM Warranty than recorded for 1025.")
-            print(SEPARATOR)
-            return
-        if p_cnt > state.get("count_1025_pm", 0):
-            print("Cannot remove more PM than recorded for 1025.")
-            print(SEPARATOR)
-            return
-        if m_cnt > state.get("count_1025_minor", 0):
-            print("Cannot remove more Minor Repair than recorded for 1025.")
-            print(SEPARATOR)
-            return
-        if f_cnt > state.get("count_1025_flat", 0):
-            print("Cannot remove more Flat Rate than recorded for 1025.")
-            print(SEPARATOR)
-            return
-        if w_cnt > state.get("count_1025_manuf", 0):
-            print("Cannot remove more Manufacture Warranty than recorded for 1025.")
-            print(SEPARATOR)
-            return
-        state["output"] -= total_remove
-        state["weighted_output"] -= (
-            DEV_POINTS["QM Warranty"] * q_cnt
-            + DEV_POINTS["PM"] * p_cnt
-            + DEV_POINTS["Minor Repair"] * m_cnt
-            + DEV_POINTS["Flat Rate"] * f_cnt
-            + DEV_POINTS["Manufacture Warranty"] * w_cnt
-        )
-        state["count_1025_qm"] -= q_cnt
-        state["count_1025_pm"] -= p_cnt
-        state["count_1025_minor"] -= m_cnt
-        state["count_1025_flat"] -= f_cnt
-        state["count_1025_manuf"] -= w_cnt
-        if state["output"] == 0:
-            state["weighted_output"] = 0.0
-    save_progress(state)
-
-
-def view_output_total(state):
-    print(f"Total Output: {state['output']}")
+
+def view_output_total(engine):
+    print(f"Total Output: {engine.state.output}")
     print(SEPARATOR)
 
 
-def view_weighted_output(state):
-    print(f"Weighted Output: {state['weighted_output']}")
+def view_weighted_output(engine):
+    print(f"Weighted Output: {engine.state.weighted_output}")
     print(SEPARATOR)
 
 
-def view_breakdown(state):
+def view_breakdown(engine):
     print("Breakdown of Units:")
-    print(f"- Stratus: {state.get('count_stratus', 0)}")
-    print(f"  - Stratus Flat Rate: {state.get('count_stratus_flat', 0)}")
-    print(f"  - Stratus Manufacture Warranty: {state.get('count_stratus_manuf', 0)}")
-    print(f"- 525 QM Warranty: {state.get('count_qm', 0)}")
-    print(f"- 525 PM: {state.get('count_pm', 0)}")
-    print(f"- 525 Minor Repair: {state.get('count_minor', 0)}")
-    print(f"- 525 Flat Rate: {state.get('count_flat', 0)}")
-    print(f"- 525 Manufacture Warranty: {state.get('count_manuf', 0)}")
-    print(f"- 1025 QM Warranty: {state.get('count_1025_qm', 0)}")
-    print(f"- 1025 PM: {state.get('count_1025_pm', 0)}")
-    print(f"- 1025 Minor Repair: {state.get('count_1025_minor', 0)}")
-    print(f"- 1025 Flat Rate: {state.get('count_1025_flat', 0)}")
-    print(f"- 1025 Manufacture Warranty: {state.get('count_1025_manuf', 0)}")
+    for fam, units, _pts, cats in engine.breakdown():
+        print(f"- {fam.name}: {units}")
+        for cat, n, _p in cats:
+            print(f"  - {cat.unit} {cat.warranty}: {n}")
     print(SEPARATOR)
 
 
-def load_progress():
-    if file_path.exists():
-        try:
-            with file_path.open(newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    return {
-                        "output": int(row.get("output", 0)),
-                        "weighted_output": float(row.get("weighted_output", 0.0)),
-                        "count_stratus": int(row.get("count_stratus", 0)),
-                        "count_qm": int(row.get("count_qm", 0)),
-                        "count_pm": int(row.get("count_pm", 0)),
-                        "count_minor": int(row.get("count_minor", 0)),
-                        "count_flat": int(row.get("count_flat", 0)),
-                        "count_manuf": int(row.get("count_manuf", 0)),
-                        "count_1025_qm": int(row.get("count_1025_qm", 0)),
-                        "count_1025_pm": int(row.get("count_1025_pm", 0)),
-                        "count_1025_minor": int(row.get("count_1025_minor", 0)),
-                        "count_1025_flat": int(row.get("count_1025_flat", 0)),
-                        "count_1025_manuf": int(row.get("count_1025_manuf", 0)),
-                        "count_stratus_flat": int(row.get("count_stratus_flat", 0)),
-                        "count_stratus_manuf": int(row.get("count_stratus_manuf", 0)),
-                        "start_date": row.get("start_date", ""),
-                        "start_of_day_output": int(row.get("start_of_day_output", 0)),
-                    }
-        except Exception:
-            pass
-    return {
-        "output": 0,
-        "weighted_output": 0.0,
-        "count_stratus": 0,
-        "count_qm": 0,
-        "count_pm": 0,
-        "count_minor": 0,
-        "count_flat": 0,
-        "count_manuf": 0,
-        "count_1025_qm": 0,
-        "count_1025_pm": 0,
-        "count_1025_minor": 0,
-        "count_1025_flat": 0,
-        "count_1025_manuf": 0,
-        "count_stratus_flat": 0,
-        "count_stratus_manuf": 0,
-        "start_date": "",
-        "start_of_day_output": 0,
-    }
-
-
-def save_progress(state):
-    with file_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "output",
-                "weighted_output",
-                "count_stratus",
-                "count_qm",
-                "count_pm",
-                "count_minor",
-                "count_flat",
-                "count_manuf",
-                "count_1025_qm",
-                "count_1025_pm",
-                "count_1025_minor",
-                "count_1025_flat",
-                "count_1025_manuf",
-                "count_stratus_flat",
-                "count_stratus_manuf",
-                "start_date",
-                "start_of_day_output",
-            ],
-        )
-        writer.writeheader()
-        writer.writerow(
-            {
-                "output": state["output"],
-                "weighted_output": state["weighted_output"],
-                "count_stratus": state.get("count_stratus", 0),
-                "count_qm": state.get("count_qm", 0),
-                "count_pm": state.get("count_pm", 0),
-                "count_minor": state.get("count_minor", 0),
-                "count_flat": state.get("count_flat", 0),
-                "count_manuf": state.get("count_manuf", 0),
-                "count_1025_qm": state.get("count_1025_qm", 0),
-                "count_1025_pm": state.get("count_1025_pm", 0),
-                "count_1025_minor": state.get("count_1025_minor", 0),
-                "count_1025_flat": state.get("count_1025_flat", 0),
-                "count_1025_manuf": state.get("count_1025_manuf", 0),
-                "count_stratus_flat": state.get("count_stratus_flat", 0),
-                "count_stratus_manuf": state.get("count_stratus_manuf", 0),
-                "start_date": state.get("start_date", ""),
-                "start_of_day_output": state.get("start_of_day_output", 0),
-            }
-        )
-
-
 # ----- integer input helpers -----
-def get_positive_int(prompt: str) -> int:
-    while True:
-        val = input(prompt).strip()
-        if val.isdigit() and int(val) > 0:
-            return int(val)
-        print("Please enter a positive integer.")
-        print(SEPARATOR)
-
-
 def get_nonnegative_int(prompt: str) -> int:
     while True:
         val = input(prompt).strip()
@@ -417,19 +107,7 @@ def get_nonnegative_int(prompt: str) -> int:
         print(SEPARATOR)
 
 
-def ensure_start_of_day(state):
-    today = date.today().isoformat()
-    current_start_date = state.get("start_date") or ""
-    if current_start_date != today:
-        state["start_date"] = today
-        state["start_of_day_output"] = int(state.get("output", 0))
-        save_progress(state)
-
-
-def main():
-    state = load_progress()
-    # Ensure daily start-of-day state is set/rolled over
-    ensure_start_of_day(state)
+def interactive(engine):
     while True:
         menu()
         choice = input("Select an option: ").strip()
@@ -437,20 +115,22 @@ def main():
             print("Please enter 1, 2, 3, 4, 5, 6, or 7.")
             print(SEPARATOR)
             choice = input("Select an option: ").strip()
+        # the GUI or another prompt may have changed the files while this one sat at input()
+        engine.reload_if_changed()
         if choice == "1":
-            add_unit(state)
+            add_unit(engine)
         elif choice == "2":
-            remove_unit(state)
+            remove_unit(engine)
         elif choice == "3":
-            view_output_total(state)
+            view_output_total(engine)
         elif choice == "4":
-            view_weighted_output(state)
+            view_weighted_output(engine)
         elif choice == "6":
-            view_breakdown(state)
+            view_breakdown(engine)
         elif choice == "7":
-            initialize_breakdown(state)
+            initialize_breakdown(engine)
         elif choice == "5":
-            save_progress(state)
+            engine.close()
             print("Progress saved.")
             print(SEPARATOR)
             break
@@ -459,8 +139,8 @@ def main():
             print(SEPARATOR)
 
 
-def initialize_breakdown(state):
-    total = state.get("output", 0)
+def initialize_breakdown(engine):
+    total = engine.state.output
     print(f"Current total output: {total}")
     if total < 0:
         print("Total output is negative; cannot initialize.")
@@ -468,56 +148,397 @@ def initialize_breakdown(state):
         return
     print("Enter counts for each category so they sum to the total.")
     print(SEPARATOR)
-    s = get_nonnegative_int("Stratus: ")
-    s_flat = get_nonnegative_int("Stratus Flat Rate: ")
-    s_manuf = get_nonnegative_int("Stratus Manufacture Warranty: ")
-    s = s_flat + s_manuf
-    q = get_nonnegative_int("525 QM Warranty: ")
-    p = get_nonnegative_int("525 PM: ")
-    m = get_nonnegative_int("525 Minor Repair: ")
-    f = get_nonnegative_int("525 Flat Rate: ")
-    w = get_nonnegative_int("525 Manufacture Warranty: ")
-    q10 = get_nonnegative_int("1025 QM Warranty: ")
-    p10 = get_nonnegative_int("1025 PM: ")
-    m10 = get_nonnegative_int("1025 Minor Repair: ")
-    f10 = get_nonnegative_int("1025 Flat Rate: ")
-    w10 = get_nonnegative_int("1025 Manufacture Warranty: ")
-    ssum = s + q + p + m + f + w + q10 + p10 + m10 + f10 + w10
-    if ssum != total:
-        print(f"Sum of entries ({ssum}) must equal total output ({total}). No changes saved.")
+    counts = [get_nonnegative_int(f"{cat.unit} {cat.warranty}: ") for cat in CATEGORIES]
+    try:
+        engine.set_breakdown(counts)
+    except ValueError as exc:
+        print(f"{exc} No changes saved.")
         print(SEPARATOR)
         return
-    state["count_stratus"] = s
-    state["count_stratus_flat"] = s_flat
-    state["count_stratus_manuf"] = s_manuf
-    state["count_qm"] = q
-    state["count_pm"] = p
-    state["count_minor"] = m
-    state["count_flat"] = f
-    state["count_manuf"] = w
-    state["count_1025_qm"] = q10
-    state["count_1025_pm"] = p10
-    state["count_1025_minor"] = m10
-    state["count_1025_flat"] = f10
-    state["count_1025_manuf"] = w10
-    state["weighted_output"] = (
-        STRATUS_POINTS * s
-        + DEV_POINTS["QM Warranty"] * q
-        + DEV_POINTS["PM"] * p
-        + DEV_POINTS["Minor Repair"] * m
-        + DEV_POINTS["Flat Rate"] * f
-        + DEV_POINTS["Manufacture Warranty"] * w
-        + DEV_POINTS["QM Warranty"] * q10
-        + DEV_POINTS["PM"] * p10
-        + DEV_POINTS["Minor Repair"] * m10
-        + DEV_POINTS["Flat Rate"] * f10
-        + DEV_POINTS["Manufacture Warranty"] * w10
-    )
-    save_progress(state)
     print("Breakdown initialized and weighted output updated.")
     print(SEPARATOR)
 
 
+# ----- scripted subcommands -----
+class _EntryParser(argparse.ArgumentParser):
+    # Batch lines are parsed with the same add/remove syntax; errors raise instead of exiting
+    def error(self, message):
+        raise ValueError(message)
+
+
+def add_entry_arguments(parser):
+    parser.add_argument("family", help="unit family: " + ", ".join(f.aliases[0] for f in FAMILIES))
+    parser.add_argument("qty", nargs="?", type=int, help="quantity, for single-warranty families such as POC")
+    for flag in WARRANTY_FLAGS:
+        parser.add_argument(f"--{flag}", type=int, default=0, metavar="N")
+
+
+def entry_delta(args):
+    # (action, delta vector) for a parsed add/remove entry
+    fam = FAMILY_ALIASES.get(args.family.strip().lower())
+    if fam is None:
+        raise ValueError(f"Unknown unit family {args.family!r}.")
+    flags = {c.flag for c in fam.categories}
+    extra = [flag for flag in WARRANTY_FLAGS if getattr(args, flag) and flag not in flags]
+    if extra:
+        raise ValueError(f"{fam.name} has no --{extra[0]}; use " + ", ".join(f"--{c.flag}" for c in fam.categories) + ".")
+    qty = [getattr(args, c.flag) for c in fam.categories]
+    if args.qty is not None:
+        if len(fam.categories) != 1:
+            raise ValueError(f"{fam.name} needs per-warranty flags: " + ", ".join(f"--{c.flag}" for c in fam.categories) + ".")
+        qty[0] += args.qty
+    return args.command, family_vector(fam, qty)
+
+
+def read_batch(lines):
+    # One "add ..." / "remove ..." entry per line; blank lines and # comments are skipped
+    parser = _EntryParser(prog="batch", add_help=False)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for action in ("add", "remove"):
+        add_entry_arguments(sub.add_parser(action, add_help=False))
+    entries = []
+    for n, line in enumerate(lines, 1):
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue
+        try:
+            entries.append(entry_delta(parser.parse_args(words)))
+        except ValueError as exc:
+            raise ValueError(f"Line {n}: {exc}") from None
+    return entries
+
+
+def report(engine, as_json=False, bucket=None, limit=10, start=None, end=None):
+    state = engine.state
+    if bucket is not None:
+        report_buckets(engine, bucket, limit, as_json)
+        return
+    if start is not None or end is not None:
+        report_range(engine, start or date.min, end or engine.work_day(), as_json)
+        return
+    if not as_json:
+        view_output_total(engine)
+        print(f"Today's Output: {state.today_output()} (started today with {state.start_of_day_output})")
+        print(SEPARATOR)
+        view_weighted_output(engine)
+        view_breakdown(engine)
+        return
+    print(json.dumps({
+        "output": state.output,
+        "weighted_output": state.weighted_output,
+        "start_date": state.start_date,
+        "start_of_day_output": state.start_of_day_output,
+        "today_output": state.today_output(),
+        "families": families_json(engine.breakdown()),
+    }, indent=2))
+
+
+def families_json(rows):
+    return {
+        fam.name: {
+            "units": units,
+            "points": pts,
+            "categories": {cat.warranty: {"units": n, "points": p} for cat, n, p in cats},
+        }
+        for fam, units, pts, cats in rows
+    }
+
+
+def report_range(engine, start, end, as_json=False):
+    # Per-day and per-category totals between two dates (indexed queries on SQLite)
+    rows, days = engine.range_report(start, end)
+    units = sum(u for _fam, u, _p, _cats in rows)
+    points = sum(p for _fam, _u, p, _cats in rows)
+    if as_json:
+        print(json.dumps({
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "units": units,
+            "points": points,
+            "days": [{"day": day.isoformat(), "units": n, "points": p} for day, n, p in days],
+            "families": families_json(rows),
+        }, indent=2))
+        return
+    print(f"Output from {start if start != date.min else 'the start'} to {end}")
+    print(SEPARATOR)
+    if not days:
+        print("No output recorded in this range.")
+    for day, n, p in days:
+        print(f"{day.isoformat():<24} {n:>6} units  {p:>9.2f} pts")
+    print(SEPARATOR)
+    print(f"{'Total':<24} {units:>6} units  {points:>9.2f} pts")
+    print(SEPARATOR)
+    for fam, fam_units, _pts, cats in rows:
+        print(f"- {fam.name}: {fam_units}")
+        for cat, n, _p in cats:
+            if n:
+                print(f"  - {cat.unit} {cat.warranty}: {n}")
+
+
+def report_buckets(engine, kind, limit, as_json=False):
+    # Most recent shift/hour/week/day buckets, read straight from the per-bucket totals
+    rows = engine.bucket_report(kind, limit)
+    if as_json:
+        print(json.dumps({
+            "bucket": kind,
+            "current": engine.current_bucket(kind),
+            "buckets": [{"label": label, "units": units, "points": pts} for label, units, pts in rows],
+        }, indent=2))
+        return
+    print(f"Recent {kind} buckets (current: {engine.current_bucket(kind) or 'none'})")
+    print(SEPARATOR)
+    if not rows:
+        print("No output recorded yet.")
+    for label, units, pts in rows:
+        print(f"{label:<24} {units:>6} units  {pts:>9.2f} pts")
+
+
+def shop(folder, as_json=False, limit=None, workers=None, cache=True):
+    # Every tracker under `folder`, ranked; unchanged files come from the mtime cache
+    root = Path(folder)
+    if not root.is_dir():
+        raise ValueError(f"{folder} is not a folder.")
+    scan = ShopScan(root, root / SHOP_CACHE_NAME if cache else None).load_cache().scan(workers)
+    result = scan.report()
+    if as_json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"Shop leaderboard ({len(result['techs'])} techs, {scan.read} file(s) re-read)")
+    print(SEPARATOR)
+    for t in result["techs"][:limit]:
+        print(f"{t['rank']:>3}. {t['tech']:<30} {t['units']:>7} units  {t['points']:>10.2f} pts")
+    print(SEPARATOR)
+    for fam in result["families"]:
+        if fam["units"]:
+            print(f"{fam['family']:<34} {fam['units']:>7} units  {fam['points']:>10.2f} pts")
+    print(SEPARATOR)
+    print(f"{'Shop total':<34} {result['units']:>7} units  {result['points']:>10.2f} pts")
+
+
+def import_history(path, mapping_path=None, batch=IMPORT_BATCH_ROWS, dry_run=False, storage=None):
+    # Stream a legacy spreadsheet export into the history, printing progress per batch
+    mapping = load_mapping(mapping_path) if mapping_path else {}
+    stats = ImportStats(os.path.getsize(path))
+    batches = import_batches(path, mapping, stats, batch)
+
+    def progress(_units=0):
+        print(f"\r{stats.line()}", end="", file=sys.stderr, flush=True)
+
+    today = 0
+    if dry_run:
+        for _days in batches:
+            progress()
+    else:
+        engine = open_engine(kind=storage)
+        try:
+            before = engine.state.today_output()
+            engine.import_history(batches, progress)
+            today = engine.state.today_output() - before
+        finally:
+            engine.close(save=False)
+    progress()
+    print(file=sys.stderr)
+    for message in stats.errors:
+        print(f"skipped {message}", file=sys.stderr)
+    if stats.bad > len(stats.errors):
+        print(f"... and {stats.bad - len(stats.errors)} more skipped row(s)", file=sys.stderr)
+    span = f" from {min(stats.days)} to {max(stats.days)}" if stats.days else ""
+    verb = "Would import" if dry_run else "Imported"
+    print(f"{verb} {stats.units} unit(s) over {len(stats.days)} day(s){span}.")
+    if today:
+        # rows dated today's work day are today's output like any other unit logged today
+        print(f"{today} of them are dated today and count toward today's output.")
+
+
+def storage_failed(engine, exc):
+    # The change was not written (and is not in the engine either); release the files
+    # without another write to storage that just refused one
+    print(f"error: {str(exc).rstrip('.')}. No changes saved.", file=sys.stderr)
+    engine.abandon()
+    return 1
+
+
+def close_engine(engine):
+    # close(save=False); a failed final write is reported instead of a traceback
+    try:
+        engine.close(save=False)
+    except STORAGE_ERRORS as exc:
+        print(f"error: {str(exc).rstrip('.')}. The undo history or replica file may not be saved.",
+              file=sys.stderr)
+        engine.abandon()
+        return False
+    return True
+
+
+def start_metrics(engine):
+    # Long-running modes serve /metrics when tracker_config.json sets metrics_port
+    if not engine.config.get("metrics_port"):
+        return
+    try:
+        host, port = engine.start_metrics()
+        print(f"Metrics on http://{host}:{port}/metrics")
+    except (OSError, ValueError) as exc:
+        print(f"warning: metrics endpoint not started: {exc}", file=sys.stderr)
+
+
+def iso_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text!r} is not a YYYY-MM-DD date") from None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="weight_output",
+        description="Weighted output tracker. Run without a command for the interactive menu.",
+    )
+    parser.add_argument("--storage", choices=("csv", "sqlite"),
+                        help="storage backend (default: $WEIGHTED_OUTPUT_STORAGE, else tracker_config.json's "
+                             "\"storage\", else sqlite if output_progress.db exists, else csv)")
+    sub = parser.add_subparsers(dest="command")
+    for action in ("add", "remove"):
+        add_entry_arguments(sub.add_parser(action, help=f"{action} units of one family, e.g. {action} 525 --qm 3 --pm 2"))
+    rep = sub.add_parser("report", help="print totals and the breakdown")
+    rep.add_argument("--json", action="store_true", help="machine-readable output")
+    rep.add_argument("--bucket", choices=BUCKET_KINDS, help="list recent day/shift/hour/week totals instead")
+    rep.add_argument("--limit", type=int, default=10, help="how many buckets to list (default 10)")
+    rep.add_argument("--from", dest="start", type=iso_date, metavar="YYYY-MM-DD",
+                     help="totals per day and category from this date (inclusive)")
+    rep.add_argument("--to", dest="end", type=iso_date, metavar="YYYY-MM-DD",
+                     help="... up to this date (inclusive, default today)")
+    quick = sub.add_parser("quick", help="apply short entry codes, e.g. quick 5q x3, 10p, -m10 w")
+    quick.add_argument("codes", nargs="+", help="codes separated by commas; a leading - removes")
+    sub.add_parser("undo", help="revert the latest add, remove or edit (GUI changes included)")
+    sub.add_parser("redo", help="re-apply the latest undone change")
+    merge = sub.add_parser("merge", help="add other stations' totals from their copied replica files")
+    merge.add_argument("paths", nargs="+", help="replica_*.json files, or folders holding them")
+    pub = sub.add_parser("publish", help="write this station's replica file for other stations to merge")
+    pub.add_argument("path", nargs="?", help="where to write it (default: replica_<station>.json here)")
+    sh = sub.add_parser("shop", help="rank every tracker file under a folder (per tech, per family, shop total)")
+    sh.add_argument("folder", help="folder holding the techs' output_progress.csv files (subfolders included)")
+    sh.add_argument("--json", action="store_true", help="machine-readable output")
+    sh.add_argument("--limit", type=int, help="show only the top N techs")
+    sh.add_argument("--workers", type=int, help="parallel reader processes (default: one per core)")
+    sh.add_argument("--no-cache", dest="cache", action="store_false", help=f"ignore and don't write {SHOP_CACHE_NAME}")
+    srv = sub.add_parser("serve", help="accept newline-delimited JSON unit events from scanners and scripts")
+    srv.add_argument("--host", default=INGEST_HOST, help=f"TCP address to listen on (default {INGEST_HOST})")
+    srv.add_argument("--port", type=int, default=INGEST_PORT, help=f"TCP port (default {INGEST_PORT})")
+    if HAS_UNIX_SOCKETS:
+        srv.add_argument("--socket", help="listen on this Unix socket path instead of TCP")
+    imp = sub.add_parser("import", help="stream a legacy CSV/TSV export of past output into the history "
+                         "(rows dated today count toward today's output)")
+    imp.add_argument("file", help="CSV or TSV file, any size")
+    imp.add_argument("--mapping", help="JSON file mapping its columns onto categories (see progress_import)")
+    imp.add_argument("--batch", type=int, default=IMPORT_BATCH_ROWS,
+                     help=f"source rows per transaction (default {IMPORT_BATCH_ROWS})")
+    imp.add_argument("--dry-run", action="store_true", help="parse and total the file without saving")
+    bat = sub.add_parser("batch", help="apply many add/remove lines as one transaction with a single write")
+    bat.add_argument("file", nargs="?", default="-", help="file of entries, or - for stdin (default)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "import":
+        try:
+            import_history(args.file, args.mapping, max(1, args.batch), args.dry_run, args.storage)
+        except (OSError, ValueError) as exc:
+            print(f"\nerror: {exc}", file=sys.stderr)
+            return 2
+        return 0
+    if args.command == "shop":
+        # Reads other trackers only; this station's own files are not opened
+        try:
+            shop(args.folder, args.json, args.limit, args.workers, args.cache)
+        except (OSError, ValueError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 2
+        return 0
+    try:
+        if args.command == "batch":
+            if args.file == "-":
+                entries = read_batch(sys.stdin)
+            else:
+                with open(args.file, encoding="utf-8") as f:
+                    entries = read_batch(f)
+        elif args.command in ("add", "remove"):
+            entries = [entry_delta(args)]
+        elif args.command == "quick":
+            entries = parse_codes(" ".join(args.codes))
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    # CSV + journal unless --storage, $WEIGHTED_OUTPUT_STORAGE or tracker_config.json's
+    # "storage" picks sqlite (the engine also rolls the start-of-day baseline over on load)
+    try:
+        engine = open_engine(kind=args.storage)
+    except (ValueError, *STORAGE_ERRORS) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    if args.command in (None, "serve"):
+        start_metrics(engine)
+    if args.command == "serve":
+        try:
+            serve(engine, args.host, args.port, getattr(args, "socket", None))
+        except OSError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        finally:
+            engine.close(save=False)
+        return 0
+    if args.command is None:
+        interactive(engine)
+        return 0
+    if args.command == "report":
+        report(engine, args.json, args.bucket, args.limit, args.start, args.end)
+        engine.close(save=False)
+        return 0
+    if args.command in ("merge", "publish"):
+        try:
+            if args.command == "merge":
+                files, moved = engine.merge_replicas(args.paths)
+                print(f"Merged {files} replica file(s); totals moved by {moved:+d} unit(s).")
+            else:
+                print(f"Wrote {engine.publish_replica(args.path)}")
+        except (OSError, ValueError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        finally:
+            engine.close(save=False)
+        return 0
+    if args.command in ("undo", "redo"):
+        try:
+            label = engine.undo() if args.command == "undo" else engine.redo()
+        except ValueError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            close_engine(engine)
+            return 1
+        except STORAGE_ERRORS as exc:
+            return storage_failed(engine, exc)
+        if not close_engine(engine):
+            return 1
+        print(f"{args.command.capitalize()}: {label}" if label else f"Nothing to {args.command}.")
+        return 0
+    try:
+        # Scripted changes go to the journal/event log in one write; no extra snapshot
+        applied = engine.apply_batch(entries)
+    except ValueError as exc:
+        print(f"error: {exc} No changes saved.", file=sys.stderr)
+        close_engine(engine)
+        return 1
+    except STORAGE_ERRORS as exc:
+        return storage_failed(engine, exc)
+    if not close_engine(engine):
+        return 1
+    units = sum(abs(sum(delta)) for _action, delta in entries)
+    print(f"Applied {applied} entr{'y' if applied == 1 else 'ies'} ({units} unit(s)).")
+    return 0
+
+
 if __name__ == "__main__":
-    main()
+    # lets the shop command's process pool start inside a frozen executable
+    multiprocessing.freeze_support()
+    sys.exit(main())
 
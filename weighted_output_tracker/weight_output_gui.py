@@ -1,258 +1,77 @@
+import os
 import sys
-import csv
-from datetime import date
-from pathlib import Path
+import time
+from datetime import date, datetime, timedelta
+
+_STARTED = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import tkinter.font as tkfont
 
+from entry_codes import describe, parse_codes
+from progress_buckets import BUCKET_KINDS
+from tracker_engine import open_engine
+from unit_registry import CATEGORIES, FAMILIES, KEY_INDEX, N_CATEGORIES, dot, family_vector, zero_vector
 
-if getattr(sys, "frozen", False):
-    BASE_DIR = Path(sys.executable).parent
-else:
-    BASE_DIR = Path(__file__).parent
 
-FILE_PATH = BASE_DIR / "output_progress.csv"
+# "1" prints the startup trace to stderr; any other value is a log file to append it to
+TRACE_ENV = "WEIGHTED_OUTPUT_TRACE"
 
+# How often the pace/projection line is recomputed while the window is open
+PACE_TICK_MS = 30_000
+# How often to check whether another process (CLI, second GUI) changed the data files
+WATCH_MS = 2000
+# Fire the rollover timer just after the boundary, never on the old day's side of it
+ROLLOVER_SLACK_MS = 500
 
-DEV_POINTS = {
-    "QM Warranty": 0.75,
-    "PM": 0.25,
-    "Minor Repair": 0.50,
-    "Flat Rate": 1.0,
-    "Manufacture Warranty": 1.0,
-}
+# How long a status toast stays up
+TOAST_MS = 3000
 
-STRATUS_POINTS = 0.75
-HOMEFILL_POINTS = 2.0
-
-# Per-unit points for newly added unit types
-UNIT_POINTS = {
-    "Perfecto 2V": {
-        "QM Warranty": 1.0,
-        "Flat Rate": 1.25,
-        "Manufacture Warranty": 1.25,
-    },
-    "M10": {
-        "QM Warranty": 1.25,
-        "Flat Rate": 1.75,
-        "Manufacture Warranty": 1.75,
-    },
-    "Rhythm LM5A": {
-        "QM Warranty": 0.75,
-        "Flat Rate": 1.0,
-        "Manufacture Warranty": 1.0,
-    },
-    "Rhythm LM5BA": {
-        "QM Warranty": 0.75,
-        "Flat Rate": 1.0,
-        "Manufacture Warranty": 1.0,
-    },
-    "Rhythm LM5CA": {
-        "QM Warranty": 0.75,
-        "Flat Rate": 1.0,
-        "Manufacture Warranty": 1.0,
-    },
-    "POC": {
-        "Repair": 2.0,
-    },
+# Bucket selector entry, "started with" label and output label for each bucket kind
+BUCKET_TITLES = {
+    "day": ("Day", "Started today with", "Today's Output"),
+    "shift": ("Shift", "Started this shift with", "This Shift's Output"),
+    "hour": ("Hour", "Started this hour with", "This Hour's Output"),
+    "week": ("Week", "Started this week with", "This Week's Output"),
 }
 
 
-def load_progress():
-    if FILE_PATH.exists():
-        try:
-            with FILE_PATH.open(newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    state = {
-                        "output": int(row.get("output", 0)),
-                        "weighted_output": float(row.get("weighted_output", 0.0)),
-                        "count_stratus": int(row.get("count_stratus", 0)),
-                        "count_stratus_flat": int(row.get("count_stratus_flat", 0)),
-                        "count_stratus_manuf": int(row.get("count_stratus_manuf", 0)),
-                        "count_homefill": int(row.get("count_homefill", 0)),
-                        "count_homefill_flat": int(row.get("count_homefill_flat", 0)),
-                        "count_homefill_manuf": int(row.get("count_homefill_manuf", 0)),
-                        "count_qm": int(row.get("count_qm", 0)),
-                        "count_pm": int(row.get("count_pm", 0)),
-                        "count_minor": int(row.get("count_minor", 0)),
-                        "count_flat": int(row.get("count_flat", 0)),
-                        "count_manuf": int(row.get("count_manuf", 0)),
-                        "count_1025_qm": int(row.get("count_1025_qm", 0)),
-                        "count_1025_pm": int(row.get("count_1025_pm", 0)),
-                        "count_1025_minor": int(row.get("count_1025_minor", 0)),
-                        "count_1025_flat": int(row.get("count_1025_flat", 0)),
-                        "count_1025_manuf": int(row.get("count_1025_manuf", 0)),
-                        # New unit type counters
-                        "count_perfecto_qm": int(row.get("count_perfecto_qm", 0)),
-                        "count_perfecto_flat": int(row.get("count_perfecto_flat", 0)),
-                        "count_perfecto_manuf": int(row.get("count_perfecto_manuf", 0)),
-                        "count_m10_qm": int(row.get("count_m10_qm", 0)),
-                        "count_m10_flat": int(row.get("count_m10_flat", 0)),
-                        "count_m10_manuf": int(row.get("count_m10_manuf", 0)),
-                        "count_lm5a_qm": int(row.get("count_lm5a_qm", 0)),
-                        "count_lm5a_flat": int(row.get("count_lm5a_flat", 0)),
-                        "count_lm5a_manuf": int(row.get("count_lm5a_manuf", 0)),
-                        "count_lm5ba_qm": int(row.get("count_lm5ba_qm", 0)),
-                        "count_lm5ba_flat": int(row.get("count_lm5ba_flat", 0)),
-                        "count_lm5ba_manuf": int(row.get("count_lm5ba_manuf", 0)),
-                        "count_lm5ca_qm": int(row.get("count_lm5ca_qm", 0)),
-                        "count_lm5ca_flat": int(row.get("count_lm5ca_flat", 0)),
-                        "count_lm5ca_manuf": int(row.get("count_lm5ca_manuf", 0)),
-                        "count_poc_repair": int(row.get("count_poc_repair", 0)),
-                        "start_date": row.get("start_date") or "",
-                        "start_of_day_output": int(row.get("start_of_day_output", 0)),
-                    }
-                    # migrate/sync Stratus totals vs subcategories
-                    sub = state.get("count_stratus_flat", 0) + state.get("count_stratus_manuf", 0)
-                    if sub > 0:
-                        state["count_stratus"] = sub
-                    elif state.get("count_stratus", 0) > 0 and sub == 0:
-                        state["count_stratus_flat"] = state.get("count_stratus", 0)
-                        state["count_stratus_manuf"] = 0
-                    # ensure start-of-day values
-                    today = date.today().isoformat()
-                    if state.get("start_date") != today:
-                        state["start_date"] = today
-                        state["start_of_day_output"] = state.get("output", 0)
-                        # write back immediately so other processes see it
-                        save_progress(state)
-                    return state
-        except Exception:
-            pass
-    return {
-        "output": 0,
-        "weighted_output": 0.0,
-        "count_stratus": 0,
-        "count_stratus_flat": 0,
-        "count_stratus_manuf": 0,
-        "count_homefill": 0,
-        "count_homefill_flat": 0,
-        "count_homefill_manuf": 0,
-        "count_qm": 0,
-        "count_pm": 0,
-        "count_minor": 0,
-        "count_flat": 0,
-        "count_manuf": 0,
-        "count_1025_qm": 0,
-        "count_1025_pm": 0,
-        "count_1025_minor": 0,
-        "count_1025_flat": 0,
-        "count_1025_manuf": 0,
-        # New unit type counters (defaults)
-        "count_perfecto_qm": 0,
-        "count_perfecto_flat": 0,
-        "count_perfecto_manuf": 0,
-        "count_m10_qm": 0,
-        "count_m10_flat": 0,
-        "count_m10_manuf": 0,
-        "count_lm5a_qm": 0,
-        "count_lm5a_flat": 0,
-        "count_lm5a_manuf": 0,
-        "count_lm5ba_qm": 0,
-        "count_lm5ba_flat": 0,
-        "count_lm5ba_manuf": 0,
-        "count_lm5ca_qm": 0,
-        "count_lm5ca_flat": 0,
-        "count_lm5ca_manuf": 0,
-        "count_poc_repair": 0,
-        "start_date": date.today().isoformat(),
-        "start_of_day_output": 0,
-    }
-
-
-def save_progress(state):
-    with FILE_PATH.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "output",
-                "weighted_output",
-                "count_stratus",
-                "count_stratus_flat",
-                "count_stratus_manuf",
-                "count_homefill",
-                "count_homefill_flat",
-                "count_homefill_manuf",
-                "count_qm",
-                "count_pm",
-                "count_minor",
-                "count_flat",
-                "count_manuf",
-                "count_1025_qm",
-                "count_1025_pm",
-                "count_1025_minor",
-                "count_1025_flat",
-                "count_1025_manuf",
-                # New unit types
-                "count_perfecto_qm",
-                "count_perfecto_flat",
-                "count_perfecto_manuf",
-                "count_m10_qm",
-                "count_m10_flat",
-                "count_m10_manuf",
-                "count_lm5a_qm",
-                "count_lm5a_flat",
-                "count_lm5a_manuf",
-                "count_lm5ba_qm",
-                "count_lm5ba_flat",
-                "count_lm5ba_manuf",
-                "count_lm5ca_qm",
-                "count_lm5ca_flat",
-                "count_lm5ca_manuf",
-                "count_poc_repair",
-                "start_date",
-                "start_of_day_output",
-            ],
-        )
-        writer.writeheader()
-        writer.writerow(
-            {
-                "output": state["output"],
-                "weighted_output": state["weighted_output"],
-                "count_stratus": state.get("count_stratus", 0),
-                "count_stratus_flat": state.get("count_stratus_flat", 0),
-                "count_stratus_manuf": state.get("count_stratus_manuf", 0),
-                "count_homefill": state.get("count_homefill", 0),
-                "count_homefill_flat": state.get("count_homefill_flat", 0),
-                "count_homefill_manuf": state.get("count_homefill_manuf", 0),
-                "count_qm": state.get("count_qm", 0),
-                "count_pm": state.get("count_pm", 0),
-                "count_minor": state.get("count_minor", 0),
-                "count_flat": state.get("count_flat", 0),
-                "count_manuf": state.get("count_manuf", 0),
-                "count_1025_qm": state.get("count_1025_qm", 0),
-                "count_1025_pm": state.get("count_1025_pm", 0),
-                "count_1025_minor": state.get("count_1025_minor", 0),
-                "count_1025_flat": state.get("count_1025_flat", 0),
-                "count_1025_manuf": state.get("count_1025_manuf", 0),
-                # New unit types
-                "count_perfecto_qm": state.get("count_perfecto_qm", 0),
-                "count_perfecto_flat": state.get("count_perfecto_flat", 0),
-                "count_perfecto_manuf": state.get("count_perfecto_manuf", 0),
-                "count_m10_qm": state.get("count_m10_qm", 0),
-                "count_m10_flat": state.get("count_m10_flat", 0),
-                "count_m10_manuf": state.get("count_m10_manuf", 0),
-                "count_lm5a_qm": state.get("count_lm5a_qm", 0),
-                "count_lm5a_flat": state.get("count_lm5a_flat", 0),
-                "count_lm5a_manuf": state.get("count_lm5a_manuf", 0),
-                "count_lm5ba_qm": state.get("count_lm5ba_qm", 0),
-                "count_lm5ba_flat": state.get("count_lm5ba_flat", 0),
-                "count_lm5ba_manuf": state.get("count_lm5ba_manuf", 0),
-                "count_lm5ca_qm": state.get("count_lm5ca_qm", 0),
-                "count_lm5ca_flat": state.get("count_lm5ca_flat", 0),
-                "count_lm5ca_manuf": state.get("count_lm5ca_manuf", 0),
-                "count_poc_repair": state.get("count_poc_repair", 0),
-                "start_date": state.get("start_date", date.today().isoformat()),
-                "start_of_day_output": state.get("start_of_day_output", 0),
-            }
-        )
+class StartupTrace:
+    # Wall-clock time spent in each cold-start phase, measured from module import
+    def __init__(self, started):
+        self.started = self.last = started
+        self.marks = []
+
+    def mark(self, label):
+        now = time.perf_counter()
+        self.marks.append((label, now - self.last))
+        self.last = now
+
+    def summary(self):
+        phases = ", ".join(f"{label} {secs * 1000:.1f} ms" for label, secs in self.marks)
+        return f"startup: {phases}; total {(self.last - self.started) * 1000:.1f} ms"
+
+    def emit(self):
+        target = os.environ.get(TRACE_ENV, "").strip()
+        if not target:
+            return
+        if target == "1":
+            print(self.summary(), file=sys.stderr)
+            return
+        with open(target, "a", encoding="utf-8") as f:
+            f.write(f"{datetime.now().isoformat(timespec='seconds')} {self.summary()}\n")
+
+
+TRACE = StartupTrace(_STARTED)
+TRACE.mark("imports")
 
 
 class WeightedOutputApp(tk.Tk):
     def __init__(self):
         super().__init__()
+        self.trace = TRACE
+        self.trace.mark("tk init")
         self.title("Weighted Output Tracker")
         # Bold font for totals in breakdown
         try:
@@ -260,26 +79,38 @@ class WeightedOutputApp(tk.Tk):
             self.bold_font.configure(weight="bold")
         except Exception:
             self.bold_font = (None, 10, "bold")
-        self.state = load_progress()
-        # ensure keys exist for older CSVs
-        for k in ("count_stratus","count_homefill","count_homefill_flat","count_homefill_manuf",
-            "count_qm","count_pm","count_minor","count_flat","count_manuf",
-            "count_1025_qm","count_1025_pm","count_1025_minor","count_1025_flat","count_1025_manuf",
-            # new unit types
-            "count_perfecto_qm","count_perfecto_flat","count_perfecto_manuf",
-            "count_m10_qm","count_m10_flat","count_m10_manuf",
-            "count_lm5a_qm","count_lm5a_flat","count_lm5a_manuf",
-            "count_lm5ba_qm","count_lm5ba_flat","count_lm5ba_manuf",
-            "count_lm5ca_qm","count_lm5ca_flat","count_lm5ca_manuf",
-            "count_poc_repair"):
-            self.state.setdefault(k, 0)
-        # ensure start-of-day on startup
-        self._ensure_start_of_day()
+        # CSV + journal by default; "storage": "sqlite" in tracker_config.json (or
+        # $WEIGHTED_OUTPUT_STORAGE) picks the database backend.
+        # Disk writes happen on a background thread; see _poll_save_status
+        self.engine = open_engine(background=True)
+        self._save_poll_armed = False
+        self.trace.mark("state load")
 
         self._build_ui()
         self._refresh_totals()
+        self.trace.mark("ui build")
 
         self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after_idle(self._on_first_paint)
+        self.after(PACE_TICK_MS, self._on_pace_tick)
+        self.after(WATCH_MS, self._on_watch_tick)
+        self._arm_rollover()
+        self._start_metrics()
+
+    def _start_metrics(self):
+        # Dashboard endpoint when tracker_config.json sets metrics_port; it serves from its
+        # own thread, so scrapes never wait on the UI
+        if not self.engine.config.get("metrics_port"):
+            return
+        try:
+            self.engine.start_metrics()
+        except (OSError, ValueError) as exc:
+            self._toast(f"Metrics endpoint not started: {exc}", error=True)
+
+    def _on_first_paint(self):
+        self.update_idletasks()
+        self.trace.mark("first paint")
+        self.trace.emit()
 
     def _build_ui(self):
         container = ttk.Frame(self, padding=12)
@@ -299,14 +130,16 @@ class WeightedOutputApp(tk.Tk):
         self.output_var = tk.StringVar()
         ttk.Label(totals, textvariable=self.output_var).grid(row=0, column=1, sticky="w")
 
-        # Started today with (editable) next to Total Output
-        ttk.Label(totals, text="Started today with:").grid(row=0, column=2, sticky="e", padx=(24, 0))
+        # Started <bucket> with (editable) next to Total Output
+        self.start_title_var = tk.StringVar()
+        ttk.Label(totals, textvariable=self.start_title_var).grid(row=0, column=2, sticky="e", padx=(24, 0))
         self.start_var = tk.StringVar()
         ttk.Label(totals, textvariable=self.start_var).grid(row=0, column=3, sticky="w")
         ttk.Button(totals, text="Edit", command=self._edit_start_of_day).grid(row=0, column=4, sticky="w", padx=(6,0))
 
-        # Today's Output further right
-        ttk.Label(totals, text="Today's Output:").grid(row=0, column=5, sticky="e", padx=(24, 0))
+        # Current bucket's output further right
+        self.today_title_var = tk.StringVar()
+        ttk.Label(totals, textvariable=self.today_title_var).grid(row=0, column=5, sticky="e", padx=(24, 0))
         self.today_var = tk.StringVar()
         ttk.Label(totals, textvariable=self.today_var).grid(row=0, column=6, sticky="w")
         ttk.Button(totals, text="Edit", command=self._edit_today_output).grid(row=0, column=7, sticky="w", padx=(6,0))
@@ -315,314 +148,142 @@ class WeightedOutputApp(tk.Tk):
         self.weighted_var = tk.StringVar()
         ttk.Label(totals, textvariable=self.weighted_var).grid(row=0, column=9, sticky="w")
 
+        # Rolling 7/30/90-day weighted output and the 30-day family mix
+        self.rolling_var = tk.StringVar()
+        ttk.Label(totals, textvariable=self.rolling_var, foreground="#333").grid(row=1, column=0, columnspan=10, sticky="w", pady=(6, 0))
+        self.mix_var = tk.StringVar()
+        ttk.Label(totals, textvariable=self.mix_var, foreground="#555").grid(row=2, column=0, columnspan=10, sticky="w")
+
+        # Live pace and end-of-shift projection; refreshed by _on_pace_tick
+        self.pace_var = tk.StringVar()
+        ttk.Label(totals, textvariable=self.pace_var, foreground="#333").grid(row=3, column=0, columnspan=8, sticky="w", pady=(2, 0))
+        ttk.Button(totals, text="Target", command=self._edit_target).grid(row=3, column=8, sticky="e", padx=(6,0))
+
+        # Which time bucket the started-with / output pair above shows and edits
+        ttk.Label(totals, text="Bucket:").grid(row=4, column=0, sticky="w", pady=(4, 0))
+        self.bucket_kind = tk.StringVar(value=BUCKET_TITLES["day"][0])
+        bucket_box = ttk.Combobox(totals, textvariable=self.bucket_kind, state="readonly", width=8,
+                                  values=[BUCKET_TITLES[k][0] for k in BUCKET_KINDS])
+        bucket_box.grid(row=4, column=1, sticky="w", pady=(4, 0))
+        bucket_box.bind("<<ComboboxSelected>>", lambda _e: self._refresh_bucket())
+        self.bucket_label_var = tk.StringVar()
+        ttk.Label(totals, textvariable=self.bucket_label_var, foreground="#555").grid(row=4, column=2, columnspan=6, sticky="w", pady=(4, 0))
+
+        # Rapid entry: codes such as 5q, 10p x2, s f, -m10 w commit on Enter; Ctrl+E jumps here
+        ttk.Label(totals, text="Quick entry:").grid(row=5, column=0, sticky="w", pady=(6, 0))
+        self.quick_var = tk.StringVar()
+        self.quick_entry = ttk.Entry(totals, textvariable=self.quick_var, width=24)
+        self.quick_entry.grid(row=5, column=1, columnspan=2, sticky="w", pady=(6, 0))
+        self.quick_entry.bind("<Return>", self._on_quick_entry)
+        self.quick_entry.bind("<Escape>", lambda _e: self.quick_var.set(""))
+        self.bind_all("<Control-e>", lambda _e: self.quick_entry.focus_set())
+        self.stage_quick = tk.BooleanVar(value=False)
+        ttk.Checkbutton(totals, text="Stage", variable=self.stage_quick).grid(row=5, column=2, sticky="e", pady=(6, 0))
+        # Non-blocking feedback for quick entry and the Add/Remove tabs; clears itself
+        self.toast_var = tk.StringVar()
+        self.toast_label = ttk.Label(totals, textvariable=self.toast_var)
+        self.toast_label.grid(row=5, column=3, columnspan=7, sticky="w", padx=(12, 0), pady=(6, 0))
+        self._toast_after = None
+
         ttk.Separator(container, orient="horizontal").grid(row=1, column=0, sticky="ew", pady=8)
 
-        notebook = ttk.Notebook(container)
-        notebook.grid(row=2, column=0, sticky="nsew")
+        self.notebook = ttk.Notebook(container)
+        self.notebook.grid(row=2, column=0, sticky="nsew")
         container.rowconfigure(2, weight=1)
 
-        add_tab = ttk.Frame(notebook, padding=12)
-        rem_tab = ttk.Frame(notebook, padding=12)
-        brk_tab = ttk.Frame(notebook, padding=12)
-        notebook.add(add_tab, text="Add")
-        notebook.add(rem_tab, text="Remove")
-        notebook.add(brk_tab, text="Breakdown")
-
-        # Add Tab
-        self._build_add_tab(add_tab)
-        # Remove Tab
-        self._build_remove_tab(rem_tab)
-        # Breakdown Tab
-        self._build_breakdown_tab(brk_tab)
-        ttk.Button(brk_tab, text="Edit breakdown", command=self._open_edit_breakdown).grid(row=1, column=0, pady=(12,0), sticky="w")
+        # Tabs start as empty placeholder frames and are filled in on first selection
+        self.bd_labels = None  # set once the Breakdown tab is built
+        self.hist_tab = None  # set once the History tab is built
+        self.stage_tree = None  # set once the Stage tab is built
+        # Signed per-category quantities waiting for one Commit (Stage tab / staged quick entry)
+        self.staged = zero_vector()
+        self.stage_var = tk.StringVar()
+        self._tab_builders = {}
+        for text, builder in (
+            ("Add", self._build_add_tab),
+            ("Remove", self._build_remove_tab),
+            ("Stage", self._build_stage_tab),
+            ("Breakdown", self._build_breakdown_tab),
+            ("History", self._build_history_tab),
+        ):
+            tab = ttk.Frame(self.notebook, padding=12)
+            self.notebook.add(tab, text=text)
+            self._tab_builders[str(tab)] = (tab, builder)
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._on_tab_changed()
+
+        # Write-behind status: shows when changes are still on their way to disk
+        self.save_status_var = tk.StringVar(value="All changes saved")
+        ttk.Label(container, textvariable=self.save_status_var, foreground="#555").grid(row=3, column=0, sticky="w", pady=(8, 0))
+
+        # Ctrl+Z / Ctrl+Y step back and forth through every add, remove and edit
+        self.undo_var = tk.StringVar()
+        ttk.Label(container, textvariable=self.undo_var, foreground="#555").grid(row=3, column=0, sticky="e", pady=(8, 0))
+        self.bind_all("<Control-z>", self._undo)
+        self.bind_all("<Control-y>", self._redo)
+        self.bind_all("<Control-Z>", self._redo)  # Ctrl+Shift+Z
+
+    def _on_tab_changed(self, _event=None):
+        entry = self._tab_builders.pop(self.notebook.select(), None)
+        if entry is not None:
+            tab, builder = entry
+            builder(tab)
+        elif self._history_visible():
+            self._refresh_history()
 
     def _build_add_tab(self, parent):
-        # Stratus add (subcategories)
-        str_frame = ttk.LabelFrame(parent, text="Stratus (enter per-type quantities)", padding=8)
-        str_frame.grid(row=0, column=0, sticky="ew")
-        self.add_s_flat = tk.StringVar(value="0")
-        self.add_s_manuf = tk.StringVar(value="0")
-        self._row_inputs(str_frame, 0, [
-            ("Stratus Flat Rate", self.add_s_flat),
-            ("Stratus Manufacture Warranty", self.add_s_manuf),
-        ])
-        ttk.Button(str_frame, text="Add", command=self._add_stratus).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Homefill add (subcategories)
-        hf_frame = ttk.LabelFrame(parent, text="Homefill (enter per-type quantities)", padding=8)
-        hf_frame.grid(row=1, column=0, sticky="ew", pady=(10, 0))
-        self.add_h_flat = tk.StringVar(value="0")
-        self.add_h_manuf = tk.StringVar(value="0")
-        self._row_inputs(hf_frame, 0, [
-            ("Homefill Flat Rate", self.add_h_flat),
-            ("Homefill Manufacture Warranty", self.add_h_manuf),
-        ])
-        ttk.Button(hf_frame, text="Add", command=self._add_homefill).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # 525 add
-        dev = ttk.LabelFrame(parent, text="525 (enter per-warranty quantities)", padding=8)
-        dev.grid(row=2, column=0, sticky="ew", pady=(10, 0))
-
-        self.add_q = tk.StringVar(value="0")
-        self.add_p = tk.StringVar(value="0")
-        self.add_m = tk.StringVar(value="0")
-        self.add_f = tk.StringVar(value="0")
-        self.add_w = tk.StringVar(value="0")
-
-        self._row_inputs(dev, 0, [
-            ("QM Warranty", self.add_q),
-            ("PM", self.add_p),
-            ("Minor Repair", self.add_m),
-            ("Flat Rate", self.add_f),
-            ("Manufacture Warranty", self.add_w),
-        ])
-
-        ttk.Button(dev, text="Add", command=self._add_525).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # 1025 add
-        dev10 = ttk.LabelFrame(parent, text="1025 (enter per-warranty quantities)", padding=8)
-        dev10.grid(row=3, column=0, sticky="ew", pady=(10, 0))
-
-        self.add10_q = tk.StringVar(value="0")
-        self.add10_p = tk.StringVar(value="0")
-        self.add10_m = tk.StringVar(value="0")
-        self.add10_f = tk.StringVar(value="0")
-        self.add10_w = tk.StringVar(value="0")
-
-        self._row_inputs(dev10, 0, [
-            ("QM Warranty", self.add10_q),
-            ("PM", self.add10_p),
-            ("Minor Repair", self.add10_m),
-            ("Flat Rate", self.add10_f),
-            ("Manufacture Warranty", self.add10_w),
-        ])
-
-        ttk.Button(dev10, text="Add", command=self._add_1025).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Perfecto 2V add
-        perfecto = ttk.LabelFrame(parent, text="Perfecto 2V (enter per-warranty quantities)", padding=8)
-        perfecto.grid(row=4, column=0, sticky="ew", pady=(10, 0))
-        self.add_perfecto_qm = tk.StringVar(value="0")
-        self.add_perfecto_flat = tk.StringVar(value="0")
-        self.add_perfecto_manuf = tk.StringVar(value="0")
-        self._row_inputs(perfecto, 0, [
-            ("QM Warranty", self.add_perfecto_qm),
-            ("Flat Rate", self.add_perfecto_flat),
-            ("Manufacture Warranty", self.add_perfecto_manuf),
-        ])
-        ttk.Button(perfecto, text="Add", command=self._add_perfecto).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # M10 add
-        m10 = ttk.LabelFrame(parent, text="M10 (enter per-warranty quantities)", padding=8)
-        m10.grid(row=5, column=0, sticky="ew", pady=(10, 0))
-        self.add_m10_qm = tk.StringVar(value="0")
-        self.add_m10_flat = tk.StringVar(value="0")
-        self.add_m10_manuf = tk.StringVar(value="0")
-        self._row_inputs(m10, 0, [
-            ("QM Warranty", self.add_m10_qm),
-            ("Flat Rate", self.add_m10_flat),
-            ("Manufacture Warranty", self.add_m10_manuf),
-        ])
-        ttk.Button(m10, text="Add", command=self._add_m10).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Rhythm LM5A add
-        lm5a = ttk.LabelFrame(parent, text="Rhythm LM5A (enter per-warranty quantities)", padding=8)
-        lm5a.grid(row=6, column=0, sticky="ew", pady=(10, 0))
-        self.add_lm5a_qm = tk.StringVar(value="0")
-        self.add_lm5a_flat = tk.StringVar(value="0")
-        self.add_lm5a_manuf = tk.StringVar(value="0")
-        self._row_inputs(lm5a, 0, [
-            ("QM Warranty", self.add_lm5a_qm),
-            ("Flat Rate", self.add_lm5a_flat),
-            ("Manufacture Warranty", self.add_lm5a_manuf),
-        ])
-        ttk.Button(lm5a, text="Add", command=self._add_lm5a).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Rhythm LM5BA add
-        lm5ba = ttk.LabelFrame(parent, text="Rhythm LM5BA (enter per-warranty quantities)", padding=8)
-        lm5ba.grid(row=7, column=0, sticky="ew", pady=(10, 0))
-        self.add_lm5ba_qm = tk.StringVar(value="0")
-        self.add_lm5ba_flat = tk.StringVar(value="0")
-        self.add_lm5ba_manuf = tk.StringVar(value="0")
-        self._row_inputs(lm5ba, 0, [
-            ("QM Warranty", self.add_lm5ba_qm),
-            ("Flat Rate", self.add_lm5ba_flat),
-            ("Manufacture Warranty", self.add_lm5ba_manuf),
-        ])
-        ttk.Button(lm5ba, text="Add", command=self._add_lm5ba).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Rhythm LM5CA add
-        lm5ca = ttk.LabelFrame(parent, text="Rhythm LM5CA (enter per-warranty quantities)", padding=8)
-        lm5ca.grid(row=8, column=0, sticky="ew", pady=(10, 0))
-        self.add_lm5ca_qm = tk.StringVar(value="0")
-        self.add_lm5ca_flat = tk.StringVar(value="0")
-        self.add_lm5ca_manuf = tk.StringVar(value="0")
-        self._row_inputs(lm5ca, 0, [
-            ("QM Warranty", self.add_lm5ca_qm),
-            ("Flat Rate", self.add_lm5ca_flat),
-            ("Manufacture Warranty", self.add_lm5ca_manuf),
-        ])
-        ttk.Button(lm5ca, text="Add", command=self._add_lm5ca).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # POC add
-        poc = ttk.LabelFrame(parent, text="POC (enter quantity)", padding=8)
-        poc.grid(row=9, column=0, sticky="ew", pady=(10, 0))
-        self.add_poc_repair = tk.StringVar(value="0")
-        self._row_inputs(poc, 0, [
-            ("Repair", self.add_poc_repair),
-        ])
-        ttk.Button(poc, text="Add", command=self._add_poc).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Flow these sections into columns when nearing bottom
-        self.add_sections = [
-            str_frame, hf_frame, dev, dev10, perfecto, m10, lm5a, lm5ba, lm5ca, poc
-        ]
-        parent.bind("<Configure>", lambda e: self._flow_layout(parent, self.add_sections, columns=2))
-        self._flow_layout(parent, self.add_sections, columns=2)
+        self.add_vars = {}
+        self.add_sections = self._build_entry_tab(parent, self.add_vars, "Add", self._add_family)
 
     def _build_remove_tab(self, parent):
-        # Stratus remove (subcategories)
-        str_frame = ttk.LabelFrame(parent, text="Stratus (enter per-type quantities)", padding=8)
-        str_frame.grid(row=0, column=0, sticky="ew")
-        self.rem_s_flat = tk.StringVar(value="0")
-        self.rem_s_manuf = tk.StringVar(value="0")
-        self._row_inputs(str_frame, 0, [
-            ("Stratus Flat Rate", self.rem_s_flat),
-            ("Stratus Manufacture Warranty", self.rem_s_manuf),
-        ])
-        ttk.Button(str_frame, text="Remove", command=self._remove_stratus).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Homefill remove (subcategories)
-        hf_frame = ttk.LabelFrame(parent, text="Homefill (enter per-type quantities)", padding=8)
-        hf_frame.grid(row=1, column=0, sticky="ew", pady=(10, 0))
-        self.rem_h_flat = tk.StringVar(value="0")
-        self.rem_h_manuf = tk.StringVar(value="0")
-        self._row_inputs(hf_frame, 0, [
-            ("Homefill Flat Rate", self.rem_h_flat),
-            ("Homefill Manufacture Warranty", self.rem_h_manuf),
-        ])
-        ttk.Button(hf_frame, text="Remove", command=self._remove_homefill).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # 525 remove
-        dev = ttk.LabelFrame(parent, text="525 (enter per-warranty quantities)", padding=8)
-        dev.grid(row=2, column=0, sticky="ew", pady=(10, 0))
-
-        self.rem_q = tk.StringVar(value="0")
-        self.rem_p = tk.StringVar(value="0")
-        self.rem_m = tk.StringVar(value="0")
-        self.rem_f = tk.StringVar(value="0")
-        self.rem_w = tk.StringVar(value="0")
-
-        self._row_inputs(dev, 0, [
-            ("QM Warranty", self.rem_q),
-            ("PM", self.rem_p),
-            ("Minor Repair", self.rem_m),
-            ("Flat Rate", self.rem_f),
-            ("Manufacture Warranty", self.rem_w),
-        ])
-
-        ttk.Button(dev, text="Remove", command=self._remove_525).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # 1025 remove
-        dev10 = ttk.LabelFrame(parent, text="1025 (enter per-warranty quantities)", padding=8)
-        dev10.grid(row=3, column=0, sticky="ew", pady=(10, 0))
-
-        self.rem10_q = tk.StringVar(value="0")
-        self.rem10_p = tk.StringVar(value="0")
-        self.rem10_m = tk.StringVar(value="0")
-        self.rem10_f = tk.StringVar(value="0")
-        self.rem10_w = tk.StringVar(value="0")
-
-        self._row_inputs(dev10, 0, [
-            ("QM Warranty", self.rem10_q),
-            ("PM", self.rem10_p),
-            ("Minor Repair", self.rem10_m),
-            ("Flat Rate", self.rem10_f),
-            ("Manufacture Warranty", self.rem10_w),
-        ])
-
-        ttk.Button(dev10, text="Remove", command=self._remove_1025).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Perfecto 2V remove
-        perfecto = ttk.LabelFrame(parent, text="Perfecto 2V (enter per-warranty quantities)", padding=8)
-        perfecto.grid(row=4, column=0, sticky="ew", pady=(10, 0))
-        self.rem_perfecto_qm = tk.StringVar(value="0")
-        self.rem_perfecto_flat = tk.StringVar(value="0")
-        self.rem_perfecto_manuf = tk.StringVar(value="0")
-        self._row_inputs(perfecto, 0, [
-            ("QM Warranty", self.rem_perfecto_qm),
-            ("Flat Rate", self.rem_perfecto_flat),
-            ("Manufacture Warranty", self.rem_perfecto_manuf),
-        ])
-        ttk.Button(perfecto, text="Remove", command=self._remove_perfecto).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # M10 remove
-        m10 = ttk.LabelFrame(parent, text="M10 (enter per-warranty quantities)", padding=8)
-        m10.grid(row=5, column=0, sticky="ew", pady=(10, 0))
-        self.rem_m10_qm = tk.StringVar(value="0")
-        self.rem_m10_flat = tk.StringVar(value="0")
-        self.rem_m10_manuf = tk.StringVar(value="0")
-        self._row_inputs(m10, 0, [
-            ("QM Warranty", self.rem_m10_qm),
-            ("Flat Rate", self.rem_m10_flat),
-            ("Manufacture Warranty", self.rem_m10_manuf),
-        ])
-        ttk.Button(m10, text="Remove", command=self._remove_m10).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Rhythm LM5A remove
-        lm5a = ttk.LabelFrame(parent, text="Rhythm LM5A (enter per-warranty quantities)", padding=8)
-        lm5a.grid(row=6, column=0, sticky="ew", pady=(10, 0))
-        self.rem_lm5a_qm = tk.StringVar(value="0")
-        self.rem_lm5a_flat = tk.StringVar(value="0")
-        self.rem_lm5a_manuf = tk.StringVar(value="0")
-        self._row_inputs(lm5a, 0, [
-            ("QM Warranty", self.rem_lm5a_qm),
-            ("Flat Rate", self.rem_lm5a_flat),
-            ("Manufacture Warranty", self.rem_lm5a_manuf),
-        ])
-        ttk.Button(lm5a, text="Remove", command=self._remove_lm5a).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Rhythm LM5BA remove
-        lm5ba = ttk.LabelFrame(parent, text="Rhythm LM5BA (enter per-warranty quantities)", padding=8)
-        lm5ba.grid(row=7, column=0, sticky="ew", pady=(10, 0))
-        self.rem_lm5ba_qm = tk.StringVar(value="0")
-        self.rem_lm5ba_flat = tk.StringVar(value="0")
-        self.rem_lm5ba_manuf = tk.StringVar(value="0")
-        self._row_inputs(lm5ba, 0, [
-            ("QM Warranty", self.rem_lm5ba_qm),
-            ("Flat Rate", self.rem_lm5ba_flat),
-            ("Manufacture Warranty", self.rem_lm5ba_manuf),
-        ])
-        ttk.Button(lm5ba, text="Remove", command=self._remove_lm5ba).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # Rhythm LM5CA remove
-        lm5ca = ttk.LabelFrame(parent, text="Rhythm LM5CA (enter per-warranty quantities)", padding=8)
-        lm5ca.grid(row=8, column=0, sticky="ew", pady=(10, 0))
-        self.rem_lm5ca_qm = tk.StringVar(value="0")
-        self.rem_lm5ca_flat = tk.StringVar(value="0")
-        self.rem_lm5ca_manuf = tk.StringVar(value="0")
-        self._row_inputs(lm5ca, 0, [
-            ("QM Warranty", self.rem_lm5ca_qm),
-            ("Flat Rate", self.rem_lm5ca_flat),
-            ("Manufacture Warranty", self.rem_lm5ca_manuf),
-        ])
-        ttk.Button(lm5ca, text="Remove", command=self._remove_lm5ca).grid(row=2, column=0, pady=(6, 0), sticky="w")
-
-        # POC remove
-        poc = ttk.LabelFrame(parent, text="POC (enter quantity)", padding=8)
-        poc.grid(row=9, column=0, sticky="ew", pady=(10, 0))
-        self.rem_poc_repair = tk.StringVar(value="0")
-        self._row_inputs(poc, 0, [
-            ("Repair", self.rem_poc_repair),
-        ])
-        ttk.Button(poc, text="Remove", command=self._remove_poc).grid(row=2, column=0, pady=(6, 0), sticky="w")
+        self.rem_vars = {}
+        self.rem_sections = self._build_entry_tab(parent, self.rem_vars, "Remove", self._remove_family)
+
+    def _build_stage_tab(self, parent):
+        # Left: per-family entries that stage instead of committing; right: the pending cart
+        parent.columnconfigure(0, weight=1)
+        parent.rowconfigure(0, weight=1)
+        entries = ttk.Frame(parent)
+        entries.grid(row=0, column=0, sticky="nsew")
+        self.stage_vars = {}
+        self._build_entry_tab(entries, self.stage_vars, "Stage", self._stage_family)
+
+        cart = ttk.Frame(parent)
+        cart.grid(row=0, column=1, sticky="ns", padx=(16, 0))
+        cart.rowconfigure(1, weight=1)
+        ttk.Label(cart, textvariable=self.stage_var, font=self.bold_font).grid(row=0, column=0, columnspan=3, sticky="w")
+        self.stage_tree = ttk.Treeview(cart, columns=("Qty", "Points"), show="tree headings", height=16)
+        self.stage_tree.heading("#0", text="Unit / Warranty")
+        self.stage_tree.heading("Qty", text="Qty")
+        self.stage_tree.heading("Points", text="Points")
+        self.stage_tree.column("#0", width=240, anchor="w")
+        self.stage_tree.column("Qty", width=60, anchor="center")
+        self.stage_tree.column("Points", width=70, anchor="center")
+        self.stage_tree.grid(row=1, column=0, columnspan=3, sticky="nsew", pady=(6, 6))
+        ttk.Button(cart, text="Commit", command=self._commit_staged).grid(row=2, column=0, sticky="w")
+        ttk.Button(cart, text="Unstage selected", command=self._unstage_selected).grid(row=2, column=1, padx=(8, 0))
+        ttk.Button(cart, text="Clear", command=self._clear_staged).grid(row=2, column=2, padx=(8, 0))
+        self._refresh_staged()
+
+    def _build_entry_tab(self, parent, entry_vars, verb, action):
+        # One section per registry family with a quantity entry per warranty type
+        sections = []
+        for i, fam in enumerate(FAMILIES):
+            hint = "enter quantity" if len(fam.categories) == 1 else "enter per-warranty quantities"
+            frame = ttk.LabelFrame(parent, text=f"{fam.name} ({hint})", padding=8)
+            frame.grid(row=i, column=0, sticky="ew", pady=(10, 0) if i else 0)
+            pairs = []
+            for cat in fam.categories:
+                entry_vars[cat.key] = tk.StringVar(value="0")
+                pairs.append((cat.warranty, entry_vars[cat.key]))
+            self._row_inputs(frame, 0, pairs)
+            ttk.Button(frame, text=verb, command=lambda f=fam: action(f)).grid(row=2, column=0, pady=(6, 0), sticky="w")
+            sections.append(frame)
 
         # Flow these sections into columns when nearing bottom
-        self.rem_sections = [
-            str_frame, hf_frame, dev, dev10, perfecto, m10, lm5a, lm5ba, lm5ca, poc
-        ]
-        parent.bind("<Configure>", lambda e: self._flow_layout(parent, self.rem_sections, columns=2))
-        self._flow_layout(parent, self.rem_sections, columns=2)
+        parent.bind("<Configure>", lambda e: self._flow_layout(parent, sections, columns=2))
+        self._flow_layout(parent, sections, columns=2)
+        return sections
 
     def _row_inputs(self, parent, start_row, pairs):
         # Helper to place label/entry pairs in grid, two per row if space
@@ -636,564 +297,150 @@ class WeightedOutputApp(tk.Tk):
                 col = 0
                 row += 1
 
-    def _refresh_totals(self):
-        # rollover start-of-day if the date changed
-        self._ensure_start_of_day()
-        self.output_var.set(str(self.state["output"]))
-        self.weighted_var.set(f"{self.state['weighted_output']:.2f}")
-        self.start_var.set(str(self.state.get("start_of_day_output", 0)))
-        # compute today's output as total minus start-of-day
-        today = max(0, self.state.get("output", 0) - self.state.get("start_of_day_output", 0))
-        self.today_var.set(str(today))
+    def _refresh_totals(self, changed=None):
+        # changed: categories touched by the last add/remove; None means anything may have moved.
+        # (Day rollover is handled by the _on_rollover timer, not here.)
+        self._poll_save_status()
+        self.output_var.set(str(self.engine.state.output))
+        self.weighted_var.set(f"{self.engine.state.weighted_output:.2f}")
+        self._refresh_bucket()
+        self._refresh_undo()
+        self.rolling_var.set("Rolling weighted: " + "   ".join(
+            f"{days}d {pts:.2f} pts ({avg:.2f}/day worked)" for days, _units, pts, avg in self.engine.rolling_totals()
+        ))
+        mix = self.engine.family_mix(30)
+        self.mix_var.set("30-day mix: " + (" · ".join(f"{fam.name} {share:.0%}" for fam, share in mix) if mix else "no output yet"))
+        self._refresh_pace()
         # refresh breakdown labels if present
-        if hasattr(self, "bd_labels"):
-            self._refresh_breakdown()
-
-    def _ensure_start_of_day(self):
-        today = date.today().isoformat()
-        if self.state.get("start_date") != today:
-            self.state["start_date"] = today
-            self.state["start_of_day_output"] = self.state.get("output", 0)
-            save_progress(self.state)
-
-    # ---- Add handlers ----
-    def _add_stratus(self):
-        s_flat = self._parse_nonneg(self.add_s_flat)
-        s_manuf = self._parse_nonneg(self.add_s_manuf)
-        qty = s_flat + s_manuf
-        if qty == 0:
-            messagebox.showinfo("No Action", "Enter at least one Stratus quantity to add.")
-            return
-        self.state["output"] += qty
-        self.state["weighted_output"] += STRATUS_POINTS * qty
-        self.state["count_stratus_flat"] = self.state.get("count_stratus_flat", 0) + s_flat
-        self.state["count_stratus_manuf"] = self.state.get("count_stratus_manuf", 0) + s_manuf
-        self.state["count_stratus"] = self.state.get("count_stratus", 0) + qty
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {qty} Stratus unit(s).")
-
-    def _add_homefill(self):
-        h_flat = self._parse_nonneg(self.add_h_flat)
-        h_manuf = self._parse_nonneg(self.add_h_manuf)
-        qty = h_flat + h_manuf
-        if qty == 0:
-            messagebox.showinfo("No Action", "Enter at least one Homefill quantity to add.")
-            return
-        self.state["output"] += qty
-        self.state["weighted_output"] += HOMEFILL_POINTS * qty
-        self.state["count_homefill_flat"] = self.state.get("count_homefill_flat", 0) + h_flat
-        self.state["count_homefill_manuf"] = self.state.get("count_homefill_manuf", 0) + h_manuf
-        self.state["count_homefill"] = self.state.get("count_homefill", 0) + qty
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {qty} Homefill unit(s).")
-
-    def _add_525(self):
-        q = self._parse_nonneg(self.add_q)
-        p = self._parse_nonneg(self.add_p)
-        m = self._parse_nonneg(self.add_m)
-        f = self._parse_nonneg(self.add_f)
-        w = self._parse_nonneg(self.add_w)
-        total = q + p + m + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one quantity to add.")
-            return
-        self.state["output"] += total
-        self.state["weighted_output"] += (
-            DEV_POINTS["QM Warranty"] * q
-            + DEV_POINTS["PM"] * p
-            + DEV_POINTS["Minor Repair"] * m
-            + DEV_POINTS["Flat Rate"] * f
-            + DEV_POINTS["Manufacture Warranty"] * w
-        )
-        self.state["count_qm"] = self.state.get("count_qm", 0) + q
-        self.state["count_pm"] = self.state.get("count_pm", 0) + p
-        self.state["count_minor"] = self.state.get("count_minor", 0) + m
-        self.state["count_flat"] = self.state.get("count_flat", 0) + f
-        self.state["count_manuf"] = self.state.get("count_manuf", 0) + w
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {total} unit(s) across 525 warranties.")
-
-    def _add_1025(self):
-        q = self._parse_nonneg(self.add10_q)
-        p = self._parse_nonneg(self.add10_p)
-        m = self._parse_nonneg(self.add10_m)
-        f = self._parse_nonneg(self.add10_f)
-        w = self._parse_nonneg(self.add10_w)
-        total = q + p + m + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one quantity to add.")
-            return
-        self.state["output"] += total
-        self.state["weighted_output"] += (
-            DEV_POINTS["QM Warranty"] * q
-            + DEV_POINTS["PM"] * p
-            + DEV_POINTS["Minor Repair"] * m
-            + DEV_POINTS["Flat Rate"] * f
-            + DEV_POINTS["Manufacture Warranty"] * w
-        )
-        self.state["count_1025_qm"] = self.state.get("count_1025_qm", 0) + q
-        self.state["count_1025_pm"] = self.state.get("count_1025_pm", 0) + p
-        self.state["count_1025_minor"] = self.state.get("count_1025_minor", 0) + m
-        self.state["count_1025_flat"] = self.state.get("count_1025_flat", 0) + f
-        self.state["count_1025_manuf"] = self.state.get("count_1025_manuf", 0) + w
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {total} unit(s) across 1025 warranties.")
-
-    def _add_perfecto(self):
-        q = self._parse_nonneg(self.add_perfecto_qm)
-        f = self._parse_nonneg(self.add_perfecto_flat)
-        w = self._parse_nonneg(self.add_perfecto_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Perfecto 2V quantity to add.")
-            return
-        self.state["output"] += total
-        self.state["weighted_output"] += (
-            UNIT_POINTS["Perfecto 2V"]["QM Warranty"] * q
-            + UNIT_POINTS["Perfecto 2V"]["Flat Rate"] * f
-            + UNIT_POINTS["Perfecto 2V"]["Manufacture Warranty"] * w
-        )
-        self.state["count_perfecto_qm"] = self.state.get("count_perfecto_qm", 0) + q
-        self.state["count_perfecto_flat"] = self.state.get("count_perfecto_flat", 0) + f
-        self.state["count_perfecto_manuf"] = self.state.get("count_perfecto_manuf", 0) + w
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {total} Perfecto 2V unit(s).")
-
-    def _add_m10(self):
-        q = self._parse_nonneg(self.add_m10_qm)
-        f = self._parse_nonneg(self.add_m10_flat)
-        w = self._parse_nonneg(self.add_m10_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one M10 quantity to add.")
-            return
-        self.state["output"] += total
-        self.state["weighted_output"] += (
-            UNIT_POINTS["M10"]["QM Warranty"] * q
-            + UNIT_POINTS["M10"]["Flat Rate"] * f
-            + UNIT_POINTS["M10"]["Manufacture Warranty"] * w
-        )
-        self.state["count_m10_qm"] = self.state.get("count_m10_qm", 0) + q
-        self.state["count_m10_flat"] = self.state.get("count_m10_flat", 0) + f
-        self.state["count_m10_manuf"] = self.state.get("count_m10_manuf", 0) + w
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {total} M10 unit(s).")
-
-    def _add_lm5a(self):
-        q = self._parse_nonneg(self.add_lm5a_qm)
-        f = self._parse_nonneg(self.add_lm5a_flat)
-        w = self._parse_nonneg(self.add_lm5a_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Rhythm LM5A quantity to add.")
-            return
-        self.state["output"] += total
-        self.state["weighted_output"] += (
-            UNIT_POINTS["Rhythm LM5A"]["QM Warranty"] * q
-            + UNIT_POINTS["Rhythm LM5A"]["Flat Rate"] * f
-            + UNIT_POINTS["Rhythm LM5A"]["Manufacture Warranty"] * w
-        )
-        self.state["count_lm5a_qm"] = self.state.get("count_lm5a_qm", 0) + q
-        self.state["count_lm5a_flat"] = self.state.get("count_lm5a_flat", 0) + f
-        self.state["count_lm5a_manuf"] = self.state.get("count_lm5a_manuf", 0) + w
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {total} Rhythm LM5A unit(s).")
-
-    def _add_lm5ba(self):
-        q = self._parse_nonneg(self.add_lm5ba_qm)
-        f = self._parse_nonneg(self.add_lm5ba_flat)
-        w = self._parse_nonneg(self.add_lm5ba_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Rhythm LM5BA quantity to add.")
-            return
-        self.state["output"] += total
-        self.state["weighted_output"] += (
-            UNIT_POINTS["Rhythm LM5BA"]["QM Warranty"] * q
-            + UNIT_POINTS["Rhythm LM5BA"]["Flat Rate"] * f
-            + UNIT_POINTS["Rhythm LM5BA"]["Manufacture Warranty"] * w
-        )
-        self.state["count_lm5ba_qm"] = self.state.get("count_lm5ba_qm", 0) + q
-        self.state["count_lm5ba_flat"] = self.state.get("count_lm5ba_flat", 0) + f
-        self.state["count_lm5ba_manuf"] = self.state.get("count_lm5ba_manuf", 0) + w
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {total} Rhythm LM5BA unit(s).")
-
-    def _add_lm5ca(self):
-        q = self._parse_nonneg(self.add_lm5ca_qm)
-        f = self._parse_nonneg(self.add_lm5ca_flat)
-        w = self._parse_nonneg(self.add_lm5ca_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Rhythm LM5CA quantity to add.")
-            return
-        self.state["output"] += total
-        self.state["weighted_output"] += (
-            UNIT_POINTS["Rhythm LM5CA"]["QM Warranty"] * q
-            + UNIT_POINTS["Rhythm LM5CA"]["Flat Rate"] * f
-            + UNIT_POINTS["Rhythm LM5CA"]["Manufacture Warranty"] * w
-        )
-        self.state["count_lm5ca_qm"] = self.state.get("count_lm5ca_qm", 0) + q
-        self.state["count_lm5ca_flat"] = self.state.get("count_lm5ca_flat", 0) + f
-        self.state["count_lm5ca_manuf"] = self.state.get("count_lm5ca_manuf", 0) + w
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {total} Rhythm LM5CA unit(s).")
-
-    def _add_poc(self):
-        r = self._parse_nonneg(self.add_poc_repair)
-        if r == 0:
-            messagebox.showinfo("No Action", "Enter at least one POC Repair quantity to add.")
-            return
-        self.state["output"] += r
-        self.state["weighted_output"] += UNIT_POINTS["POC"]["Repair"] * r
-        self.state["count_poc_repair"] = self.state.get("count_poc_repair", 0) + r
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Added", f"Added {r} POC Repair unit(s).")
-
-    # ---- Remove handlers ----
-    def _remove_stratus(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        s_flat = self._parse_nonneg(self.rem_s_flat)
-        s_manuf = self._parse_nonneg(self.rem_s_manuf)
-        qty = s_flat + s_manuf
-        if qty == 0:
-            messagebox.showinfo("No Action", "Enter at least one Stratus quantity to remove.")
-            return
-        if qty > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        if s_flat > self.state.get("count_stratus_flat", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more Stratus Flat Rate than recorded.")
-            return
-        if s_manuf > self.state.get("count_stratus_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more Stratus Manufacture Warranty than recorded.")
-            return
-        self.state["output"] -= qty
-        self.state["weighted_output"] -= STRATUS_POINTS * qty
-        self.state["count_stratus_flat"] -= s_flat
-        self.state["count_stratus_manuf"] -= s_manuf
-        self.state["count_stratus"] -= qty
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {qty} Stratus unit(s).")
+        if self.bd_labels is not None:
+            self._refresh_breakdown(changed)
+        if self._history_visible():
+            self._refresh_history()
 
-    def _remove_homefill(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        h_flat = self._parse_nonneg(self.rem_h_flat)
-        h_manuf = self._parse_nonneg(self.rem_h_manuf)
-        qty = h_flat + h_manuf
-        if qty == 0:
-            messagebox.showinfo("No Action", "Enter at least one Homefill quantity to remove.")
-            return
-        if qty > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        if h_flat > self.state.get("count_homefill_flat", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more Homefill Flat Rate than recorded.")
-            return
-        if h_manuf > self.state.get("count_homefill_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more Homefill Manufacture Warranty than recorded.")
-            return
-        self.state["output"] -= qty
-        self.state["weighted_output"] -= HOMEFILL_POINTS * qty
-        self.state["count_homefill_flat"] -= h_flat
-        self.state["count_homefill_manuf"] -= h_manuf
-        self.state["count_homefill"] -= qty
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {qty} Homefill unit(s).")
+    # ---- Add / remove handlers ----
+    def _read_family(self, entry_vars, fam):
+        return [self._parse_nonneg(entry_vars[c.key]) for c in fam.categories]
 
-    def _remove_525(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        q = self._parse_nonneg(self.rem_q)
-        p = self._parse_nonneg(self.rem_p)
-        m = self._parse_nonneg(self.rem_m)
-        f = self._parse_nonneg(self.rem_f)
-        w = self._parse_nonneg(self.rem_w)
-        total = q + p + m + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one quantity to remove.")
-            return
-        if total > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        # per-category checks
-        if q > self.state.get("count_qm", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more QM Warranty than recorded.")
-            return
-        if p > self.state.get("count_pm", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more PM than recorded.")
-            return
-        if m > self.state.get("count_minor", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more Minor Repair than recorded.")
-            return
-        if f > self.state.get("count_flat", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more Flat Rate than recorded.")
-            return
-        if w > self.state.get("count_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more Manufacture Warranty than recorded.")
-            return
-        self.state["output"] -= total
-        self.state["weighted_output"] -= (
-            DEV_POINTS["QM Warranty"] * q
-            + DEV_POINTS["PM"] * p
-            + DEV_POINTS["Minor Repair"] * m
-            + DEV_POINTS["Flat Rate"] * f
-            + DEV_POINTS["Manufacture Warranty"] * w
-        )
-        self.state["count_qm"] -= q
-        self.state["count_pm"] -= p
-        self.state["count_minor"] -= m
-        self.state["count_flat"] -= f
-        self.state["count_manuf"] -= w
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {total} unit(s) across 525 warranties.")
-
-    def _remove_1025(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        q = self._parse_nonneg(self.rem10_q)
-        p = self._parse_nonneg(self.rem10_p)
-        m = self._parse_nonneg(self.rem10_m)
-        f = self._parse_nonneg(self.rem10_f)
-        w = self._parse_nonneg(self.rem10_w)
-        total = q + p + m + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one quantity to remove.")
-            return
-        if total > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        # per-category checks
-        if q > self.state.get("count_1025_qm", 0) or \
-           p > self.state.get("count_1025_pm", 0) or \
-           m > self.state.get("count_1025_minor", 0) or \
-           f > self.state.get("count_1025_flat", 0) or \
-           w > self.state.get("count_1025_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more than recorded for 1025 categories.")
-            return
-        self.state["output"] -= total
-        self.state["weighted_output"] -= (
-            DEV_POINTS["QM Warranty"] * q
-            + DEV_POINTS["PM"] * p
-            + DEV_POINTS["Minor Repair"] * m
-            + DEV_POINTS["Flat Rate"] * f
-            + DEV_POINTS["Manufacture Warranty"] * w
-        )
-        self.state["count_1025_qm"] -= q
-        self.state["count_1025_pm"] -= p
-        self.state["count_1025_minor"] -= m
-        self.state["count_1025_flat"] -= f
-        self.state["count_1025_manuf"] -= w
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {total} unit(s) across 1025 warranties.")
-
-    def _remove_perfecto(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        q = self._parse_nonneg(self.rem_perfecto_qm)
-        f = self._parse_nonneg(self.rem_perfecto_flat)
-        w = self._parse_nonneg(self.rem_perfecto_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Perfecto 2V quantity to remove.")
-            return
-        if total > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        if q > self.state.get("count_perfecto_qm", 0) or f > self.state.get("count_perfecto_flat", 0) or w > self.state.get("count_perfecto_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more than recorded for Perfecto 2V categories.")
-            return
-        self.state["output"] -= total
-        self.state["weighted_output"] -= (
-            UNIT_POINTS["Perfecto 2V"]["QM Warranty"] * q
-            + UNIT_POINTS["Perfecto 2V"]["Flat Rate"] * f
-            + UNIT_POINTS["Perfecto 2V"]["Manufacture Warranty"] * w
-        )
-        self.state["count_perfecto_qm"] -= q
-        self.state["count_perfecto_flat"] -= f
-        self.state["count_perfecto_manuf"] -= w
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {total} Perfecto 2V unit(s).")
+    def _touched(self, fam, qty):
+        return [c for c, q in zip(fam.categories, qty) if q]
 
-    def _remove_m10(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        q = self._parse_nonneg(self.rem_m10_qm)
-        f = self._parse_nonneg(self.rem_m10_flat)
-        w = self._parse_nonneg(self.rem_m10_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one M10 quantity to remove.")
-            return
-        if total > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
+    def _add_family(self, fam):
+        qty = self._read_family(self.add_vars, fam)
+        if sum(qty) == 0:
+            messagebox.showinfo("No Action", f"Enter at least one {fam.name} quantity to add.")
             return
-        if q > self.state.get("count_m10_qm", 0) or f > self.state.get("count_m10_flat", 0) or w > self.state.get("count_m10_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more than recorded for M10 categories.")
-            return
-        self.state["output"] -= total
-        self.state["weighted_output"] -= (
-            UNIT_POINTS["M10"]["QM Warranty"] * q
-            + UNIT_POINTS["M10"]["Flat Rate"] * f
-            + UNIT_POINTS["M10"]["Manufacture Warranty"] * w
-        )
-        self.state["count_m10_qm"] -= q
-        self.state["count_m10_flat"] -= f
-        self.state["count_m10_manuf"] -= w
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {total} M10 unit(s).")
+        total = self.engine.add_family(fam, qty)
+        self._refresh_totals(self._touched(fam, qty))
+        self._toast(f"Added {total} {fam.name} unit(s).")
 
-    def _remove_lm5a(self):
-        if self.state["output"] == 0:
+    def _remove_family(self, fam):
+        if self.engine.state.output == 0:
             messagebox.showwarning("No Units", "No units to remove.")
             return
-        q = self._parse_nonneg(self.rem_lm5a_qm)
-        f = self._parse_nonneg(self.rem_lm5a_flat)
-        w = self._parse_nonneg(self.rem_lm5a_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Rhythm LM5A quantity to remove.")
+        qty = self._read_family(self.rem_vars, fam)
+        if sum(qty) == 0:
+            messagebox.showinfo("No Action", f"Enter at least one {fam.name} quantity to remove.")
             return
-        if total > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        if q > self.state.get("count_lm5a_qm", 0) or f > self.state.get("count_lm5a_flat", 0) or w > self.state.get("count_lm5a_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more than recorded for Rhythm LM5A categories.")
+        try:
+            total = self.engine.remove_family(fam, qty)
+        except ValueError as exc:
+            messagebox.showwarning("Too Many", str(exc))
             return
-        self.state["output"] -= total
-        self.state["weighted_output"] -= (
-            UNIT_POINTS["Rhythm LM5A"]["QM Warranty"] * q
-            + UNIT_POINTS["Rhythm LM5A"]["Flat Rate"] * f
-            + UNIT_POINTS["Rhythm LM5A"]["Manufacture Warranty"] * w
-        )
-        self.state["count_lm5a_qm"] -= q
-        self.state["count_lm5a_flat"] -= f
-        self.state["count_lm5a_manuf"] -= w
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {total} Rhythm LM5A unit(s).")
+        self._refresh_totals(self._touched(fam, qty))
+        self._toast(f"Removed {total} {fam.name} unit(s).")
 
-    def _remove_lm5ba(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        q = self._parse_nonneg(self.rem_lm5ba_qm)
-        f = self._parse_nonneg(self.rem_lm5ba_flat)
-        w = self._parse_nonneg(self.rem_lm5ba_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Rhythm LM5BA quantity to remove.")
-            return
-        if total > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        if q > self.state.get("count_lm5ba_qm", 0) or f > self.state.get("count_lm5ba_flat", 0) or w > self.state.get("count_lm5ba_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more than recorded for Rhythm LM5BA categories.")
+    def _on_quick_entry(self, _event=None):
+        try:
+            entries = parse_codes(self.quick_var.get())
+            text, points = describe(entries)
+            if not self.stage_quick.get():
+                self.engine.apply_batch(entries, text)
+        except ValueError as exc:
+            self._toast(str(exc), error=True)
+            return "break"
+        self.quick_var.set("")
+        if self.stage_quick.get():
+            for action, delta in entries:
+                self._stage(delta, -1 if action == "remove" else 1)
+            self._toast(f"Staged {text} ({points:+.2f} pts)")
+            return "break"
+        self._refresh_totals([c for c in CATEGORIES if any(delta[c.index] for _action, delta in entries)])
+        self._toast(f"{text} ({points:+.2f} pts)")
+        return "break"
+
+    def _toast(self, text, error=False):
+        if self._toast_after is not None:
+            self.after_cancel(self._toast_after)
+        self.toast_label.configure(foreground="#b00020" if error else "#1b5e20")
+        self.toast_var.set(text)
+        self._toast_after = self.after(TOAST_MS, self._clear_toast)
+
+    def _clear_toast(self):
+        self._toast_after = None
+        self.toast_var.set("")
+
+    # ---- staging ----
+    def _stage(self, delta, sign=1):
+        for i, q in enumerate(delta):
+            if q:
+                self.staged[i] += sign * q
+        self._refresh_staged()
+
+    def _stage_family(self, fam):
+        qty = self._read_family(self.stage_vars, fam)
+        if sum(qty) == 0:
+            self._toast(f"Enter at least one {fam.name} quantity to stage.", error=True)
+            return
+        self._stage(family_vector(fam, qty))
+        for cat in fam.categories:
+            self.stage_vars[cat.key].set("0")
+        self._toast(f"Staged {sum(qty)} {fam.name} unit(s).")
+
+    def _staged_entries(self):
+        adds = [max(0, q) for q in self.staged]
+        removes = [max(0, -q) for q in self.staged]
+        return [(action, delta) for action, delta in (("add", adds), ("remove", removes)) if any(delta)]
+
+    def _refresh_staged(self):
+        # Live preview of what Commit would do
+        units = sum(self.staged)
+        points = dot(self.staged)
+        self.stage_var.set(f"Staged: {units:+d} units, {points:+.2f} pts" if any(self.staged) else "Nothing staged")
+        if self.stage_tree is None:
+            return
+        self.stage_tree.delete(*self.stage_tree.get_children())
+        for cat in CATEGORIES:
+            q = self.staged[cat.index]
+            if q:
+                self.stage_tree.insert("", "end", iid=cat.key, text=f"{cat.unit} {cat.warranty}",
+                                       values=(f"{q:+d}", f"{q * cat.points:+.2f}"))
+
+    def _commit_staged(self):
+        # One validation, one storage write, one refresh for the whole cart
+        entries = self._staged_entries()
+        if not entries:
+            self._toast("Nothing staged.", error=True)
+            return
+        text, points = describe(entries)
+        try:
+            self.engine.apply_batch(entries, text)
+        except ValueError as exc:
+            self._toast(str(exc), error=True)
             return
-        self.state["output"] -= total
-        self.state["weighted_output"] -= (
-            UNIT_POINTS["Rhythm LM5BA"]["QM Warranty"] * q
-            + UNIT_POINTS["Rhythm LM5BA"]["Flat Rate"] * f
-            + UNIT_POINTS["Rhythm LM5BA"]["Manufacture Warranty"] * w
-        )
-        self.state["count_lm5ba_qm"] -= q
-        self.state["count_lm5ba_flat"] -= f
-        self.state["count_lm5ba_manuf"] -= w
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {total} Rhythm LM5BA unit(s).")
+        changed = [c for c in CATEGORIES if self.staged[c.index]]
+        self.staged = zero_vector()
+        self._refresh_staged()
+        self._refresh_totals(changed)
+        self._toast(f"Committed {text} ({points:+.2f} pts)")
 
-    def _remove_lm5ca(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        q = self._parse_nonneg(self.rem_lm5ca_qm)
-        f = self._parse_nonneg(self.rem_lm5ca_flat)
-        w = self._parse_nonneg(self.rem_lm5ca_manuf)
-        total = q + f + w
-        if total == 0:
-            messagebox.showinfo("No Action", "Enter at least one Rhythm LM5CA quantity to remove.")
-            return
-        if total > self.state["output"]:
-            messagebox.showwarning("Too Many", "Cannot remove more than total output.")
-            return
-        if q > self.state.get("count_lm5ca_qm", 0) or f > self.state.get("count_lm5ca_flat", 0) or w > self.state.get("count_lm5ca_manuf", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more than recorded for Rhythm LM5CA categories.")
-            return
-        self.state["output"] -= total
-        self.state["weighted_output"] -= (
-            UNIT_POINTS["Rhythm LM5CA"]["QM Warranty"] * q
-            + UNIT_POINTS["Rhythm LM5CA"]["Flat Rate"] * f
-            + UNIT_POINTS["Rhythm LM5CA"]["Manufacture Warranty"] * w
-        )
-        self.state["count_lm5ca_qm"] -= q
-        self.state["count_lm5ca_flat"] -= f
-        self.state["count_lm5ca_manuf"] -= w
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {total} Rhythm LM5CA unit(s).")
+    def _unstage_selected(self):
+        for key in self.stage_tree.selection() or ():
+            self.staged[KEY_INDEX[key]] = 0
+        self._refresh_staged()
 
-    def _remove_poc(self):
-        if self.state["output"] == 0:
-            messagebox.showwarning("No Units", "No units to remove.")
-            return
-        r = self._parse_nonneg(self.rem_poc_repair)
-        if r == 0:
-            messagebox.showinfo("No Action", "Enter at least one POC Repair quantity to remove.")
-            return
-        if r > self.state.get("count_poc_repair", 0):
-            messagebox.showwarning("Too Many", "Cannot remove more POC Repair than recorded.")
-            return
-        self.state["output"] -= r
-        self.state["weighted_output"] -= UNIT_POINTS["POC"]["Repair"] * r
-        self.state["count_poc_repair"] -= r
-        if self.state["output"] == 0:
-            self.state["weighted_output"] = 0.0
-        save_progress(self.state)
-        self._refresh_totals()
-        messagebox.showinfo("Removed", f"Removed {r} POC Repair unit(s).")
+    def _clear_staged(self):
+        self.staged = zero_vector()
+        self._refresh_staged()
 
     # ---- breakdown tab ----
     def _build_breakdown_tab(self, parent):
@@ -1207,428 +454,70 @@ class WeightedOutputApp(tk.Tk):
         table_frame = ttk.Frame(parent)
         table_frame.grid(row=0, column=2, sticky="ne", padx=(16,0))
 
+        # count vars keyed by category key or family name; titles carry the points
         self.bd_labels = {}
         self.bd_title_vars = {}
-        row = 0
-
-        # Stratus total (bold)
-        title_stratus = tk.StringVar(value="Stratus:")
-        ttk.Label(grid, textvariable=title_stratus, font=self.bold_font).grid(row=row, column=0, sticky="w", pady=2)
-        var_stratus = tk.StringVar()
-        ttk.Label(grid, textvariable=var_stratus, font=self.bold_font).grid(row=row, column=1, sticky="w")
-        self.bd_labels["count_stratus"] = var_stratus
-        self.bd_title_vars["title_stratus"] = title_stratus
-        row += 1
-        # Stratus subcategories
-        title_s_flat = tk.StringVar(value="Stratus Flat Rate:")
-        ttk.Label(grid, textvariable=title_s_flat).grid(row=row, column=0, sticky="w", pady=2)
-        var_s_flat = tk.StringVar()
-        ttk.Label(grid, textvariable=var_s_flat).grid(row=row, column=1, sticky="w")
-        self.bd_labels["count_stratus_flat"] = var_s_flat
-        self.bd_title_vars["title_stratus_flat"] = title_s_flat
-        row += 1
-        title_s_manuf = tk.StringVar(value="Stratus Manufacture Warranty:")
-        ttk.Label(grid, textvariable=title_s_manuf).grid(row=row, column=0, sticky="w", pady=2)
-        var_s_manuf = tk.StringVar()
-        ttk.Label(grid, textvariable=var_s_manuf).grid(row=row, column=1, sticky="w")
-        self.bd_labels["count_stratus_manuf"] = var_s_manuf
-        self.bd_title_vars["title_stratus_manuf"] = title_s_manuf
-        row += 1
-
-        # Homefill total (bold)
-        title_homefill = tk.StringVar(value="Homefill:")
-        ttk.Label(grid, textvariable=title_homefill, font=self.bold_font).grid(row=row, column=0, sticky="w", pady=(8,2))
-        var_homefill = tk.StringVar()
-        ttk.Label(grid, textvariable=var_homefill, font=self.bold_font).grid(row=row, column=1, sticky="w")
-        self.bd_labels["count_homefill"] = var_homefill
-        self.bd_title_vars["title_homefill"] = title_homefill
-        row += 1
-        # Homefill subcategories
-        title_h_flat = tk.StringVar(value="Homefill Flat Rate:")
-        ttk.Label(grid, textvariable=title_h_flat).grid(row=row, column=0, sticky="w", pady=2)
-        var_h_flat = tk.StringVar()
-        ttk.Label(grid, textvariable=var_h_flat).grid(row=row, column=1, sticky="w")
-        self.bd_labels["count_homefill_flat"] = var_h_flat
-        self.bd_title_vars["title_homefill_flat"] = title_h_flat
-        row += 1
-        title_h_manuf = tk.StringVar(value="Homefill Manufacture Warranty:")
-        ttk.Label(grid, textvariable=title_h_manuf).grid(row=row, column=0, sticky="w", pady=2)
-        var_h_manuf = tk.StringVar()
-        ttk.Label(grid, textvariable=var_h_manuf).grid(row=row, column=1, sticky="w")
-        self.bd_labels["count_homefill_manuf"] = var_h_manuf
-        self.bd_title_vars["title_homefill_manuf"] = title_h_manuf
-        row += 1
-
-        # 525 total (bold)
-        title_525 = tk.StringVar(value="525:")
-        ttk.Label(grid, textvariable=title_525, font=self.bold_font).grid(row=row, column=0, sticky="w", pady=(8,2))
-        var_525_total = tk.StringVar()
-        ttk.Label(grid, textvariable=var_525_total, font=self.bold_font).grid(row=row, column=1, sticky="w")
-        self.bd_labels["total_525"] = var_525_total
-        self.bd_title_vars["title_525"] = title_525
-        row += 1
-        # 525 subcategories
-        for title, key in [
-            ("525 QM Warranty", "count_qm"),
-            ("525 PM", "count_pm"),
-            ("525 Minor Repair", "count_minor"),
-            ("525 Flat Rate", "count_flat"),
-            ("525 Manufacture Warranty", "count_manuf"),
-        ]:
-            tvar = tk.StringVar(value=f"{title}:")
-            ttk.Label(grid, textvariable=tvar).grid(row=row, column=0, sticky="w", pady=2)
-            var = tk.StringVar()
-            ttk.Label(grid, textvariable=var).grid(row=row, column=1, sticky="w")
-            self.bd_labels[key] = var
-            # map title vars by suffix for easy refresh
-            suffix = key.split("_")[-1]
-            self.bd_title_vars[f"title_525_{suffix}"] = tvar
-            row += 1
-
-        # 1025 total (bold)
-        title_1025 = tk.StringVar(value="1025:")
-        ttk.Label(grid, textvariable=title_1025, font=self.bold_font).grid(row=row, column=0, sticky="w", pady=(8,2))
-        var_1025_total = tk.StringVar()
-        ttk.Label(grid, textvariable=var_1025_total, font=self.bold_font).grid(row=row, column=1, sticky="w")
-        self.bd_labels["total_1025"] = var_1025_total
-        self.bd_title_vars["title_1025"] = title_1025
-        row += 1
-        # 1025 subcategories
-        for title, key in [
-            ("1025 QM Warranty", "count_1025_qm"),
-            ("1025 PM", "count_1025_pm"),
-            ("1025 Minor Repair", "count_1025_minor"),
-            ("1025 Flat Rate", "count_1025_flat"),
-            ("1025 Manufacture Warranty", "count_1025_manuf"),
-        ]:
-            tvar = tk.StringVar(value=f"{title}:")
-            ttk.Label(grid, textvariable=tvar).grid(row=row, column=0, sticky="w", pady=2)
+        # text last pushed into each var, so unchanged labels are never re-set
+        self._bd_shown = {}
+        # Split families over two columns of roughly equal height
+        half = sum(len(f.categories) + 1 for f in FAMILIES) / 2
+        rows = [0, 0]
+        col = 0
+        for fam in FAMILIES:
+            height = len(fam.categories) + 1
+            if col == 0 and rows[0] and rows[0] + height > half:
+                col = 1
+            target = grid if col == 0 else grid2
+            row = rows[col]
+            # family total (bold)
+            tvar = tk.StringVar(value=f"{fam.name}:")
+            ttk.Label(target, textvariable=tvar, font=self.bold_font).grid(row=row, column=0, sticky="w", pady=(8,2) if row else 2)
             var = tk.StringVar()
-            ttk.Label(grid, textvariable=var).grid(row=row, column=1, sticky="w")
-            self.bd_labels[key] = var
-            # map title vars by 1025 suffix
-            suffix = key.split("_")[-1]
-            self.bd_title_vars[f"title_1025_{suffix}"] = tvar
+            ttk.Label(target, textvariable=var, font=self.bold_font).grid(row=row, column=1, sticky="w")
+            self.bd_labels[fam.name] = var
+            self.bd_title_vars[fam.name] = tvar
             row += 1
+            # subcategories
+            for cat in fam.categories:
+                tvar = tk.StringVar(value=f"{cat.unit} {cat.warranty}:")
+                ttk.Label(target, textvariable=tvar).grid(row=row, column=0, sticky="w", pady=2)
+                var = tk.StringVar()
+                ttk.Label(target, textvariable=var).grid(row=row, column=1, sticky="w")
+                self.bd_labels[cat.key] = var
+                self.bd_title_vars[cat.key] = tvar
+                row += 1
+            rows[col] = row
 
         # Right-side table: points structure
         self._build_points_table(table_frame)
-
-        # Perfecto 2V total (bold)
-        title_perfecto = tk.StringVar(value="Perfecto 2V:")
-        ttk.Label(grid2, textvariable=title_perfecto, font=self.bold_font).grid(row=0, column=0, sticky="w", pady=(8,2))
-        var_perfecto_total = tk.StringVar()
-        ttk.Label(grid2, textvariable=var_perfecto_total, font=self.bold_font).grid(row=0, column=1, sticky="w")
-        self.bd_labels["count_perfecto_total"] = var_perfecto_total
-        self.bd_title_vars["title_perfecto"] = title_perfecto
-        r2 = 1
-        for title, key, tkey in [
-            ("Perfecto 2V QM Warranty", "count_perfecto_qm", "title_perfecto_qm"),
-            ("Perfecto 2V Flat Rate", "count_perfecto_flat", "title_perfecto_flat"),
-            ("Perfecto 2V Manufacture Warranty", "count_perfecto_manuf", "title_perfecto_manuf"),
-        ]:
-            tvar = tk.StringVar(value=f"{title}:")
-            ttk.Label(grid2, textvariable=tvar).grid(row=r2, column=0, sticky="w", pady=2)
-            var = tk.StringVar()
-            ttk.Label(grid2, textvariable=var).grid(row=r2, column=1, sticky="w")
-            self.bd_labels[key] = var
-            self.bd_title_vars[tkey] = tvar
-            r2 += 1
-
-        # M10 total (bold)
-        title_m10 = tk.StringVar(value="M10:")
-        ttk.Label(grid2, textvariable=title_m10, font=self.bold_font).grid(row=r2, column=0, sticky="w", pady=(8,2))
-        var_m10_total = tk.StringVar()
-        ttk.Label(grid2, textvariable=var_m10_total, font=self.bold_font).grid(row=r2, column=1, sticky="w")
-        self.bd_labels["count_m10_total"] = var_m10_total
-        self.bd_title_vars["title_m10"] = title_m10
-        r2 += 1
-        for title, key, tkey in [
-            ("M10 QM Warranty", "count_m10_qm", "title_m10_qm"),
-            ("M10 Flat Rate", "count_m10_flat", "title_m10_flat"),
-            ("M10 Manufacture Warranty", "count_m10_manuf", "title_m10_manuf"),
-        ]:
-            tvar = tk.StringVar(value=f"{title}:")
-            ttk.Label(grid2, textvariable=tvar).grid(row=r2, column=0, sticky="w", pady=2)
-            var = tk.StringVar()
-            ttk.Label(grid2, textvariable=var).grid(row=r2, column=1, sticky="w")
-            self.bd_labels[key] = var
-            self.bd_title_vars[tkey] = tvar
-            r2 += 1
-
-        # Rhythm LM5A total (bold)
-        title_lm5a = tk.StringVar(value="Rhythm LM5A:")
-        ttk.Label(grid2, textvariable=title_lm5a, font=self.bold_font).grid(row=r2, column=0, sticky="w", pady=(8,2))
-        var_lm5a_total = tk.StringVar()
-        ttk.Label(grid2, textvariable=var_lm5a_total, font=self.bold_font).grid(row=r2, column=1, sticky="w")
-        self.bd_labels["count_lm5a_total"] = var_lm5a_total
-        self.bd_title_vars["title_lm5a"] = title_lm5a
-        r2 += 1
-        for title, key, tkey in [
-            ("Rhythm LM5A QM Warranty", "count_lm5a_qm", "title_lm5a_qm"),
-            ("Rhythm LM5A Flat Rate", "count_lm5a_flat", "title_lm5a_flat"),
-            ("Rhythm LM5A Manufacture Warranty", "count_lm5a_manuf", "title_lm5a_manuf"),
-        ]:
-            tvar = tk.StringVar(value=f"{title}:")
-            ttk.Label(grid2, textvariable=tvar).grid(row=r2, column=0, sticky="w", pady=2)
-            var = tk.StringVar()
-            ttk.Label(grid2, textvariable=var).grid(row=r2, column=1, sticky="w")
-            self.bd_labels[key] = var
-            self.bd_title_vars[tkey] = tvar
-            r2 += 1
-
-        # Rhythm LM5BA total (bold)
-        title_lm5ba = tk.StringVar(value="Rhythm LM5BA:")
-        ttk.Label(grid2, textvariable=title_lm5ba, font=self.bold_font).grid(row=r2, column=0, sticky="w", pady=(8,2))
-        var_lm5ba_total = tk.StringVar()
-        ttk.Label(grid2, textvariable=var_lm5ba_total, font=self.bold_font).grid(row=r2, column=1, sticky="w")
-        self.bd_labels["count_lm5ba_total"] = var_lm5ba_total
-        self.bd_title_vars["title_lm5ba"] = title_lm5ba
-        r2 += 1
-        for title, key, tkey in [
-            ("Rhythm LM5BA QM Warranty", "count_lm5ba_qm", "title_lm5ba_qm"),
-            ("Rhythm LM5BA Flat Rate", "count_lm5ba_flat", "title_lm5ba_flat"),
-            ("Rhythm LM5BA Manufacture Warranty", "count_lm5ba_manuf", "title_lm5ba_manuf"),
-        ]:
-            tvar = tk.StringVar(value=f"{title}:")
-            ttk.Label(grid2, textvariable=tvar).grid(row=r2, column=0, sticky="w", pady=2)
-            var = tk.StringVar()
-            ttk.Label(grid2, textvariable=var).grid(row=r2, column=1, sticky="w")
-            self.bd_labels[key] = var
-            self.bd_title_vars[tkey] = tvar
-            r2 += 1
-
-        # Rhythm LM5CA total (bold)
-        title_lm5ca = tk.StringVar(value="Rhythm LM5CA:")
-        ttk.Label(grid2, textvariable=title_lm5ca, font=self.bold_font).grid(row=r2, column=0, sticky="w", pady=(8,2))
-        var_lm5ca_total = tk.StringVar()
-        ttk.Label(grid2, textvariable=var_lm5ca_total, font=self.bold_font).grid(row=r2, column=1, sticky="w")
-        self.bd_labels["count_lm5ca_total"] = var_lm5ca_total
-        self.bd_title_vars["title_lm5ca"] = title_lm5ca
-        r2 += 1
-        for title, key, tkey in [
-            ("Rhythm LM5CA QM Warranty", "count_lm5ca_qm", "title_lm5ca_qm"),
-            ("Rhythm LM5CA Flat Rate", "count_lm5ca_flat", "title_lm5ca_flat"),
-            ("Rhythm LM5CA Manufacture Warranty", "count_lm5ca_manuf", "title_lm5ca_manuf"),
-        ]:
-            tvar = tk.StringVar(value=f"{title}:")
-            ttk.Label(grid2, textvariable=tvar).grid(row=r2, column=0, sticky="w", pady=2)
-            var = tk.StringVar()
-            ttk.Label(grid2, textvariable=var).grid(row=r2, column=1, sticky="w")
-            self.bd_labels[key] = var
-            self.bd_title_vars[tkey] = tvar
-            r2 += 1
-
-        # POC total (bold)
-        title_poc = tk.StringVar(value="POC:")
-        ttk.Label(grid2, textvariable=title_poc, font=self.bold_font).grid(row=r2, column=0, sticky="w", pady=(8,2))
-        var_poc_total = tk.StringVar()
-        ttk.Label(grid2, textvariable=var_poc_total, font=self.bold_font).grid(row=r2, column=1, sticky="w")
-        self.bd_labels["count_poc_total"] = var_poc_total
-        self.bd_title_vars["title_poc"] = title_poc
-        r2 += 1
-        # POC subcategory
-        tvar = tk.StringVar(value="POC Repair:")
-        ttk.Label(grid2, textvariable=tvar).grid(row=r2, column=0, sticky="w", pady=2)
-        var = tk.StringVar()
-        ttk.Label(grid2, textvariable=var).grid(row=r2, column=1, sticky="w")
-        self.bd_labels["count_poc_repair"] = var
-        self.bd_title_vars["title_poc_repair"] = tvar
-        r2 += 1
-
-        # No dynamic flow needed here; content already split into two columns with table separate
+        bd_btns = ttk.Frame(parent)
+        bd_btns.grid(row=1, column=0, pady=(12,0), sticky="w")
+        ttk.Button(bd_btns, text="Edit breakdown", command=self._open_edit_breakdown).grid(row=0, column=0, padx=(0,8))
+        ttk.Button(bd_btns, text="Merge stations...", command=self._merge_stations).grid(row=0, column=1)
 
         self._refresh_breakdown()
 
-    def _refresh_breakdown(self):
-        # Stratus
-        self.bd_labels["count_stratus"].set(str(self.state.get("count_stratus", 0)))
-        self.bd_labels["count_stratus_flat"].set(str(self.state.get("count_stratus_flat", 0)))
-        self.bd_labels["count_stratus_manuf"].set(str(self.state.get("count_stratus_manuf", 0)))
-        # Stratus points in titles
-        s_total = self.state.get("count_stratus", 0)
-        s_flat = self.state.get("count_stratus_flat", 0)
-        s_manuf = self.state.get("count_stratus_manuf", 0)
-        self.bd_title_vars["title_stratus"].set(f"Stratus ({STRATUS_POINTS * s_total:.2f} pts):")
-        self.bd_title_vars["title_stratus_flat"].set(f"Stratus Flat Rate ({STRATUS_POINTS * s_flat:.2f} pts):")
-        self.bd_title_vars["title_stratus_manuf"].set(f"Stratus Manufacture Warranty ({STRATUS_POINTS * s_manuf:.2f} pts):")
-        # Homefill
-        self.bd_labels["count_homefill"].set(str(self.state.get("count_homefill", 0)))
-        self.bd_labels["count_homefill_flat"].set(str(self.state.get("count_homefill_flat", 0)))
-        self.bd_labels["count_homefill_manuf"].set(str(self.state.get("count_homefill_manuf", 0)))
-        # Homefill points in titles
-        h_total = self.state.get("count_homefill", 0)
-        h_flat = self.state.get("count_homefill_flat", 0)
-        h_manuf = self.state.get("count_homefill_manuf", 0)
-        self.bd_title_vars["title_homefill"].set(f"Homefill ({HOMEFILL_POINTS * h_total:.2f} pts):")
-        self.bd_title_vars["title_homefill_flat"].set(f"Homefill Flat Rate ({HOMEFILL_POINTS * h_flat:.2f} pts):")
-        self.bd_title_vars["title_homefill_manuf"].set(f"Homefill Manufacture Warranty ({HOMEFILL_POINTS * h_manuf:.2f} pts):")
-        # 525 total and subcats
-        qm = self.state.get("count_qm", 0)
-        pm = self.state.get("count_pm", 0)
-        minor = self.state.get("count_minor", 0)
-        flat = self.state.get("count_flat", 0)
-        manuf = self.state.get("count_manuf", 0)
-        total_525 = qm + pm + minor + flat + manuf
-        self.bd_labels["total_525"].set(str(total_525))
-        self.bd_labels["count_qm"].set(str(qm))
-        self.bd_labels["count_pm"].set(str(pm))
-        self.bd_labels["count_minor"].set(str(minor))
-        self.bd_labels["count_flat"].set(str(flat))
-        self.bd_labels["count_manuf"].set(str(manuf))
-        # 525 points in titles
-        pts_525_total = (
-            DEV_POINTS["QM Warranty"] * qm
-            + DEV_POINTS["PM"] * pm
-            + DEV_POINTS["Minor Repair"] * minor
-            + DEV_POINTS["Flat Rate"] * flat
-            + DEV_POINTS["Manufacture Warranty"] * manuf
-        )
-        self.bd_title_vars["title_525"].set(f"525 ({pts_525_total:.2f} pts):")
-        self.bd_title_vars["title_525_qm"].set(f"525 QM Warranty ({DEV_POINTS['QM Warranty'] * qm:.2f} pts):")
-        self.bd_title_vars["title_525_pm"].set(f"525 PM ({DEV_POINTS['PM'] * pm:.2f} pts):")
-        self.bd_title_vars["title_525_minor"].set(f"525 Minor Repair ({DEV_POINTS['Minor Repair'] * minor:.2f} pts):")
-        self.bd_title_vars["title_525_flat"].set(f"525 Flat Rate ({DEV_POINTS['Flat Rate'] * flat:.2f} pts):")
-        self.bd_title_vars["title_525_manuf"].set(f"525 Manufacture Warranty ({DEV_POINTS['Manufacture Warranty'] * manuf:.2f} pts):")
-        # 1025 total and subcats
-        q10 = self.state.get("count_1025_qm", 0)
-        p10 = self.state.get("count_1025_pm", 0)
-        m10 = self.state.get("count_1025_minor", 0)
-        f10 = self.state.get("count_1025_flat", 0)
-        w10 = self.state.get("count_1025_manuf", 0)
-        total_1025 = q10 + p10 + m10 + f10 + w10
-        self.bd_labels["total_1025"].set(str(total_1025))
-        self.bd_labels["count_1025_qm"].set(str(q10))
-        self.bd_labels["count_1025_pm"].set(str(p10))
-        self.bd_labels["count_1025_minor"].set(str(m10))
-        self.bd_labels["count_1025_flat"].set(str(f10))
-        self.bd_labels["count_1025_manuf"].set(str(w10))
-        # 1025 points in titles
-        pts_1025_total = (
-            DEV_POINTS["QM Warranty"] * q10
-            + DEV_POINTS["PM"] * p10
-            + DEV_POINTS["Minor Repair"] * m10
-            + DEV_POINTS["Flat Rate"] * f10
-            + DEV_POINTS["Manufacture Warranty"] * w10
-        )
-        self.bd_title_vars["title_1025"].set(f"1025 ({pts_1025_total:.2f} pts):")
-        self.bd_title_vars["title_1025_qm"].set(f"1025 QM Warranty ({DEV_POINTS['QM Warranty'] * q10:.2f} pts):")
-        self.bd_title_vars["title_1025_pm"].set(f"1025 PM ({DEV_POINTS['PM'] * p10:.2f} pts):")
-        self.bd_title_vars["title_1025_minor"].set(f"1025 Minor Repair ({DEV_POINTS['Minor Repair'] * m10:.2f} pts):")
-        self.bd_title_vars["title_1025_flat"].set(f"1025 Flat Rate ({DEV_POINTS['Flat Rate'] * f10:.2f} pts):")
-        self.bd_title_vars["title_1025_manuf"].set(f"1025 Manufacture Warranty ({DEV_POINTS['Manufacture Warranty'] * w10:.2f} pts):")
-
-        # Perfecto 2V
-        perf_qm = self.state.get("count_perfecto_qm", 0)
-        perf_flat = self.state.get("count_perfecto_flat", 0)
-        perf_manuf = self.state.get("count_perfecto_manuf", 0)
-        perf_total = perf_qm + perf_flat + perf_manuf
-        if "count_perfecto_total" not in self.bd_labels:
-            # Build section lazily if not present
-            pass
+    def _refresh_breakdown(self, changed=None):
+        # Only the changed categories and their family totals are recomputed
+        if changed is None:
+            cats, fams = CATEGORIES, FAMILIES
         else:
-            self.bd_labels["count_perfecto_total"].set(str(perf_total))
-            self.bd_labels["count_perfecto_qm"].set(str(perf_qm))
-            self.bd_labels["count_perfecto_flat"].set(str(perf_flat))
-            self.bd_labels["count_perfecto_manuf"].set(str(perf_manuf))
-            pts = (
-                UNIT_POINTS["Perfecto 2V"]["QM Warranty"] * perf_qm
-                + UNIT_POINTS["Perfecto 2V"]["Flat Rate"] * perf_flat
-                + UNIT_POINTS["Perfecto 2V"]["Manufacture Warranty"] * perf_manuf
-            )
-            self.bd_title_vars["title_perfecto"].set(f"Perfecto 2V ({pts:.2f} pts):")
-            self.bd_title_vars["title_perfecto_qm"].set(f"Perfecto 2V QM Warranty ({UNIT_POINTS['Perfecto 2V']['QM Warranty'] * perf_qm:.2f} pts):")
-            self.bd_title_vars["title_perfecto_flat"].set(f"Perfecto 2V Flat Rate ({UNIT_POINTS['Perfecto 2V']['Flat Rate'] * perf_flat:.2f} pts):")
-            self.bd_title_vars["title_perfecto_manuf"].set(f"Perfecto 2V Manufacture Warranty ({UNIT_POINTS['Perfecto 2V']['Manufacture Warranty'] * perf_manuf:.2f} pts):")
-
-        # M10
-        m10_qm = self.state.get("count_m10_qm", 0)
-        m10_flat = self.state.get("count_m10_flat", 0)
-        m10_manuf = self.state.get("count_m10_manuf", 0)
-        m10_total = m10_qm + m10_flat + m10_manuf
-        if "count_m10_total" in self.bd_labels:
-            self.bd_labels["count_m10_total"].set(str(m10_total))
-            self.bd_labels["count_m10_qm"].set(str(m10_qm))
-            self.bd_labels["count_m10_flat"].set(str(m10_flat))
-            self.bd_labels["count_m10_manuf"].set(str(m10_manuf))
-            pts = (
-                UNIT_POINTS["M10"]["QM Warranty"] * m10_qm
-                + UNIT_POINTS["M10"]["Flat Rate"] * m10_flat
-                + UNIT_POINTS["M10"]["Manufacture Warranty"] * m10_manuf
-            )
-            self.bd_title_vars["title_m10"].set(f"M10 ({pts:.2f} pts):")
-            self.bd_title_vars["title_m10_qm"].set(f"M10 QM Warranty ({UNIT_POINTS['M10']['QM Warranty'] * m10_qm:.2f} pts):")
-            self.bd_title_vars["title_m10_flat"].set(f"M10 Flat Rate ({UNIT_POINTS['M10']['Flat Rate'] * m10_flat:.2f} pts):")
-            self.bd_title_vars["title_m10_manuf"].set(f"M10 Manufacture Warranty ({UNIT_POINTS['M10']['Manufacture Warranty'] * m10_manuf:.2f} pts):")
-
-        # Rhythm LM5A
-        a_qm = self.state.get("count_lm5a_qm", 0)
-        a_flat = self.state.get("count_lm5a_flat", 0)
-        a_manuf = self.state.get("count_lm5a_manuf", 0)
-        a_total = a_qm + a_flat + a_manuf
-        if "count_lm5a_total" in self.bd_labels:
-            self.bd_labels["count_lm5a_total"].set(str(a_total))
-            self.bd_labels["count_lm5a_qm"].set(str(a_qm))
-            self.bd_labels["count_lm5a_flat"].set(str(a_flat))
-            self.bd_labels["count_lm5a_manuf"].set(str(a_manuf))
-            pts = (
-                UNIT_POINTS["Rhythm LM5A"]["QM Warranty"] * a_qm
-                + UNIT_POINTS["Rhythm LM5A"]["Flat Rate"] * a_flat
-                + UNIT_POINTS["Rhythm LM5A"]["Manufacture Warranty"] * a_manuf
-            )
-            self.bd_title_vars["title_lm5a"].set(f"Rhythm LM5A ({pts:.2f} pts):")
-            self.bd_title_vars["title_lm5a_qm"].set(f"Rhythm LM5A QM Warranty ({UNIT_POINTS['Rhythm LM5A']['QM Warranty'] * a_qm:.2f} pts):")
-            self.bd_title_vars["title_lm5a_flat"].set(f"Rhythm LM5A Flat Rate ({UNIT_POINTS['Rhythm LM5A']['Flat Rate'] * a_flat:.2f} pts):")
-            self.bd_title_vars["title_lm5a_manuf"].set(f"Rhythm LM5A Manufacture Warranty ({UNIT_POINTS['Rhythm LM5A']['Manufacture Warranty'] * a_manuf:.2f} pts):")
-
-        # Rhythm LM5BA
-        b_qm = self.state.get("count_lm5ba_qm", 0)
-        b_flat = self.state.get("count_lm5ba_flat", 0)
-        b_manuf = self.state.get("count_lm5ba_manuf", 0)
-        b_total = b_qm + b_flat + b_manuf
-        if "count_lm5ba_total" in self.bd_labels:
-            self.bd_labels["count_lm5ba_total"].set(str(b_total))
-            self.bd_labels["count_lm5ba_qm"].set(str(b_qm))
-            self.bd_labels["count_lm5ba_flat"].set(str(b_flat))
-            self.bd_labels["count_lm5ba_manuf"].set(str(b_manuf))
-            pts = (
-                UNIT_POINTS["Rhythm LM5BA"]["QM Warranty"] * b_qm
-                + UNIT_POINTS["Rhythm LM5BA"]["Flat Rate"] * b_flat
-                + UNIT_POINTS["Rhythm LM5BA"]["Manufacture Warranty"] * b_manuf
-            )
-            self.bd_title_vars["title_lm5ba"].set(f"Rhythm LM5BA ({pts:.2f} pts):")
-            self.bd_title_vars["title_lm5ba_qm"].set(f"Rhythm LM5BA QM Warranty ({UNIT_POINTS['Rhythm LM5BA']['QM Warranty'] * b_qm:.2f} pts):")
-            self.bd_title_vars["title_lm5ba_flat"].set(f"Rhythm LM5BA Flat Rate ({UNIT_POINTS['Rhythm LM5BA']['Flat Rate'] * b_flat:.2f} pts):")
-            self.bd_title_vars["title_lm5ba_manuf"].set(f"Rhythm LM5BA Manufacture Warranty ({UNIT_POINTS['Rhythm LM5BA']['Manufacture Warranty'] * b_manuf:.2f} pts):")
-
-        # Rhythm LM5CA
-        c_qm = self.state.get("count_lm5ca_qm", 0)
-        c_flat = self.state.get("count_lm5ca_flat", 0)
-        c_manuf = self.state.get("count_lm5ca_manuf", 0)
-        c_total = c_qm + c_flat + c_manuf
-        if "count_lm5ca_total" in self.bd_labels:
-            self.bd_labels["count_lm5ca_total"].set(str(c_total))
-            self.bd_labels["count_lm5ca_qm"].set(str(c_qm))
-            self.bd_labels["count_lm5ca_flat"].set(str(c_flat))
-            self.bd_labels["count_lm5ca_manuf"].set(str(c_manuf))
-            pts = (
-                UNIT_POINTS["Rhythm LM5CA"]["QM Warranty"] * c_qm
-                + UNIT_POINTS["Rhythm LM5CA"]["Flat Rate"] * c_flat
-                + UNIT_POINTS["Rhythm LM5CA"]["Manufacture Warranty"] * c_manuf
-            )
-            self.bd_title_vars["title_lm5ca"].set(f"Rhythm LM5CA ({pts:.2f} pts):")
-            self.bd_title_vars["title_lm5ca_qm"].set(f"Rhythm LM5CA QM Warranty ({UNIT_POINTS['Rhythm LM5CA']['QM Warranty'] * c_qm:.2f} pts):")
-            self.bd_title_vars["title_lm5ca_flat"].set(f"Rhythm LM5CA Flat Rate ({UNIT_POINTS['Rhythm LM5CA']['Flat Rate'] * c_flat:.2f} pts):")
-            self.bd_title_vars["title_lm5ca_manuf"].set(f"Rhythm LM5CA Manufacture Warranty ({UNIT_POINTS['Rhythm LM5CA']['Manufacture Warranty'] * c_manuf:.2f} pts):")
-
-        # POC
-        poc_repair = self.state.get("count_poc_repair", 0)
-        if "count_poc_total" in self.bd_labels:
-            self.bd_labels["count_poc_total"].set(str(poc_repair))
-            self.bd_labels["count_poc_repair"].set(str(poc_repair))
-            pts = UNIT_POINTS["POC"]["Repair"] * poc_repair
-            self.bd_title_vars["title_poc"].set(f"POC ({pts:.2f} pts):")
-            self.bd_title_vars["title_poc_repair"].set(f"POC Repair ({pts:.2f} pts):")
+            cats = changed
+            fams = [FAMILIES[i] for i in sorted({c.family for c in changed})]
+        for cat in cats:
+            n, pts = self.engine.category_score(cat)
+            self._set_bd(cat.key, str(n), f"{cat.unit} {cat.warranty} ({pts:.2f} pts):")
+        for fam in fams:
+            n, pts = self.engine.family_score(fam)
+            self._set_bd(fam.name, str(n), f"{fam.name} ({pts:.2f} pts):")
+
+    def _set_bd(self, key, count_text, title_text):
+        shown = self._bd_shown.get(key, (None, None))
+        if shown[0] != count_text:
+            self.bd_labels[key].set(count_text)
+        if shown[1] != title_text:
+            self.bd_title_vars[key].set(title_text)
+        self._bd_shown[key] = (count_text, title_text)
 
     def _build_points_table(self, parent):
         cols = ("Unit", "Warranty", "Pts/unit")
@@ -1641,46 +530,113 @@ class WeightedOutputApp(tk.Tk):
         tree.column("Pts/unit", width=90, anchor="center")
 
         # Data rows describing the points structure
-        rows = [
-            ("Stratus", "Flat Rate", f"{STRATUS_POINTS:.2f}"),
-            ("Stratus", "Manufacture Warranty", f"{STRATUS_POINTS:.2f}"),
-            ("Homefill", "Flat Rate", f"{HOMEFILL_POINTS:.2f}"),
-            ("Homefill", "Manufacture Warranty", f"{HOMEFILL_POINTS:.2f}"),
-            ("525", "QM Warranty", f"{DEV_POINTS['QM Warranty']:.2f}"),
-            ("525", "PM", f"{DEV_POINTS['PM']:.2f}"),
-            ("525", "Minor Repair", f"{DEV_POINTS['Minor Repair']:.2f}"),
-            ("525", "Flat Rate", f"{DEV_POINTS['Flat Rate']:.2f}"),
-            ("525", "Manufacture Warranty", f"{DEV_POINTS['Manufacture Warranty']:.2f}"),
-            ("1025", "QM Warranty", f"{DEV_POINTS['QM Warranty']:.2f}"),
-            ("1025", "PM", f"{DEV_POINTS['PM']:.2f}"),
-            ("1025", "Minor Repair", f"{DEV_POINTS['Minor Repair']:.2f}"),
-            ("1025", "Flat Rate", f"{DEV_POINTS['Flat Rate']:.2f}"),
-            ("1025", "Manufacture Warranty", f"{DEV_POINTS['Manufacture Warranty']:.2f}"),
-            ("Perfecto 2V", "QM Warranty", f"{UNIT_POINTS['Perfecto 2V']['QM Warranty']:.2f}"),
-            ("Perfecto 2V", "Flat Rate", f"{UNIT_POINTS['Perfecto 2V']['Flat Rate']:.2f}"),
-            ("Perfecto 2V", "Manufacture Warranty", f"{UNIT_POINTS['Perfecto 2V']['Manufacture Warranty']:.2f}"),
-            ("M10", "QM Warranty", f"{UNIT_POINTS['M10']['QM Warranty']:.2f}"),
-            ("M10", "Flat Rate", f"{UNIT_POINTS['M10']['Flat Rate']:.2f}"),
-            ("M10", "Manufacture Warranty", f"{UNIT_POINTS['M10']['Manufacture Warranty']:.2f}"),
-            ("Rhythm LM5A", "QM Warranty", f"{UNIT_POINTS['Rhythm LM5A']['QM Warranty']:.2f}"),
-            ("Rhythm LM5A", "Flat Rate", f"{UNIT_POINTS['Rhythm LM5A']['Flat Rate']:.2f}"),
-            ("Rhythm LM5A", "Manufacture Warranty", f"{UNIT_POINTS['Rhythm LM5A']['Manufacture Warranty']:.2f}"),
-            ("Rhythm LM5BA", "QM Warranty", f"{UNIT_POINTS['Rhythm LM5BA']['QM Warranty']:.2f}"),
-            ("Rhythm LM5BA", "Flat Rate", f"{UNIT_POINTS['Rhythm LM5BA']['Flat Rate']:.2f}"),
-            ("Rhythm LM5BA", "Manufacture Warranty", f"{UNIT_POINTS['Rhythm LM5BA']['Manufacture Warranty']:.2f}"),
-            ("Rhythm LM5CA", "QM Warranty", f"{UNIT_POINTS['Rhythm LM5CA']['QM Warranty']:.2f}"),
-            ("Rhythm LM5CA", "Flat Rate", f"{UNIT_POINTS['Rhythm LM5CA']['Flat Rate']:.2f}"),
-            ("Rhythm LM5CA", "Manufacture Warranty", f"{UNIT_POINTS['Rhythm LM5CA']['Manufacture Warranty']:.2f}"),
-            ("POC", "Repair", f"{UNIT_POINTS['POC']['Repair']:.2f}"),
-        ]
-        for r in rows:
-            tree.insert("", "end", values=r)
+        for cat in CATEGORIES:
+            tree.insert("", "end", values=(cat.unit, cat.warranty, f"{cat.points:.2f}"))
         ttk.Label(parent, text="Points by Unit + Warranty", font=self.bold_font).grid(row=0, column=0, sticky="w", pady=(0,6))
         tree.grid(row=1, column=0, sticky="nsew")
         parent.rowconfigure(1, weight=1)
 
+    # ---- history tab ----
+    HISTORY_RANGES = (
+        "Today", "Yesterday", "This week", "Last 7 days", "This month",
+        "Last 30 days", "Last 90 days", "This year", "All time",
+    )
+
+    def _history_range(self, name):
+        today = self.engine.work_day()
+        if name == "Yesterday":
+            day = today - timedelta(days=1)
+            return day, day
+        if name == "This week":
+            return today - timedelta(days=today.weekday()), today
+        if name.startswith("Last "):
+            return today - timedelta(days=int(name.split()[1]) - 1), today
+        if name == "This month":
+            return today.replace(day=1), today
+        if name == "This year":
+            return today.replace(month=1, day=1), today
+        if name == "All time":
+            return self.engine.history.span() or (today, today)
+        return today, today
+
+    def _build_history_tab(self, parent):
+        parent.columnconfigure(0, weight=1)
+        parent.columnconfigure(1, weight=1)
+        parent.rowconfigure(2, weight=1)
+
+        controls = ttk.Frame(parent)
+        controls.grid(row=0, column=0, columnspan=2, sticky="w")
+        ttk.Label(controls, text="Range:").grid(row=0, column=0, sticky="w")
+        self.hist_range_var = tk.StringVar(value="This week")
+        rng = ttk.Combobox(controls, textvariable=self.hist_range_var, values=self.HISTORY_RANGES, state="readonly", width=14)
+        rng.grid(row=0, column=1, padx=(6, 18))
+        rng.bind("<<ComboboxSelected>>", lambda e: self._select_history_range())
+        ttk.Label(controls, text="From:").grid(row=0, column=2, sticky="w")
+        self.hist_from_var = tk.StringVar()
+        ttk.Entry(controls, textvariable=self.hist_from_var, width=12).grid(row=0, column=3, padx=(6, 12))
+        ttk.Label(controls, text="To:").grid(row=0, column=4, sticky="w")
+        self.hist_to_var = tk.StringVar()
+        ttk.Entry(controls, textvariable=self.hist_to_var, width=12).grid(row=0, column=5, padx=(6, 12))
+        ttk.Button(controls, text="Show", command=self._refresh_history).grid(row=0, column=6)
+
+        self.hist_summary_var = tk.StringVar()
+        ttk.Label(parent, textvariable=self.hist_summary_var, font=self.bold_font).grid(row=1, column=0, columnspan=2, sticky="w", pady=(10, 6))
+
+        # Left: per-family/category totals for the range; right: one row per active day
+        self.hist_tree = ttk.Treeview(parent, columns=("Units", "Points"), show="tree headings", height=18)
+        self.hist_tree.heading("#0", text="Unit / Warranty")
+        self.hist_tree.heading("Units", text="Units")
+        self.hist_tree.heading("Points", text="Points")
+        self.hist_tree.column("#0", width=240, anchor="w")
+        self.hist_tree.column("Units", width=70, anchor="center")
+        self.hist_tree.column("Points", width=80, anchor="center")
+        self.hist_tree.grid(row=2, column=0, sticky="nsew")
+
+        self.hist_days = ttk.Treeview(parent, columns=("Day", "Units", "Points"), show="headings", height=18)
+        for c, w in (("Day", 110), ("Units", 70), ("Points", 80)):
+            self.hist_days.heading(c, text=c)
+            self.hist_days.column(c, width=w, anchor="center")
+        self.hist_days.grid(row=2, column=1, sticky="nsew", padx=(16, 0))
+
+        self.hist_tab = parent
+        self._select_history_range()
+
+    def _history_visible(self):
+        return self.hist_tab is not None and self.notebook.select() == str(self.hist_tab)
+
+    def _select_history_range(self):
+        start, end = self._history_range(self.hist_range_var.get())
+        self.hist_from_var.set(start.isoformat())
+        self.hist_to_var.set(end.isoformat())
+        self._refresh_history()
+
+    def _refresh_history(self):
+        try:
+            start = date.fromisoformat(self.hist_from_var.get().strip())
+            end = date.fromisoformat(self.hist_to_var.get().strip())
+        except ValueError:
+            self.hist_summary_var.set("Enter dates as YYYY-MM-DD.")
+            return
+        if start > end:
+            start, end = end, start
+        units, pts, _counts = self.engine.range_totals(start, end)
+        self.hist_summary_var.set(f"{start.isoformat()} to {end.isoformat()}: {units} units, {pts:.2f} weighted pts")
+
+        self.hist_tree.delete(*self.hist_tree.get_children())
+        for fam, fam_units, fam_pts, cats in self.engine.range_breakdown(start, end):
+            if not fam_units:
+                continue
+            parent = self.hist_tree.insert("", "end", text=fam.name, values=(fam_units, f"{fam_pts:.2f}"), open=True)
+            for cat, n, p in cats:
+                if n:
+                    self.hist_tree.insert(parent, "end", text=cat.warranty, values=(n, f"{p:.2f}"))
+
+        self.hist_days.delete(*self.hist_days.get_children())
+        for day, units, pts in reversed(self.engine.daily_totals(start, end)):
+            self.hist_days.insert("", "end", values=(day.isoformat(), units, f"{pts:.2f}"))
+
     def _open_edit_breakdown(self):
-        total = self.state.get("output", 0)
+        total = self.engine.state.output
         win = tk.Toplevel(self)
         win.title("Edit Breakdown")
         win.transient(self)
@@ -1688,173 +644,54 @@ class WeightedOutputApp(tk.Tk):
 
         ttk.Label(win, text=f"Total output: {total}").grid(row=0, column=0, columnspan=2, sticky="w", pady=(8,4))
 
-        entries = {}
-        fields = [
-            ("Stratus Flat Rate", "count_stratus_flat"),
-            ("Stratus Manufacture Warranty", "count_stratus_manuf"),
-            ("Homefill Flat Rate", "count_homefill_flat"),
-            ("Homefill Manufacture Warranty", "count_homefill_manuf"),
-            ("525 QM Warranty", "count_qm"),
-            ("525 PM", "count_pm"),
-            ("525 Minor Repair", "count_minor"),
-            ("525 Flat Rate", "count_flat"),
-            ("525 Manufacture Warranty", "count_manuf"),
-            ("1025 QM Warranty", "count_1025_qm"),
-            ("1025 PM", "count_1025_pm"),
-            ("1025 Minor Repair", "count_1025_minor"),
-            ("1025 Flat Rate", "count_1025_flat"),
-            ("1025 Manufacture Warranty", "count_1025_manuf"),
-            ("Perfecto 2V QM Warranty", "count_perfecto_qm"),
-            ("Perfecto 2V Flat Rate", "count_perfecto_flat"),
-            ("Perfecto 2V Manufacture Warranty", "count_perfecto_manuf"),
-            ("M10 QM Warranty", "count_m10_qm"),
-            ("M10 Flat Rate", "count_m10_flat"),
-            ("M10 Manufacture Warranty", "count_m10_manuf"),
-            ("Rhythm LM5A QM Warranty", "count_lm5a_qm"),
-            ("Rhythm LM5A Flat Rate", "count_lm5a_flat"),
-            ("Rhythm LM5A Manufacture Warranty", "count_lm5a_manuf"),
-            ("Rhythm LM5BA QM Warranty", "count_lm5ba_qm"),
-            ("Rhythm LM5BA Flat Rate", "count_lm5ba_flat"),
-            ("Rhythm LM5BA Manufacture Warranty", "count_lm5ba_manuf"),
-            ("Rhythm LM5CA QM Warranty", "count_lm5ca_qm"),
-            ("Rhythm LM5CA Flat Rate", "count_lm5ca_flat"),
-            ("Rhythm LM5CA Manufacture Warranty", "count_lm5ca_manuf"),
-            ("POC Repair", "count_poc_repair"),
-        ]
-        for i, (label, key) in enumerate(fields, start=1):
-            ttk.Label(win, text=label+":").grid(row=i, column=0, sticky="w")
-            var = tk.StringVar(value=str(self.state.get(key, 0)))
+        entries = []
+        for i, cat in enumerate(CATEGORIES, start=1):
+            ttk.Label(win, text=f"{cat.unit} {cat.warranty}:").grid(row=i, column=0, sticky="w")
+            var = tk.StringVar(value=str(self.engine.state.counts[cat.index]))
             e = ttk.Entry(win, textvariable=var, width=10)
             e.grid(row=i, column=1, sticky="w")
-            entries[key] = var
+            entries.append(var)
 
         status = tk.StringVar(value="Enter non-negative integers that sum to total.")
-        ttk.Label(win, textvariable=status, foreground="#555").grid(row=len(fields)+1, column=0, columnspan=2, sticky="w", pady=(6,6))
+        ttk.Label(win, textvariable=status, foreground="#555").grid(row=N_CATEGORIES+1, column=0, columnspan=2, sticky="w", pady=(6,6))
 
         def on_save():
             try:
-                s_flat = int(entries["count_stratus_flat"].get().strip())
-                s_manuf = int(entries["count_stratus_manuf"].get().strip())
-                h_flat = int(entries["count_homefill_flat"].get().strip())
-                h_manuf = int(entries["count_homefill_manuf"].get().strip())
-                q = int(entries["count_qm"].get().strip())
-                p = int(entries["count_pm"].get().strip())
-                m = int(entries["count_minor"].get().strip())
-                f = int(entries["count_flat"].get().strip())
-                w = int(entries["count_manuf"].get().strip())
-                q10 = int(entries["count_1025_qm"].get().strip())
-                p10 = int(entries["count_1025_pm"].get().strip())
-                m10 = int(entries["count_1025_minor"].get().strip())
-                f10 = int(entries["count_1025_flat"].get().strip())
-                w10 = int(entries["count_1025_manuf"].get().strip())
-                perf_qm = int(entries["count_perfecto_qm"].get().strip())
-                perf_flat = int(entries["count_perfecto_flat"].get().strip())
-                perf_manuf = int(entries["count_perfecto_manuf"].get().strip())
-                mm_qm = int(entries["count_m10_qm"].get().strip())
-                mm_flat = int(entries["count_m10_flat"].get().strip())
-                mm_manuf = int(entries["count_m10_manuf"].get().strip())
-                a_qm = int(entries["count_lm5a_qm"].get().strip())
-                a_flat = int(entries["count_lm5a_flat"].get().strip())
-                a_manuf = int(entries["count_lm5a_manuf"].get().strip())
-                b_qm = int(entries["count_lm5ba_qm"].get().strip())
-                b_flat = int(entries["count_lm5ba_flat"].get().strip())
-                b_manuf = int(entries["count_lm5ba_manuf"].get().strip())
-                c_qm = int(entries["count_lm5ca_qm"].get().strip())
-                c_flat = int(entries["count_lm5ca_flat"].get().strip())
-                c_manuf = int(entries["count_lm5ca_manuf"].get().strip())
-                poc_r = int(entries["count_poc_repair"].get().strip())
+                counts = [int(var.get().strip()) for var in entries]
             except Exception:
                 messagebox.showerror("Invalid", "All fields must be integers.")
                 return
-            if any(x < 0 for x in (s_flat,s_manuf,h_flat,h_manuf,q,p,m,f,w,q10,p10,m10,f10,w10,
-                                    perf_qm,perf_flat,perf_manuf,mm_qm,mm_flat,mm_manuf,
-                                    a_qm,a_flat,a_manuf,b_qm,b_flat,b_manuf,c_qm,c_flat,c_manuf,poc_r)):
-                messagebox.showerror("Invalid", "Values must be non-negative.")
-                return
-            s = s_flat + s_manuf
-            h = h_flat + h_manuf
-            ssum = s + h + q + p + m + f + w + q10 + p10 + m10 + f10 + w10 
-            ssum += perf_qm + perf_flat + perf_manuf 
-            ssum += mm_qm + mm_flat + mm_manuf 
-            ssum += a_qm + a_flat + a_manuf 
-            ssum += b_qm + b_flat + b_manuf 
-            ssum += c_qm + c_flat + c_manuf 
-            ssum += poc_r
-            if ssum != total:
-                messagebox.showerror("Sum Mismatch", f"Sum of entries ({ssum}) must equal total output ({total}).")
+            try:
+                self.engine.set_breakdown(counts)
+            except ValueError as exc:
+                messagebox.showerror("Invalid", str(exc))
                 return
-            # Commit
-            self.state["count_stratus"] = s
-            self.state["count_stratus_flat"] = s_flat
-            self.state["count_stratus_manuf"] = s_manuf
-            self.state["count_homefill"] = h
-            self.state["count_homefill_flat"] = h_flat
-            self.state["count_homefill_manuf"] = h_manuf
-            self.state["count_qm"] = q
-            self.state["count_pm"] = p
-            self.state["count_minor"] = m
-            self.state["count_flat"] = f
-            self.state["count_manuf"] = w
-            self.state["count_1025_qm"] = q10
-            self.state["count_1025_pm"] = p10
-            self.state["count_1025_minor"] = m10
-            self.state["count_1025_flat"] = f10
-            self.state["count_1025_manuf"] = w10
-            self.state["count_perfecto_qm"] = perf_qm
-            self.state["count_perfecto_flat"] = perf_flat
-            self.state["count_perfecto_manuf"] = perf_manuf
-            self.state["count_m10_qm"] = mm_qm
-            self.state["count_m10_flat"] = mm_flat
-            self.state["count_m10_manuf"] = mm_manuf
-            self.state["count_lm5a_qm"] = a_qm
-            self.state["count_lm5a_flat"] = a_flat
-            self.state["count_lm5a_manuf"] = a_manuf
-            self.state["count_lm5ba_qm"] = b_qm
-            self.state["count_lm5ba_flat"] = b_flat
-            self.state["count_lm5ba_manuf"] = b_manuf
-            self.state["count_lm5ca_qm"] = c_qm
-            self.state["count_lm5ca_flat"] = c_flat
-            self.state["count_lm5ca_manuf"] = c_manuf
-            self.state["count_poc_repair"] = poc_r
-            self.state["weighted_output"] = (
-                STRATUS_POINTS * s
-                + HOMEFILL_POINTS * h
-                + DEV_POINTS["QM Warranty"] * q
-                + DEV_POINTS["PM"] * p
-                + DEV_POINTS["Minor Repair"] * m
-                + DEV_POINTS["Flat Rate"] * f
-                + DEV_POINTS["Manufacture Warranty"] * w
-                + DEV_POINTS["QM Warranty"] * q10
-                + DEV_POINTS["PM"] * p10
-                + DEV_POINTS["Minor Repair"] * m10
-                + DEV_POINTS["Flat Rate"] * f10
-                + DEV_POINTS["Manufacture Warranty"] * w10
-                + UNIT_POINTS["Perfecto 2V"]["QM Warranty"] * perf_qm
-                + UNIT_POINTS["Perfecto 2V"]["Flat Rate"] * perf_flat
-                + UNIT_POINTS["Perfecto 2V"]["Manufacture Warranty"] * perf_manuf
-                + UNIT_POINTS["M10"]["QM Warranty"] * mm_qm
-                + UNIT_POINTS["M10"]["Flat Rate"] * mm_flat
-                + UNIT_POINTS["M10"]["Manufacture Warranty"] * mm_manuf
-                + UNIT_POINTS["Rhythm LM5A"]["QM Warranty"] * a_qm
-                + UNIT_POINTS["Rhythm LM5A"]["Flat Rate"] * a_flat
-                + UNIT_POINTS["Rhythm LM5A"]["Manufacture Warranty"] * a_manuf
-                + UNIT_POINTS["Rhythm LM5BA"]["QM Warranty"] * b_qm
-                + UNIT_POINTS["Rhythm LM5BA"]["Flat Rate"] * b_flat
-                + UNIT_POINTS["Rhythm LM5BA"]["Manufacture Warranty"] * b_manuf
-                + UNIT_POINTS["Rhythm LM5CA"]["QM Warranty"] * c_qm
-                + UNIT_POINTS["Rhythm LM5CA"]["Flat Rate"] * c_flat
-                + UNIT_POINTS["Rhythm LM5CA"]["Manufacture Warranty"] * c_manuf
-                + UNIT_POINTS["POC"]["Repair"] * poc_r
-            )
-            save_progress(self.state)
             self._refresh_totals()
             win.destroy()
 
         btns = ttk.Frame(win)
-        btns.grid(row=len(fields)+2, column=0, columnspan=2, pady=(6,8))
+        btns.grid(row=N_CATEGORIES+2, column=0, columnspan=2, pady=(6,8))
         ttk.Button(btns, text="Save", command=on_save).grid(row=0, column=0, padx=(0,8))
         ttk.Button(btns, text="Cancel", command=win.destroy).grid(row=0, column=1)
 
+    def _merge_stations(self):
+        # Other benches' replica_<id>.json files, copied here by hand or a shared folder
+        paths = filedialog.askopenfilenames(
+            parent=self,
+            title="Merge replica files from other stations",
+            initialdir=str(self.engine.base_dir or "."),
+            filetypes=[("Replica files", "replica_*.json"), ("All files", "*.*")],
+        )
+        if not paths:
+            return
+        try:
+            files, moved = self.engine.merge_replicas(paths)
+        except (OSError, ValueError) as exc:
+            messagebox.showerror("Merge failed", str(exc))
+            return
+        self._refresh_totals()
+        self._toast(f"Merged {files} station file(s): {moved:+d} unit(s).")
+
     # ---- layout helpers ----
     def _flow_layout(self, parent, frames, columns=2, margin_ratio=0.9):
         try:
@@ -1897,19 +734,94 @@ class WeightedOutputApp(tk.Tk):
         except Exception:
             return None
 
+    def _poll_save_status(self):
+        pending = self.engine.pending()
+        if self.engine.error is not None:
+            self.save_status_var.set(f"Save failed, retrying ({pending} pending): {self.engine.error}")
+        elif pending:
+            self.save_status_var.set(f"Saving... ({pending} pending)")
+        else:
+            self.save_status_var.set("All changes saved")
+        # keep polling only while something is still in flight
+        if pending and not self._save_poll_armed:
+            self._save_poll_armed = True
+            self.after(200, self._on_save_poll)
+
+    def _on_save_poll(self):
+        self._save_poll_armed = False
+        if self.engine.error is not None:
+            self.engine.retry()
+        self._poll_save_status()
+
     def _on_close(self):
+        # Only exit once every change is on disk; a failed last write offers retry/cancel
+        while True:
+            try:
+                self.engine.close()
+                break
+            except Exception as exc:
+                if not messagebox.askretrycancel(
+                    "Save failed",
+                    f"{self.engine.pending()} change(s) are not saved yet:\n{exc}\n\n"
+                    "Retry, or Cancel to keep the tracker open.",
+                ):
+                    self._poll_save_status()
+                    return
+        self.destroy()
+
+    # ---- undo / redo ----
+    def _undo(self, _event=None):
+        self._step_history(self.engine.undo, "Undo")
+        return "break"
+
+    def _redo(self, _event=None):
+        self._step_history(self.engine.redo, "Redo")
+        return "break"
+
+    def _step_history(self, step, title):
         try:
-            save_progress(self.state)
-        finally:
-            self.destroy()
+            label = step()
+        except ValueError as exc:
+            messagebox.showerror(title, str(exc))
+            self._refresh_undo()  # a stale edit was dropped; the next one is on top now
+            return
+        if label is not None:
+            self._refresh_totals()
+
+    def _refresh_undo(self):
+        undo, redo = self.engine.can_undo(), self.engine.can_redo()
+        parts = []
+        if undo:
+            parts.append(f"Ctrl+Z: undo {undo}")
+        if redo:
+            parts.append(f"Ctrl+Y: redo {redo}")
+        self.undo_var.set("   ".join(parts))
+
+    # ---- time buckets ----
+    def _bucket(self):
+        # Selected bucket kind ("day", "shift", ...)
+        chosen = self.bucket_kind.get()
+        return next((k for k in BUCKET_KINDS if BUCKET_TITLES[k][0] == chosen), "day")
+
+    def _refresh_bucket(self):
+        kind = self._bucket()
+        _name, started, output = BUCKET_TITLES[kind]
+        self.start_title_var.set(f"{started}:")
+        self.today_title_var.set(f"{output}:")
+        self.start_var.set(str(self.engine.bucket_start(kind)))
+        self.today_var.set(str(self.engine.bucket_output(kind)))
+        label = self.engine.current_bucket(kind)
+        self.bucket_label_var.set(label or f"no {kind} running")
 
     def _edit_today_output(self):
+        kind = self._bucket()
+        title = BUCKET_TITLES[kind][2]
         win = tk.Toplevel(self)
-        win.title("Edit Today's Output")
+        win.title(f"Edit {title}")
         win.transient(self)
         win.grab_set()
 
-        current = max(0, self.state.get("output", 0) - self.state.get("start_of_day_output", 0))
+        current = self.engine.bucket_output(kind)
         ttk.Label(win, text=f"Current value: {current}").grid(row=0, column=0, columnspan=2, sticky="w", pady=(8,4))
         ttk.Label(win, text="New value:").grid(row=1, column=0, sticky="w")
         var = tk.StringVar(value=str(current))
@@ -1925,16 +837,12 @@ class WeightedOutputApp(tk.Tk):
             except Exception:
                 messagebox.showerror("Invalid", "Value must be an integer.")
                 return
-            if val < 0:
-                messagebox.showerror("Invalid", "Value must be non-negative.")
+            try:
+                # Adjusts the bucket's baseline so that its output equals val
+                self.engine.set_bucket_output(kind, val)
+            except ValueError as exc:
+                messagebox.showerror("Invalid", str(exc))
                 return
-            total = self.state.get("output", 0)
-            # Adjust start_of_day_output so that today's output equals val
-            new_start = total - val
-            if new_start < 0:
-                new_start = 0
-            self.state["start_of_day_output"] = new_start
-            save_progress(self.state)
             self._refresh_totals()
             win.destroy()
 
@@ -1944,12 +852,14 @@ class WeightedOutputApp(tk.Tk):
         ttk.Button(btns, text="Cancel", command=win.destroy).grid(row=0, column=1)
 
     def _edit_start_of_day(self):
+        kind = self._bucket()
+        title = BUCKET_TITLES[kind][1].title()
         win = tk.Toplevel(self)
-        win.title("Edit Started Today With")
+        win.title(f"Edit {title}")
         win.transient(self)
         win.grab_set()
 
-        current = self.state.get("start_of_day_output", 0)
+        current = self.engine.bucket_start(kind)
         ttk.Label(win, text=f"Current value: {current}").grid(row=0, column=0, columnspan=2, sticky="w", pady=(8,4))
         ttk.Label(win, text="New value:").grid(row=1, column=0, sticky="w")
         var = tk.StringVar(value=str(current))
@@ -1969,12 +879,15 @@ class WeightedOutputApp(tk.Tk):
                 messagebox.showerror("Invalid", "Value must be non-negative.")
                 return
             # Optional guard: cannot exceed current output (can relax if desired)
-            total = self.state.get("output", 0)
+            total = self.engine.state.output
             if val > total:
                 if not messagebox.askyesno("Confirm", f"Entered value ({val}) exceeds current total output ({total}). Save anyway?"):
                     return
-            self.state["start_of_day_output"] = val
-            save_progress(self.state)
+            try:
+                self.engine.set_bucket_start(kind, val)
+            except ValueError as exc:
+                messagebox.showerror("Invalid", str(exc))
+                return
             self._refresh_totals()
             win.destroy()
 
@@ -1984,6 +897,74 @@ class WeightedOutputApp(tk.Tk):
         ttk.Button(btns, text="Cancel", command=win.destroy).grid(row=0, column=1)
 
 
+    # ---- pace ----
+    def _refresh_pace(self):
+        units_rate, points_rate, projected, shift_end, target = self.engine.pace_summary()
+        text = f"Pace: {units_rate:.1f} units/h · {points_rate:.2f} pts/h · projected {projected:.2f} pts by {shift_end:%H:%M}"
+        if target:
+            text += f" (target {target:.2f}, {projected - target:+.2f})"
+        self.pace_var.set(text)
+
+    def _on_pace_tick(self):
+        self._refresh_pace()
+        # shift and hour buckets turn over on their own; keep the header on the current one
+        self._refresh_bucket()
+        self.after(PACE_TICK_MS, self._on_pace_tick)
+
+    # ---- other processes ----
+    def _on_watch_tick(self):
+        # A stat (or SQLite data_version) per tick; files are only re-read after a real change
+        try:
+            changed = self.engine.reload_if_changed()
+        except Exception:
+            changed = None  # files locked or mid-write right now; try again next tick
+        if changed is not None:
+            self._refresh_totals(changed)
+        self.after(WATCH_MS, self._on_watch_tick)
+
+    # ---- day rollover ----
+    def _arm_rollover(self):
+        # One timer for the next day boundary (midnight or tracker_config's day_boundary)
+        delay = (self.engine.next_rollover() - datetime.now()).total_seconds()
+        self._rollover_after = self.after(int(max(0.0, delay) * 1000) + ROLLOVER_SLACK_MS, self._on_rollover)
+
+    def _on_rollover(self):
+        # A timer that fires early (clock change) finds the same day and simply re-arms
+        if self.engine.ensure_start_of_day():
+            self._refresh_totals()
+        self._arm_rollover()
+
+    def _edit_target(self):
+        win = tk.Toplevel(self)
+        win.title("Daily Target")
+        win.transient(self)
+        win.grab_set()
+
+        current = float(self.engine.config.get("daily_target") or 0)
+        ttk.Label(win, text="Weighted points per day (0 for none):").grid(row=0, column=0, columnspan=2, sticky="w", pady=(8,4))
+        var = tk.StringVar(value=f"{current:g}")
+        ttk.Entry(win, textvariable=var, width=10).grid(row=1, column=0, sticky="w")
+
+        def on_save():
+            try:
+                val = float(var.get().strip())
+            except ValueError:
+                messagebox.showerror("Invalid", "Target must be a number.")
+                return
+            try:
+                self.engine.set_target(val)
+            except ValueError as exc:
+                messagebox.showerror("Invalid", str(exc))
+                return
+            self._refresh_pace()
+            win.destroy()
+
+        btns = ttk.Frame(win)
+        btns.grid(row=2, column=0, columnspan=2, pady=(6,8))
+        ttk.Button(btns, text="Save", command=on_save).grid(row=0, column=0, padx=(0,8))
+        ttk.Button(btns, text="Cancel", command=win.destroy).grid(row=0, column=1)
+
+
 if __name__ == "__main__":
     app = WeightedOutputApp()
     app.mainloop()